@@ -0,0 +1,104 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from django_library_service.metrics import CACHE_REQUESTS
+
+VALIDATOR_HEADERS = ("ETag", "Last-Modified")
+
+CATALOG_VERSION_KEY = "books:catalog-version"
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from a timestamp so an evicted counter never restarts at a
+        # version that still has entries cached under it.
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def _bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+
+
+def invalidate_catalog():
+    """
+    Make every cached catalog response stale.
+
+    The version is bumped immediately and again on commit, so a reader that
+    cached pre-commit data in between is invalidated as well.
+    """
+    _bump_catalog_version()
+    transaction.on_commit(_bump_catalog_version)
+
+
+def catalog_cache_key(kind, request):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    url = f"{request.accepted_renderer.format}:{request.get_host()}{request.path}?{query}"
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return f"books:v{get_catalog_version()}:{kind}:{digest}"
+
+
+class CatalogCacheMixin:
+    """
+    Serve ``list`` and ``retrieve`` from the cache until the catalog
+    version changes.
+
+    Entries keep the response's ETag / Last-Modified, so conditional
+    requests hitting the cache are answered without the database.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response("list", super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            "detail", super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cached_response(self, kind, handler, request, *args, **kwargs):
+        key = catalog_cache_key(kind, request)
+        entry = cache.get(key)
+        CACHE_REQUESTS.inc(cache="catalog", result="miss" if entry is None else "hit")
+        if entry is not None:
+            data, validators = entry
+            last_modified = validators.get("Last-Modified")
+            response = get_conditional_response(
+                request,
+                etag=validators.get("ETag"),
+                last_modified=last_modified and parse_http_date(last_modified),
+            )
+            if response is None:
+                response = Response(data, status=status.HTTP_200_OK)
+            if response.status_code in (
+                status.HTTP_200_OK,
+                status.HTTP_304_NOT_MODIFIED,
+            ):
+                for header, value in validators.items():
+                    response[header] = value
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            validators = {
+                header: response[header]
+                for header in VALIDATOR_HEADERS
+                if header in response
+            }
+            cache.set(
+                key, (response.data, validators), settings.CATALOG_CACHE_TIMEOUT
+            )
+        return response
@@ -1,12 +1,23 @@
+import re
+
 import django_filters
-from django.db.models import Q
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db.models import F, FloatField, Max, Q
+from django.db.models.functions import Cast, Upper
+from rest_framework.filters import BaseFilterBackend
 
-from books.models import Book
+from books.models import Book, SEARCH_CONFIG
 
 
 class BookFilter(django_filters.FilterSet):
     id = django_filters.CharFilter(method="search_by_ids")
+    title = django_filters.CharFilter(method="search_by_titles")
     author = django_filters.CharFilter(method="search_by_authors")
+    fuzzy = django_filters.BooleanFilter(method="enable_fuzzy_matching")
 
     daily_fee = django_filters.NumberFilter(field_name="daily_fee")
     min_fee = django_filters.NumberFilter(field_name="daily_fee", lookup_expr="gte")
@@ -14,19 +25,100 @@ class BookFilter(django_filters.FilterSet):
 
     class Meta:
         model = Book
-        fields = ["id", "author", "daily_fee", "min_fee", "max_fee"]
+        fields = ["id", "title", "author", "fuzzy", "daily_fee", "min_fee", "max_fee"]
 
     def search_by_ids(self, queryset, name, value):
         if not value:
             return queryset
         ids_list = value.split(",")
-        return queryset.filter(id__in=ids_list).distinct()
+        return queryset.filter(id__in=ids_list)
+
+    def search_by_titles(self, queryset, name, value):
+        return self.match_any(queryset, "title", value)
 
     def search_by_authors(self, queryset, name, value):
+        return self.match_any(queryset, "author", value)
+
+    def enable_fuzzy_matching(self, queryset, name, value):
+        return queryset
+
+    def match_any(self, queryset, field_name, value):
+        """
+        Match any of the comma-separated values as a substring, or as a
+        similar word when ``fuzzy`` is set. Both forms are served by the
+        ``UPPER(field) gin_trgm_ops`` index on ``Book``.
+        """
         if not value:
             return queryset
-        authors_list = value.split(",")
+        values = [item.strip() for item in value.split(",") if item.strip()]
         query = Q()
-        for search_author in authors_list:
-            query |= Q(author__icontains=search_author)
-        return queryset.filter(query).distinct()
+        if self.form.cleaned_data.get("fuzzy"):
+            queryset = queryset.alias(**{f"{field_name}_upper": Upper(field_name)})
+            for item in values:
+                query |= Q(**{f"{field_name}_upper__trigram_word_similar": item})
+        else:
+            for item in values:
+                query |= Q(**{f"{field_name}__icontains": item})
+        return queryset.filter(query)
+
+
+class BookFullTextSearchFilter(BaseFilterBackend):
+    """
+    Full-text search over the indexed ``Book.search_vector`` column.
+
+    Every word of ``?q=`` must prefix-match a word of the title or author
+    (the same AND semantics as ``?search=``). Results are ordered by
+    relevance unless the client asked for an explicit ``?ordering=``.
+    """
+
+    search_param = "q"
+    ordering_param = "ordering"
+
+    def get_search_query(self, request):
+        terms = re.findall(r"\w+", request.query_params.get(self.search_param, ""))
+        if not terms:
+            return None
+        raw_query = " & ".join(f"{term}:*" for term in terms)
+        return SearchQuery(raw_query, search_type="raw", config=SEARCH_CONFIG)
+
+    def filter_queryset(self, request, queryset, view):
+        search_query = self.get_search_query(request)
+        if search_query is None:
+            return queryset
+
+        # ts_rank() returns real; widen it so the value survives a round
+        # trip through a pagination cursor and compares equal afterwards.
+        queryset = queryset.filter(search_vector=search_query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), search_query), FloatField())
+        )
+        if request.query_params.get(self.ordering_param):
+            return queryset
+        return queryset.order_by("-rank", "id")
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Full-text search by title and author, "
+                               "ordered by relevance.",
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+def suggest_similar(queryset, field_name, term, limit=5):
+    """
+    "Did you mean" values of ``field_name`` that contain a word similar to
+    ``term``, best match first.
+    """
+    field_upper = f"{field_name}_upper"
+    return list(
+        queryset.alias(**{field_upper: Upper(field_name)})
+        .filter(**{f"{field_upper}__trigram_word_similar": term})
+        .order_by()
+        .values_list(field_name, flat=True)
+        .annotate(similarity=Max(TrigramWordSimilarity(term, field_name)))
+        .order_by("-similarity", field_name)[:limit]
+    )
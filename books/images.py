@@ -0,0 +1,122 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from books.cache import invalidate_catalog
+from books.models import Book
+
+logger = logging.getLogger(__name__)
+
+# name -> (bounding box, crop to exactly that box)
+RENDITION_SIZES = {
+    "thumbnail": ((160, 240), True),
+    "medium": ((640, 960), False),
+}
+
+# extension -> (Pillow format, save options)
+RENDITION_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="book-renditions")
+
+
+def rendition_key(size_name, extension):
+    return f"{size_name}_{extension}"
+
+
+def rendition_path(image_name, size_name, extension):
+    directory, filename = os.path.split(image_name)
+    stem, _ = os.path.splitext(filename)
+    return os.path.join(directory, "renditions", f"{stem}-{size_name}.{extension}")
+
+
+def resize(source, size, crop):
+    if crop:
+        return ImageOps.fit(source, size, Image.Resampling.LANCZOS)
+
+    image = source.copy()
+    image.thumbnail(size, Image.Resampling.LANCZOS)
+    return image
+
+
+def encode(image, pil_format, options):
+    if pil_format == "JPEG" or image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def delete_renditions(storage, renditions):
+    for rendition in renditions.values():
+        storage.delete(rendition["name"])
+
+
+def generate_renditions(book_id):
+    """
+    Write every size/format rendition of the book's cover and record
+    their names and dimensions on ``Book.image_renditions``.
+
+    The result is dropped if the cover was replaced in the meantime.
+    """
+    book = (
+        Book.objects.filter(pk=book_id).only("image", "image_renditions").first()
+    )
+    if book is None or not book.image:
+        return None
+
+    storage = book.image.storage
+    with book.image.open("rb") as image_file:
+        source = ImageOps.exif_transpose(Image.open(image_file))
+        source.load()
+
+    renditions = {}
+    for size_name, (size, crop) in RENDITION_SIZES.items():
+        image = resize(source, size, crop)
+        for extension, (pil_format, options) in RENDITION_FORMATS.items():
+            name = storage.save(
+                rendition_path(book.image.name, size_name, extension),
+                ContentFile(encode(image, pil_format, options)),
+            )
+            renditions[rendition_key(size_name, extension)] = {
+                "name": name,
+                "width": image.width,
+                "height": image.height,
+            }
+
+    updated = Book.objects.filter(pk=book_id, image=book.image.name).update(
+        image_renditions=renditions, updated_at=timezone.now()
+    )
+    if not updated:
+        delete_renditions(storage, renditions)
+        return None
+
+    delete_renditions(storage, book.image_renditions)
+    invalidate_catalog()
+    return renditions
+
+
+def _generate_in_background(book_id):
+    try:
+        generate_renditions(book_id)
+    except Exception:
+        logger.exception("Could not generate renditions for book %s", book_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_renditions(book):
+    """Generate the book's renditions in a worker thread after commit."""
+    book_id = book.pk
+    transaction.on_commit(
+        lambda: executor.submit(_generate_in_background, book_id)
+    )
@@ -0,0 +1,107 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from books.filters import BookFullTextSearchFilter
+from books.models import Book
+
+MATCHES_PER_SIZE = 10
+WORDS = (
+    "war peace night river stone garden winter shadow empire silent "
+    "golden ocean forest glass secret city storm crown fire moon letters "
+    "journey house memory island machine north summer bridge lost orchard"
+).split()
+NAMES = (
+    "anna boris clara dmitri elena fyodor galina ivan katya leo maria "
+    "nikolai olga pavel sofia taras viktor yulia zoya"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare `?search=` (ILIKE) with `?q=` (full-text) on synthetic "
+        "catalogs of growing size. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[10_000, 100_000, 300_000],
+        )
+        parser.add_argument("--term", default="tolstoy")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        term = options["term"]
+        self.stdout.write(
+            f"{'rows':>10} {'search (ms)':>12} {'q (ms)':>10}  q plan"
+        )
+        with transaction.atomic():
+            for size in sorted(options["sizes"]):
+                self.seed(size, term)
+                ilike_ms = self.time_queryset(
+                    lambda: Book.objects.defer("search_vector").filter(
+                        Q(title__icontains=term) | Q(author__icontains=term)
+                    ).order_by("id")[:20],
+                    options["repeat"],
+                )
+                request = Request(RequestFactory().get("/", {"q": term}))
+                fts_ms = self.time_queryset(
+                    lambda: self.full_text_queryset(request),
+                    options["repeat"],
+                )
+                plan = self.full_text_queryset(request).explain()
+                index_used = "book_search_vector_idx" in plan
+                self.stdout.write(
+                    f"{size:>10} {ilike_ms:>12.2f} {fts_ms:>10.2f}  "
+                    f"{'GIN index scan' if index_used else 'sequential scan'}"
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, size, term):
+        existing = Book.objects.count()
+        rng = random.Random(size)
+        batch = []
+        for number in range(existing, size):
+            author = f"{rng.choice(NAMES)} {rng.choice(NAMES)}ov"
+            if number % (size // MATCHES_PER_SIZE) == 0:
+                author = f"leo {term}"
+            batch.append(
+                Book(
+                    title=" ".join(rng.sample(WORDS, 3)),
+                    author=author,
+                    inventory=rng.randint(1, 20),
+                    daily_fee=Decimal(rng.randint(10, 500)) / 100,
+                )
+            )
+            if len(batch) == 5000:
+                Book.objects.bulk_create(batch)
+                batch = []
+        Book.objects.bulk_create(batch)
+        with connection.cursor() as cursor:
+            # Merge GIN pending lists as autovacuum would on a live table.
+            for index in Book._meta.indexes:
+                cursor.execute("SELECT gin_clean_pending_list(%s::regclass)", [index.name])
+            cursor.execute(f"ANALYZE {Book._meta.db_table}")
+
+    @staticmethod
+    def full_text_queryset(request):
+        return BookFullTextSearchFilter().filter_queryset(
+            request, Book.objects.defer("search_vector"), view=None
+        )[:20]
+
+    @staticmethod
+    def time_queryset(build_queryset, repeat):
+        list(build_queryset())
+        started = time.perf_counter()
+        for _ in range(repeat):
+            list(build_queryset())
+        return (time.perf_counter() - started) * 1000 / repeat
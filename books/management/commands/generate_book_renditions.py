@@ -0,0 +1,40 @@
+from django.core.management import BaseCommand
+
+from books.images import generate_renditions
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate thumbnail and medium WebP/JPEG renditions for book covers "
+        "that do not have them yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate renditions of every cover.",
+        )
+
+    def handle(self, *args, **options):
+        books = Book.objects.exclude(image="").exclude(image__isnull=True)
+        if not options["force"]:
+            books = books.filter(image_renditions={})
+
+        generated = failed = 0
+        for book_id in books.values_list("id", flat=True).iterator():
+            try:
+                renditions = generate_renditions(book_id)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f"Book {book_id}: {error}")
+                continue
+            if renditions:
+                generated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated renditions for {generated} books ({failed} failed)."
+            )
+        )
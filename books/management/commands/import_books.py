@@ -0,0 +1,70 @@
+import os
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+from books.importers import DEFAULT_CHUNK_SIZE, FORMATS, import_books
+
+EXTENSION_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books from a CSV or JSON Lines feed. Rows with an existing "
+        "id are updated, others are inserted; invalid rows are reported "
+        "and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='Feed file, or "-" for stdin.')
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Feed format; guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        feed_format = options["format"]
+        if feed_format is None:
+            _, extension = os.path.splitext(path)
+            feed_format = EXTENSION_FORMATS.get(extension.lower())
+        if feed_format is None:
+            raise CommandError("Cannot guess the feed format, pass --format.")
+
+        if path == "-":
+            result = import_books(
+                sys.stdin, feed_format, options["chunk_size"], self.report
+            )
+        else:
+            try:
+                feed = open(path, newline="", encoding="utf-8")
+            except OSError as error:
+                raise CommandError(error)
+            with feed:
+                result = import_books(
+                    feed, feed_format, options["chunk_size"], self.report
+                )
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {'; '.join(error['errors'])}")
+        if result.failed > len(result.errors):
+            self.stderr.write(
+                f"... {result.failed - len(result.errors)} more invalid rows."
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.imported} books, {result.failed} rows failed "
+                f"in {result.elapsed:.1f}s ({result.rows_per_second} rows/s)."
+            )
+        )
+
+    def report(self, result):
+        self.stdout.write(
+            f"{result.imported + result.failed} rows "
+            f"({result.rows_per_second} rows/s)"
+        )
@@ -1,10 +1,20 @@
 import os
 import uuid
 
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.utils.text import slugify
 
+from books.cache import invalidate_catalog
+
+
+SEARCH_CONFIG = "simple"
+
 
 def book_image_path(instance, filename):
     _, extension = os.path.splitext(filename)
@@ -13,6 +23,33 @@ def book_image_path(instance, filename):
     return os.path.join("uploads/books/", filename)
 
 
+class BookQuerySet(models.QuerySet):
+    """
+    Single-statement inventory changes. They run as one conditional
+    ``UPDATE`` each, so concurrent checkouts never oversell and only touch
+    ``inventory`` and ``updated_at``; ``update()`` skips the signals, hence
+    the explicit cache invalidation.
+    """
+
+    def take_copy(self):
+        """Take one copy of each book that has one left; return how many."""
+        taken = self.filter(inventory__gt=0).update(
+            inventory=F("inventory") - 1, updated_at=timezone.now()
+        )
+        if taken:
+            invalidate_catalog()
+        return taken
+
+    def return_copy(self):
+        """Put one copy of each book back; return how many."""
+        returned = self.update(
+            inventory=F("inventory") + 1, updated_at=timezone.now()
+        )
+        if returned:
+            invalidate_catalog()
+        return returned
+
+
 class Book(models.Model):
     title = models.CharField(max_length=255)
     author = models.CharField(max_length=255)
@@ -27,11 +64,36 @@ class Book(models.Model):
     inventory = models.PositiveIntegerField()
     daily_fee = models.DecimalField(decimal_places=2, max_digits=10)
     image = models.ImageField(null=True, blank=True, upload_to=book_image_path)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("author", weight="B", config=SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = BookQuerySet.as_manager()
 
     class Meta:
         ordering = ["title"]
         verbose_name = "Book"
         verbose_name_plural = "Books"
+        indexes = [
+            GinIndex(fields=["search_vector"], name="book_search_vector_idx"),
+            # icontains compiles to UPPER(column) LIKE, so the trigram
+            # indexes cover that expression rather than the raw column.
+            GinIndex(
+                OpClass(Upper("title"), name="gin_trgm_ops"),
+                name="book_title_trgm_idx",
+            ),
+            GinIndex(
+                OpClass(Upper("author"), name="gin_trgm_ops"),
+                name="book_author_trgm_idx",
+            ),
+        ]
 
     def clean(self):
         if self.inventory is not None and self.inventory < 1:
@@ -1,14 +1,55 @@
+from collections import Counter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 
 from books.models import Book
+from books.uploads import store_cover
+from django_library_service.fieldsets import SparseFieldsetMixin
+from django_library_service.serializers import ValuesSerializer
+
+
+def media_url(name, request):
+    url = Book._meta.get_field("image").storage.url(name)
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    return url
+
 
+def rendition_urls(image, renditions, request):
+    if not image:
+        return {}
+    return {
+        key: {
+            "url": media_url(rendition["name"], request),
+            "width": rendition["width"],
+            "height": rendition["height"],
+        }
+        for key, rendition in renditions.items()
+    }
 
-class BookSerializer(serializers.ModelSerializer):
+
+class BookSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     image = serializers.ImageField(read_only=True)
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Book
-        fields = ("id", "title", "author", "cover", "inventory", "daily_fee", "image")
+        fields = (
+            "id",
+            "title",
+            "author",
+            "cover",
+            "inventory",
+            "daily_fee",
+            "image",
+            "image_renditions",
+        )
+
+    def get_image_renditions(self, obj) -> dict:
+        return rendition_urls(
+            obj.image, obj.image_renditions, self.context.get("request")
+        )
 
     def get_download_link(self, obj):
         if obj.image:
@@ -21,8 +62,93 @@ class BookSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class BookValuesSerializer(ValuesSerializer):
+    serializer_class = BookSerializer
+    extra_lookups = {
+        "image": ("image",),
+        "image_renditions": ("image", "image_renditions"),
+    }
+
+    def get_image(self, row):
+        image = self.value(row, "image")
+        if not image:
+            return None
+        return media_url(image, self.context.get("request"))
+
+    def get_image_renditions(self, row):
+        return rendition_urls(
+            self.value(row, "image"),
+            self.value(row, "image_renditions"),
+            self.context.get("request"),
+        )
+
+
+class BookPatchListSerializer(serializers.ListSerializer):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", 1000)
+        kwargs.setdefault("allow_empty", False)
+        super().__init__(*args, **kwargs)
+
+    def validate(self, attrs):
+        counts = Counter(patch["id"] for patch in attrs)
+        duplicates = sorted(book_id for book_id, count in counts.items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError(
+                f"Each book may be patched once per batch: {duplicates}."
+            )
+        return attrs
+
+
+class BookPatchSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    inventory = serializers.IntegerField(required=False)
+    daily_fee = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False
+    )
+
+    class Meta:
+        list_serializer_class = BookPatchListSerializer
+
+    def validate(self, attrs):
+        if "inventory" not in attrs and "daily_fee" not in attrs:
+            raise serializers.ValidationError(
+                "Provide inventory and/or daily_fee."
+            )
+        try:
+            Book(
+                inventory=attrs.get("inventory"), daily_fee=attrs.get("daily_fee")
+            ).clean()
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(error.messages)
+        return attrs
+
+
 class BookImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Book
         fields = ("id", "image")
+
+    def update(self, instance, validated_data):
+        image = validated_data.pop("image", None)
+        if image is not None:
+            instance.image = store_cover(image, instance.image.storage)
+        return super().update(instance, validated_data)
+
+
+class BookImportErrorSerializer(serializers.Serializer):
+    line = serializers.IntegerField()
+    errors = serializers.ListField(child=serializers.CharField())
+
+
+class BookImportResultSerializer(serializers.Serializer):
+    imported = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    elapsed = serializers.FloatField()
+    rows_per_second = serializers.IntegerField()
+    errors = BookImportErrorSerializer(many=True)
+
+
+class BookSuggestionSerializer(serializers.Serializer):
+    titles = serializers.ListField(child=serializers.CharField())
+    authors = serializers.ListField(child=serializers.CharField())
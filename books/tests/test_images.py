@@ -0,0 +1,144 @@
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books import images
+from books.images import generate_renditions
+from books.models import Book
+from user.models import User
+
+
+def make_cover(size=(1200, 1600), name="cover.png"):
+    buffer = BytesIO()
+    Image.new("RGB", size, "navy").save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ImmediateExecutor:
+    def submit(self, fn, *args, **kwargs):
+        fn(*args, **kwargs)
+
+
+class BookRenditionTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(self.settings_override.disable)
+
+        self.book = Book.objects.create(
+            title="Illustrated Book",
+            author="Author",
+            inventory=3,
+            daily_fee=Decimal("1.00"),
+            image=make_cover(),
+        )
+
+    def test_generate_renditions(self):
+        """Test: every size is written in WebP and JPEG with its dimensions."""
+        renditions = generate_renditions(self.book.id)
+
+        self.assertEqual(
+            set(renditions),
+            {"thumbnail_webp", "thumbnail_jpeg", "medium_webp", "medium_jpeg"},
+        )
+        storage = self.book.image.storage
+        for key, rendition in renditions.items():
+            with storage.open(rendition["name"]) as file:
+                image = Image.open(file)
+                self.assertEqual(image.format, key.split("_")[1].upper())
+                self.assertEqual(
+                    image.size, (rendition["width"], rendition["height"])
+                )
+
+        self.assertEqual(renditions["thumbnail_webp"]["width"], 160)
+        self.assertEqual(renditions["thumbnail_webp"]["height"], 240)
+        self.assertEqual(renditions["medium_jpeg"]["width"], 640)
+        self.assertEqual(renditions["medium_jpeg"]["height"], 853)
+
+    def test_generate_renditions_updates_book(self):
+        """Test: renditions are stored on the book and bump updated_at."""
+        updated_at = self.book.updated_at
+
+        renditions = generate_renditions(self.book.id)
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.image_renditions, renditions)
+        self.assertGreater(self.book.updated_at, updated_at)
+
+    def test_regenerating_removes_previous_files(self):
+        """Test: regenerated renditions replace the previous files."""
+        storage = self.book.image.storage
+        first = generate_renditions(self.book.id)
+
+        generate_renditions(self.book.id)
+
+        for rendition in first.values():
+            self.assertFalse(storage.exists(rendition["name"]))
+
+    def test_replaced_cover_discards_result(self):
+        """Test: renditions of a cover replaced meanwhile are dropped."""
+        encode = images.encode
+
+        def encode_while_replaced(*args):
+            Book.objects.filter(pk=self.book.id).update(image="other.png")
+            return encode(*args)
+
+        with patch.object(images, "encode", side_effect=encode_while_replaced):
+            self.assertIsNone(generate_renditions(self.book.id))
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.image_renditions, {})
+
+    def test_upload_generates_renditions_after_response(self):
+        """Test: upload schedules rendition generation for after commit."""
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.create_superuser(
+                email="admin@example.com",
+                password="admin123",
+                first_name="Admin",
+                last_name="User",
+            )
+        )
+        url = reverse("books:books-upload-image", args=[self.book.id])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.post(
+                url, {"image": make_cover(name="new.png")}, format="multipart"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.image_renditions, {})
+
+        with patch.object(images, "executor", ImmediateExecutor()):
+            with patch.object(images, "_generate_in_background", generate_renditions):
+                for callback in callbacks:
+                    callback()
+
+        detail = client.get(reverse("books:books-detail", args=[self.book.id]))
+        thumbnail = detail.data["image_renditions"]["thumbnail_webp"]
+        self.assertTrue(thumbnail["url"].startswith("http://testserver/media/"))
+        self.assertEqual((thumbnail["width"], thumbnail["height"]), (160, 240))
+
+    def test_backfill_command(self):
+        """Test: the command fills in missing renditions."""
+        Book.objects.create(
+            title="No Cover", author="Author", inventory=1, daily_fee=Decimal("1.00")
+        )
+
+        call_command("generate_book_renditions", stdout=StringIO())
+
+        self.book.refresh_from_db()
+        self.assertEqual(len(self.book.image_renditions), 4)
@@ -0,0 +1,235 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.importers import import_books
+from books.models import Book
+from user.models import User
+
+BOOKS_IMPORT_URL = reverse("books:books-bulk-import")
+
+CSV_FEED = (
+    "title,author,cover,inventory,daily_fee\n"
+    "Dune,Frank Herbert,HARD,3,1.50\n"
+    "Emma,Jane Austen,SOFT,0,1.00\n"
+    "Ulysses,James Joyce,SOFT,2,abc\n"
+    '"War, and Peace",Leo Tolstoy,HARD,5,2.00\n'
+)
+
+
+def feed_lines(text):
+    return StringIO(text)
+
+
+class ImportBooksTests(TestCase):
+    def test_csv_rows_are_inserted(self):
+        """Test: valid CSV rows become books."""
+        result = import_books(feed_lines(CSV_FEED), "csv")
+
+        self.assertEqual(result.imported, 2)
+        self.assertEqual(
+            set(Book.objects.values_list("title", flat=True)),
+            {"Dune", "War, and Peace"},
+        )
+        dune = Book.objects.get(title="Dune")
+        self.assertEqual(dune.cover, "HARD")
+        self.assertEqual(dune.daily_fee, Decimal("1.50"))
+
+    def test_invalid_rows_are_reported(self):
+        """Test: invalid rows are reported by line and do not stop the import."""
+        result = import_books(feed_lines(CSV_FEED), "csv")
+
+        self.assertEqual(result.failed, 2)
+        self.assertEqual([error["line"] for error in result.errors], [3, 4])
+        self.assertIn("Inventory must be at least 1", result.errors[0]["errors"])
+        self.assertTrue(result.errors[1]["errors"][0].startswith("daily_fee:"))
+
+    def test_existing_ids_are_updated(self):
+        """Test: rows with a known id update the book in place."""
+        book = Book.objects.create(
+            title="Old", author="Author", inventory=1, daily_fee=Decimal("1.00")
+        )
+        feed = (
+            "id,title,author,inventory,daily_fee\n"
+            f"{book.id},New,Author,7,3.00\n"
+            f"{book.id + 100},Imported,Author,1,1.00\n"
+        )
+
+        result = import_books(feed_lines(feed), "csv")
+
+        self.assertEqual(result.imported, 2)
+        book.refresh_from_db()
+        self.assertEqual((book.title, book.inventory), ("New", 7))
+        created = Book.objects.create(
+            title="After", author="Author", inventory=1, daily_fee=Decimal("1.00")
+        )
+        self.assertGreater(created.id, book.id + 100)
+
+    def test_duplicate_ids_keep_last_row(self):
+        """Test: the last row wins when an id repeats within a chunk."""
+        feed = (
+            "id,title,author,inventory,daily_fee\n"
+            "500,First,Author,1,1.00\n"
+            "500,Second,Author,2,1.00\n"
+        )
+
+        result = import_books(feed_lines(feed), "csv")
+
+        self.assertEqual((result.imported, result.failed), (2, 0))
+        self.assertEqual(Book.objects.get(id=500).title, "Second")
+
+    def test_jsonl_rows(self):
+        """Test: JSON Lines feeds are imported and broken lines reported."""
+        feed = "\n".join([
+            json.dumps({"title": "A", "author": "B", "inventory": 1, "daily_fee": 1.25}),
+            "{not json",
+            json.dumps(["not", "an", "object"]),
+            "",
+        ])
+
+        result = import_books(feed_lines(feed), "jsonl")
+
+        self.assertEqual((result.imported, result.failed), (1, 2))
+        self.assertEqual([error["line"] for error in result.errors], [2, 3])
+        self.assertEqual(Book.objects.get().daily_fee, Decimal("1.25"))
+
+    def test_rows_are_written_in_chunks(self):
+        """Test: each chunk is one INSERT statement."""
+        feed = "title,author,inventory,daily_fee\n" + "".join(
+            f"Book {index},Author,1,1.00\n" for index in range(7)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            result = import_books(feed_lines(feed), "csv", chunk_size=3)
+
+        inserts = [
+            query for query in queries.captured_queries
+            if query["sql"].startswith("INSERT")
+        ]
+        self.assertEqual(result.imported, 7)
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(Book.objects.count(), 7)
+
+    def test_chunks_inside_a_transaction(self):
+        """Test: chunks of new books are not inserted again in an outer atomic()."""
+        feed = "title,author,inventory,daily_fee\n" + "".join(
+            f"Book {index},Author,1,1.00\n" for index in range(7)
+        )
+
+        with transaction.atomic():
+            result = import_books(feed_lines(feed), "csv", chunk_size=3)
+            self.assertEqual(Book.objects.count(), 7)
+
+        self.assertEqual(result.imported, 7)
+        self.assertEqual(
+            sorted(Book.objects.values_list("title", flat=True)),
+            [f"Book {index}" for index in range(7)],
+        )
+
+    def test_catalog_is_invalidated_once(self):
+        """Test: the catalog cache is invalidated once per import."""
+        feed = "title,author,inventory,daily_fee\n" + "".join(
+            f"Book {index},Author,1,1.00\n" for index in range(5)
+        )
+
+        with patch("books.importers.invalidate_catalog") as invalidate:
+            import_books(feed_lines(feed), "csv", chunk_size=2)
+
+        invalidate.assert_called_once_with()
+
+    def test_command_reports_throughput(self):
+        """Test: the command imports a file and prints rows per second."""
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as feed:
+            feed.write(CSV_FEED)
+        self.addCleanup(os.remove, feed.name)
+        stdout, stderr = StringIO(), StringIO()
+
+        call_command("import_books", feed.name, stdout=stdout, stderr=stderr)
+
+        self.assertIn("Imported 2 books, 2 rows failed", stdout.getvalue())
+        self.assertIn("rows/s", stdout.getvalue())
+        self.assertIn("Line 3:", stderr.getvalue())
+
+
+class BookImportEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="admin123",
+            first_name="Admin",
+            last_name="User"
+        )
+
+    def post_feed(self, body, content_type):
+        return self.client.generic(
+            "POST", BOOKS_IMPORT_URL, body.encode(), content_type=content_type
+        )
+
+    def test_import_requires_admin(self):
+        """Test: only admins can import books."""
+        user = User.objects.create_user(
+            email="user@example.com",
+            password="password123",
+            first_name="John",
+            last_name="Doe"
+        )
+        self.client.force_authenticate(user=user)
+
+        response = self.post_feed(CSV_FEED, "text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Book.objects.exists())
+
+    def test_import_csv(self):
+        """Test: the endpoint imports a CSV body and reports errors."""
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.post_feed(CSV_FEED, "text/csv; charset=utf-8")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["imported"], 2)
+        self.assertEqual(response.data["failed"], 2)
+        self.assertEqual(response.data["errors"][0]["line"], 3)
+        self.assertIn("rows_per_second", response.data)
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_import_jsonl(self):
+        """Test: the endpoint imports a JSON Lines body."""
+        self.client.force_authenticate(user=self.admin)
+        body = json.dumps(
+            {"title": "A", "author": "B", "inventory": 1, "daily_fee": "1.00"}
+        )
+
+        response = self.post_feed(body, "application/x-ndjson")
+
+        self.assertEqual(response.data["imported"], 1)
+
+    def test_import_rejects_other_content_types(self):
+        """Test: bodies other than CSV or JSON Lines are refused."""
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.post_feed("{}", "application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_import_requires_body(self):
+        """Test: an empty body is a bad request."""
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.post_feed("", "text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
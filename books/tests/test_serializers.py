@@ -1,9 +1,10 @@
 from decimal import Decimal
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory
 
 
 from books.models import Book
-from books.serializers import BookSerializer
+from books.serializers import BookSerializer, BookValuesSerializer
 
 
 class BookSerializerTest(TestCase):
@@ -21,7 +22,16 @@ class BookSerializerTest(TestCase):
         data = self.serializer.data
         self.assertEqual(
             set(data.keys()),
-            {"id", "title", "author", "cover", "inventory", "daily_fee", "image"}
+            {
+                "id",
+                "title",
+                "author",
+                "cover",
+                "inventory",
+                "daily_fee",
+                "image",
+                "image_renditions",
+            }
         )
 
     def test_serializer_content(self):
@@ -92,4 +102,38 @@ class BookSerializerTest(TestCase):
         serializer = BookSerializer(data=invalid_data)
         self.assertFalse(serializer.is_valid())
         self.assertFalse(serializer.is_valid())
-        self.assertIn("cover", serializer.errors)
\ No newline at end of file
+        self.assertIn("cover", serializer.errors)
+
+
+class BookValuesSerializerTest(TestCase):
+    def setUp(self):
+        self.request = APIRequestFactory().get("/api/books/")
+        self.context = {"request": self.request}
+        Book.objects.create(
+            title="Plain", author="Author", inventory=1, daily_fee=Decimal("1.00")
+        )
+        Book.objects.create(
+            title="Illustrated",
+            author="Author",
+            inventory=2,
+            daily_fee=Decimal("2.50"),
+            image="uploads/books/covers/ab/abc.png",
+            image_renditions={
+                "thumbnail_webp": {
+                    "name": "uploads/books/covers/ab/abc-thumbnail.webp",
+                    "width": 160,
+                    "height": 240,
+                }
+            },
+        )
+
+    def test_matches_model_serializer(self):
+        """Test: values() rows render exactly like BookSerializer."""
+        serializer = BookValuesSerializer(self.context)
+        rows = Book.objects.order_by("id").values(*serializer.lookups())
+
+        expected = BookSerializer(
+            Book.objects.order_by("id"), many=True, context=self.context
+        ).data
+        self.assertEqual(serializer.render_many(rows), expected)
+        self.assertTrue(expected[1]["image"].startswith("http://testserver/"))
@@ -0,0 +1,300 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+from storages.backends.s3 import S3Storage
+
+from books.images import generate_renditions
+from books.models import Book
+from books.uploads import (
+    CoverTooLarge,
+    CoverUploadHandler,
+    content_addressed_name,
+    store_cover,
+)
+from user.models import User
+
+
+def make_cover_bytes(color="navy", size=(300, 450)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def upload_url(book):
+    return reverse("books:books-upload-image", args=[book.id])
+
+
+class S3StandIn:
+    """
+    Minimal in-process S3 endpoint for path-style object requests.
+
+    Every request must carry a SigV4 ``Authorization`` header, and
+    uploads must match their signed ``X-Amz-Content-SHA256``.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.make_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 answers botocore's "Expect: 100-continue" at once.
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def reply(self, code, body=b""):
+                self.send_response(code)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def authorized(self):
+                stand_in.requests.append((self.command, self.path))
+                authorization = self.headers.get("Authorization", "")
+                if not authorization.startswith("AWS4-HMAC-SHA256 "):
+                    self.reply(403)
+                    return False
+                return True
+
+            def do_PUT(self):
+                if not self.authorized():
+                    return
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                signed = self.headers.get("X-Amz-Content-SHA256")
+                if signed != hashlib.sha256(body).hexdigest():
+                    self.reply(400)
+                    return
+                stand_in.objects[self.path] = body
+                self.reply(200)
+
+            def do_GET(self):
+                if not self.authorized():
+                    return
+                if self.path not in stand_in.objects:
+                    self.reply(404)
+                    return
+                self.reply(200, stand_in.objects[self.path])
+
+            do_HEAD = do_GET
+
+            def do_DELETE(self):
+                if self.authorized():
+                    stand_in.objects.pop(self.path, None)
+                    self.reply(204)
+
+        return Handler
+
+
+class CoverUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(self.settings_override.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_superuser(
+                email="admin@example.com",
+                password="admin123",
+                first_name="Admin",
+                last_name="User",
+            )
+        )
+        self.book = Book.objects.create(
+            title="Uploaded Book", author="Author", inventory=2, daily_fee=Decimal("1.00")
+        )
+
+    def upload(self, book, content, name="cover.png"):
+        return self.client.post(
+            upload_url(book),
+            {"image": ContentFile(content, name=name)},
+            format="multipart",
+        )
+
+    def stored_files(self):
+        return [
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(self.media_root)
+            for name in names
+        ]
+
+    def test_upload_uses_content_addressed_name(self):
+        """Test: a cover is stored under its SHA-256 digest."""
+        content = make_cover_bytes()
+
+        response = self.upload(self.book, content, name="My Cover.PNG")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.book.refresh_from_db()
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(self.book.image.name, content_addressed_name(digest, ".png"))
+        with self.book.image.open("rb") as image:
+            self.assertEqual(image.read(), content)
+
+    def test_identical_covers_are_stored_once(self):
+        """Test: two books uploading the same cover share one file."""
+        other = Book.objects.create(
+            title="Other", author="Author", inventory=1, daily_fee=Decimal("1.00")
+        )
+        content = make_cover_bytes()
+
+        self.upload(self.book, content)
+        self.upload(other, content, name="copy.png")
+
+        self.book.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.book.image.name, other.image.name)
+        self.assertEqual(len(self.stored_files()), 1)
+
+    def test_extension_follows_image_signature(self):
+        """Test: the stored extension comes from the content, not the name."""
+        response = self.upload(self.book, make_cover_bytes(), name="cover.jpg")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.book.refresh_from_db()
+        self.assertTrue(self.book.image.name.endswith(".png"))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_large_upload_is_spooled_to_disk(self):
+        """Test: covers above the memory limit stream through a temp file."""
+        content = make_cover_bytes(size=(800, 1200))
+        self.assertGreater(len(content), 1024)
+
+        response = self.upload(self.book, content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.book.refresh_from_db()
+        with self.book.image.open("rb") as image:
+            self.assertEqual(image.read(), content)
+
+    def test_oversized_upload_is_rejected(self):
+        """Test: a cover above the size limit is refused with 413."""
+        content = make_cover_bytes()
+
+        with override_settings(BOOK_COVER_MAX_UPLOAD_SIZE=len(content) - 1):
+            response = self.upload(self.book, content)
+
+        self.assertEqual(
+            response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.book.refresh_from_db()
+        self.assertFalse(self.book.image)
+        self.assertEqual(self.stored_files(), [])
+
+    def test_content_length_is_checked_before_reading(self):
+        """Test: a request body far above the limit is refused up front."""
+        handler = CoverUploadHandler(max_size=1024)
+
+        with self.assertRaises(CoverTooLarge):
+            handler.handle_raw_input(BytesIO(), {}, 10 * 1024 * 1024, b"boundary")
+
+    def test_non_image_is_rejected(self):
+        """Test: content without an image signature is refused with 415."""
+        response = self.upload(self.book, b"#!/bin/sh\necho not a cover\n")
+
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertEqual(self.stored_files(), [])
+
+    def test_truncated_file_is_rejected(self):
+        """Test: a file shorter than any image header is refused."""
+        response = self.upload(self.book, b"\x89PNG")
+
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+
+class S3CoverStorageTests(TestCase):
+    def setUp(self):
+        self.stand_in = S3StandIn()
+        self.stand_in.start()
+        self.addCleanup(self.stand_in.stop)
+
+        self.storage_options = {
+            "bucket_name": "covers",
+            "endpoint_url": self.stand_in.endpoint_url,
+            "access_key": "test-access-key",
+            "secret_key": "test-secret-key",
+            "region_name": "us-east-1",
+            "addressing_style": "path",
+            "querystring_auth": False,
+            "file_overwrite": False,
+        }
+
+    def test_store_cover_deduplicates(self):
+        """Test: storing the same cover twice uploads it once."""
+        storage = S3Storage(**self.storage_options)
+        content = make_cover_bytes()
+
+        first = store_cover(ContentFile(content, name="a.png"), storage)
+        second = store_cover(ContentFile(content, name="b.png"), storage)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.stand_in.objects, {f"/covers/{first}": content})
+        puts = [path for method, path in self.stand_in.requests if method == "PUT"]
+        self.assertEqual(len(puts), 1)
+
+    def test_upload_and_renditions_use_configured_storage(self):
+        """Test: uploads and renditions go to the S3 backend when selected."""
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.create_superuser(
+                email="admin@example.com",
+                password="admin123",
+                first_name="Admin",
+                last_name="User",
+            )
+        )
+        book = Book.objects.create(
+            title="Remote Cover", author="Author", inventory=1, daily_fee=Decimal("1.00")
+        )
+        storages = {
+            "default": {
+                "BACKEND": "storages.backends.s3.S3Storage",
+                "OPTIONS": self.storage_options,
+            },
+        }
+
+        with override_settings(STORAGES=storages):
+            response = client.post(
+                upload_url(book),
+                {"image": ContentFile(make_cover_bytes(), name="cover.png")},
+                format="multipart",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            renditions = generate_renditions(book.id)
+
+        book.refresh_from_db()
+        self.assertIn(f"/covers/{book.image.name}", self.stand_in.objects)
+        for rendition in renditions.values():
+            self.assertIn(f"/covers/{rendition['name']}", self.stand_in.objects)
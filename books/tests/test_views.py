@@ -1,15 +1,25 @@
+from datetime import date, timedelta
 from decimal import Decimal
+from unittest.mock import patch
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.test import TestCase
 
+from books.cache import invalidate_catalog
+from books.filters import BookFilter
 from books.models import Book
+from borrowings.models import Borrowing
 from user.models import User
 from books.serializers import BookSerializer
 
 
 BOOKS_LIST_URL = reverse("books:books-list")
+BOOKS_SUGGEST_URL = reverse("books:books-suggest")
+BOOKS_BULK_URL = reverse("books:books-bulk-update")
 
 
 def get_book_detail_url(book_id):
@@ -44,21 +54,21 @@ class BookAPITests(TestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(BOOKS_LIST_URL)
 
-        books = Book.objects.all()
+        books = Book.objects.order_by("id")
         serializer = BookSerializer(books, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_list_books_unauthenticated(self):
         """Test: unauthenticated user can list books (AllowAny)."""
         response = self.client.get(BOOKS_LIST_URL)
 
-        books = Book.objects.all()
+        books = Book.objects.order_by("id")
         serializer = BookSerializer(books, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_retrieve_book_authenticated(self):
         """Test: authenticated user can retrieve book details."""
@@ -150,3 +160,579 @@ class BookAPITests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertTrue(Book.objects.filter(id=self.book.id).exists())
+
+
+class BookFullTextSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.war_and_peace = Book.objects.create(
+            title="War and Peace",
+            author="Leo Tolstoy",
+            inventory=3,
+            daily_fee=Decimal("1.00")
+        )
+        self.anna_karenina = Book.objects.create(
+            title="Anna Karenina",
+            author="Leo Tolstoy",
+            inventory=3,
+            daily_fee=Decimal("2.00")
+        )
+        self.peace_book = Book.objects.create(
+            title="Essays",
+            author="Peace Pilgrim",
+            inventory=3,
+            daily_fee=Decimal("3.00")
+        )
+
+    def get_ids(self, params):
+        response = self.client.get(BOOKS_LIST_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book["id"] for book in response.data["results"]]
+
+    def test_q_matches_title_and_author_words(self):
+        """Test: q searches both title and author."""
+        self.assertCountEqual(
+            self.get_ids({"q": "tolstoy"}),
+            [self.war_and_peace.id, self.anna_karenina.id],
+        )
+
+    def test_q_requires_every_term(self):
+        """Test: every term of q must match, like the search parameter."""
+        self.assertEqual(
+            self.get_ids({"q": "leo peace"}),
+            [self.war_and_peace.id],
+        )
+
+    def test_q_matches_word_prefixes(self):
+        """Test: q matches the beginning of words."""
+        self.assertEqual(self.get_ids({"q": "karen"}), [self.anna_karenina.id])
+
+    def test_q_orders_by_relevance(self):
+        """Test: title matches rank above author matches."""
+        self.assertEqual(
+            self.get_ids({"q": "peace"}),
+            [self.war_and_peace.id, self.peace_book.id],
+        )
+
+    def test_q_respects_explicit_ordering(self):
+        """Test: an explicit ordering parameter overrides relevance."""
+        self.assertEqual(
+            self.get_ids({"q": "peace", "ordering": "-daily_fee"}),
+            [self.peace_book.id, self.war_and_peace.id],
+        )
+
+    def test_q_ignores_query_syntax(self):
+        """Test: tsquery operators in q are treated as plain text."""
+        self.assertEqual(self.get_ids({"q": "!&|():*"}), [
+            self.war_and_peace.id,
+            self.anna_karenina.id,
+            self.peace_book.id,
+        ])
+
+    def test_search_parameter_still_matches_substrings(self):
+        """Test: the search parameter keeps its substring semantics."""
+        self.assertEqual(self.get_ids({"search": "olsto"}), [
+            self.war_and_peace.id,
+            self.anna_karenina.id,
+        ])
+
+
+class BookTrigramFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tolstoy = Book.objects.create(
+            title="War and Peace",
+            author="Leo Tolstoy",
+            inventory=3,
+            daily_fee=Decimal("1.00")
+        )
+        self.dostoevsky = Book.objects.create(
+            title="The Idiot",
+            author="Fyodor Dostoevsky",
+            inventory=3,
+            daily_fee=Decimal("1.00")
+        )
+        self.chekhov = Book.objects.create(
+            title="The Seagull",
+            author="Anton Chekhov",
+            inventory=3,
+            daily_fee=Decimal("1.00")
+        )
+
+    def get_ids(self, params):
+        response = self.client.get(BOOKS_LIST_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book["id"] for book in response.data["results"]]
+
+    def test_filter_by_several_authors(self):
+        """Test: author filter matches any of the comma-separated names."""
+        self.assertEqual(
+            self.get_ids({"author": "tolst,CHEKH"}),
+            [self.tolstoy.id, self.chekhov.id],
+        )
+
+    def test_filter_by_title_substring(self):
+        """Test: title filter matches substrings case-insensitively."""
+        self.assertEqual(self.get_ids({"title": "SEAG"}), [self.chekhov.id])
+
+    def test_fuzzy_filter_tolerates_misspellings(self):
+        """Test: fuzzy mode matches similar words instead of substrings."""
+        self.assertEqual(self.get_ids({"author": "tolstoi"}), [])
+        self.assertEqual(
+            self.get_ids({"author": "tolstoi,dostoevski", "fuzzy": "true"}),
+            [self.tolstoy.id, self.dostoevsky.id],
+        )
+
+    def test_author_filter_does_not_use_distinct(self):
+        """Test: author filtering adds no DISTINCT to the query."""
+        queryset = BookFilter(
+            {"author": "tolstoy,chekhov,idiot"}, queryset=Book.objects.all()
+        ).qs
+        self.assertNotIn("DISTINCT", str(queryset.query))
+
+    def test_suggest_returns_similar_titles_and_authors(self):
+        """Test: suggest offers "did you mean" hints for misspellings."""
+        response = self.client.get(BOOKS_SUGGEST_URL, {"q": "dostoevski"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["authors"], ["Fyodor Dostoevsky"])
+        self.assertEqual(response.data["titles"], [])
+
+    def test_suggest_without_term(self):
+        """Test: suggest returns empty lists without a term."""
+        response = self.client.get(BOOKS_SUGGEST_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"titles": [], "authors": []})
+
+
+class BookPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for number, fee in enumerate(["2.00", "1.00", "2.00", "3.00", "1.00", "2.00", "1.00"]):
+            Book.objects.create(
+                title=f"Book {number}",
+                author="Author",
+                inventory=1,
+                daily_fee=Decimal(fee)
+            )
+
+    def collect_pages(self, url, params=None, link="next"):
+        ids = []
+        pages = 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages += 1
+            ids.extend(book["id"] for book in response.data["results"])
+            if not response.data[link]:
+                return ids, pages, response
+            response = self.client.get(response.data[link])
+
+    def test_list_is_paginated(self):
+        """Test: list returns the first page with a next link."""
+        response = self.client.get(BOOKS_LIST_URL, {"page_size": 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertIsNotNone(response.data["next"])
+        self.assertIsNone(response.data["previous"])
+
+    def test_next_links_walk_ordering_with_ties(self):
+        """Test: pages follow the ordering and break ties by id."""
+        ids, pages, _ = self.collect_pages(
+            BOOKS_LIST_URL, {"page_size": 2, "ordering": "-daily_fee"}
+        )
+
+        expected = list(
+            Book.objects.order_by("-daily_fee", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 4)
+
+    def test_previous_links_walk_back(self):
+        """Test: previous links return the same rows in the same order."""
+        params = {"page_size": 3, "ordering": "daily_fee"}
+        forward_ids, _, last_page = self.collect_pages(BOOKS_LIST_URL, params)
+
+        backward_ids = []
+        response = last_page
+        while response.data["previous"]:
+            response = self.client.get(response.data["previous"])
+            backward_ids = [
+                book["id"] for book in response.data["results"]
+            ] + backward_ids
+        last_ids = [book["id"] for book in last_page.data["results"]]
+
+        self.assertEqual(backward_ids + last_ids, forward_ids)
+
+    def test_deep_page_is_a_single_query(self):
+        """Test: a page after a cursor costs one query, like the first page."""
+        response = self.client.get(BOOKS_LIST_URL, {"page_size": 2})
+        for _ in range(2):
+            response = self.client.get(response.data["next"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_cursor(self):
+        """Test: a malformed cursor returns 404."""
+        for cursor in ["not-base64", "eyJyIjowLCJwIjpbImEiXX0="]:
+            response = self.client.get(BOOKS_LIST_URL, {"cursor": cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_full_text_search_pages_keep_relevance(self):
+        """Test: paginating q results keeps the relevance ordering."""
+        Book.objects.filter(title="Book 3").update(title="Book Book Book")
+        ids, _, _ = self.collect_pages(
+            BOOKS_LIST_URL, {"q": "book", "page_size": 2}
+        )
+
+        self.assertEqual(len(ids), Book.objects.count())
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids[0], Book.objects.get(title="Book Book Book").id)
+
+
+class BookCatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="admin123",
+            first_name="Admin",
+            last_name="User"
+        )
+        self.book = Book.objects.create(
+            title="Cached Book",
+            author="Author",
+            inventory=5,
+            daily_fee=Decimal("1.00")
+        )
+
+    def test_list_is_served_from_cache(self):
+        """Test: a repeated list request does not touch the database."""
+        first = self.client.get(BOOKS_LIST_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(BOOKS_LIST_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_retrieve_is_served_from_cache(self):
+        """Test: a repeated retrieve request does not touch the database."""
+        self.client.get(get_book_detail_url(self.book.id))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(get_book_detail_url(self.book.id))
+
+        self.assertEqual(response.data["title"], "Cached Book")
+
+    def test_query_parameters_are_cached_separately(self):
+        """Test: different filters are different cache entries."""
+        Book.objects.create(
+            title="Other", author="Author", inventory=1, daily_fee=Decimal("9.00")
+        )
+        self.client.get(BOOKS_LIST_URL)
+
+        response = self.client.get(BOOKS_LIST_URL, {"min_fee": "5"})
+
+        self.assertEqual(
+            [book["title"] for book in response.data["results"]], ["Other"]
+        )
+
+    def test_missing_book_is_not_cached(self):
+        """Test: 404 responses are not cached."""
+        url = get_book_detail_url(self.book.id + 1000)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_update_invalidates_cache(self):
+        """Test: updating a book refreshes cached lists and details."""
+        self.client.get(BOOKS_LIST_URL)
+        self.client.get(get_book_detail_url(self.book.id))
+
+        self.client.force_authenticate(user=self.admin)
+        self.client.patch(get_book_detail_url(self.book.id), {"title": "Renamed"})
+        self.client.force_authenticate(user=None)
+
+        list_response = self.client.get(BOOKS_LIST_URL)
+        detail_response = self.client.get(get_book_detail_url(self.book.id))
+        self.assertEqual(list_response.data["results"][0]["title"], "Renamed")
+        self.assertEqual(detail_response.data["title"], "Renamed")
+
+    def test_delete_invalidates_cache(self):
+        """Test: deleting a book removes it from cached lists."""
+        self.client.get(BOOKS_LIST_URL)
+
+        Book.objects.filter(id=self.book.id).delete()
+
+        response = self.client.get(BOOKS_LIST_URL)
+        self.assertEqual(response.data["results"], [])
+
+    def test_borrowing_invalidates_inventory(self):
+        """Test: borrowing and returning a book refresh its inventory."""
+        url = get_book_detail_url(self.book.id)
+        self.client.get(url)
+
+        borrowing = Borrowing.objects.create(
+            user=self.admin,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=7)
+        )
+        self.assertEqual(self.client.get(url).data["inventory"], 4)
+
+        borrowing.return_book()
+        self.assertEqual(self.client.get(url).data["inventory"], 5)
+
+
+class BookConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.book = Book.objects.create(
+            title="Versioned Book",
+            author="Author",
+            inventory=5,
+            daily_fee=Decimal("1.00")
+        )
+
+    def test_list_and_detail_carry_validators(self):
+        """Test: list and detail responses have ETag and Last-Modified."""
+        for url in (BOOKS_LIST_URL, get_book_detail_url(self.book.id)):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response["ETag"].startswith('"'))
+            self.assertIn("Last-Modified", response)
+
+    def test_if_none_match_returns_not_modified(self):
+        """Test: a matching If-None-Match is answered with 304."""
+        for url in (BOOKS_LIST_URL, get_book_detail_url(self.book.id)):
+            etag = self.client.get(url)["ETag"]
+            cache.clear()
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response["ETag"], etag)
+            self.assertEqual(response.content, b"")
+
+    def test_not_modified_does_not_serialize(self):
+        """Test: a 304 runs a single validator query and no serializer."""
+        url = get_book_detail_url(self.book.id)
+        etag = self.client.get(url)["ETag"]
+        cache.clear()
+
+        with patch.object(BookSerializer, "to_representation") as serialize:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        serialize.assert_not_called()
+
+    def test_cached_not_modified_skips_database(self):
+        """Test: a cached entry answers If-None-Match without queries."""
+        etag = self.client.get(BOOKS_LIST_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(BOOKS_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_returns_not_modified(self):
+        """Test: If-Modified-Since at Last-Modified is answered with 304."""
+        url = get_book_detail_url(self.book.id)
+        last_modified = self.client.get(url)["Last-Modified"]
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_changes_etag(self):
+        """Test: saving a book changes the list and detail ETags."""
+        urls = (BOOKS_LIST_URL, get_book_detail_url(self.book.id))
+        etags = [self.client.get(url)["ETag"] for url in urls]
+
+        self.book.inventory = 4
+        self.book.save()
+
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_query_parameters_change_etag(self):
+        """Test: different pages of the list have different ETags."""
+        Book.objects.create(
+            title="Second", author="Author", inventory=1, daily_fee=Decimal("2.00")
+        )
+        first = self.client.get(BOOKS_LIST_URL, {"page_size": 1})
+        second = self.client.get(first.data["next"])
+
+        self.assertNotEqual(first["ETag"], second["ETag"])
+
+    def test_missing_book_has_no_validators(self):
+        """Test: a missing book is a plain 404."""
+        response = self.client.get(get_book_detail_url(self.book.id + 1000))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", response)
+
+
+class BookBulkUpdateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="admin123",
+            first_name="Admin",
+            last_name="User"
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.books = [
+            Book.objects.create(
+                title=f"Book {index}",
+                author="Author",
+                inventory=5,
+                daily_fee=Decimal("1.00")
+            )
+            for index in range(3)
+        ]
+
+    def patch_books(self, patches):
+        return self.client.patch(BOOKS_BULK_URL, patches, format="json")
+
+    def test_bulk_update_applies_patches(self):
+        """Test: inventory and fee patches are applied with one UPDATE."""
+        first, second, third = self.books
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch_books([
+                {"id": first.id, "inventory": 9},
+                {"id": second.id, "daily_fee": "2.50"},
+                {"id": third.id, "inventory": 1, "daily_fee": "0.75"},
+            ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([book["id"] for book in response.data], [
+            first.id, second.id, third.id
+        ])
+        updates = [
+            query for query in queries.captured_queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            list(Book.objects.order_by("id").values_list("inventory", "daily_fee")),
+            [
+                (9, Decimal("1.00")),
+                (5, Decimal("2.50")),
+                (1, Decimal("0.75")),
+            ],
+        )
+
+    def test_bulk_update_requires_admin(self):
+        """Test: only admins can patch books in bulk."""
+        self.client.force_authenticate(user=None)
+
+        response = self.patch_books([{"id": self.books[0].id, "inventory": 9}])
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_patch_rejects_batch(self):
+        """Test: a patch breaking Book.clean rules rejects the whole batch."""
+        response = self.patch_books([
+            {"id": self.books[0].id, "inventory": 9},
+            {"id": self.books[1].id, "inventory": 0},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Inventory must be at least 1", str(response.data[1]))
+        self.assertFalse(Book.objects.filter(inventory=9).exists())
+
+    def test_unknown_book_rejects_batch(self):
+        """Test: a patch for a missing book rejects the whole batch."""
+        missing_id = self.books[-1].id + 100
+
+        response = self.patch_books([
+            {"id": self.books[0].id, "inventory": 9},
+            {"id": missing_id, "inventory": 2},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(missing_id), response.data["error"])
+        self.assertFalse(Book.objects.filter(inventory=9).exists())
+
+    def test_patch_validation(self):
+        """Test: empty, duplicate and field-less patches are refused."""
+        book_id = self.books[0].id
+        for patches in (
+            [],
+            [{"id": book_id}],
+            [{"id": book_id, "inventory": 2}, {"id": book_id, "inventory": 3}],
+        ):
+            response = self.patch_books(patches)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_invalidates_once(self):
+        """Test: the catalog is invalidated once and lists show new values."""
+        self.client.get(BOOKS_LIST_URL)
+
+        with patch(
+            "books.views.invalidate_catalog", wraps=invalidate_catalog
+        ) as invalidate:
+            self.patch_books([
+                {"id": book.id, "inventory": 7} for book in self.books
+            ])
+
+        invalidate.assert_called_once_with()
+        response = self.client.get(BOOKS_LIST_URL)
+        self.assertEqual(
+            [book["inventory"] for book in response.data["results"]], [7, 7, 7]
+        )
+
+
+class BookSparseFieldsetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.book = Book.objects.create(
+            title="Sparse Book",
+            author="Author",
+            inventory=5,
+            daily_fee=Decimal("1.00")
+        )
+
+    def test_list_returns_selected_fields(self):
+        """Test: `fields` limits the list to the selected fields and columns."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(BOOKS_LIST_URL, {"fields": "id,title"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"], [{"id": self.book.id, "title": "Sparse Book"}]
+        )
+        self.assertNotIn("daily_fee", queries.captured_queries[-1]["sql"])
+
+    def test_retrieve_loads_selected_columns(self):
+        """Test: `fields` on a detail request defers the other columns."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                get_book_detail_url(self.book.id), {"fields": "title"}
+            )
+
+        self.assertEqual(response.data, {"title": "Sparse Book"})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("author", queries.captured_queries[0]["sql"])
+
+    def test_unknown_field_is_rejected(self):
+        """Test: unknown names in `fields` are a bad request."""
+        response = self.client.get(BOOKS_LIST_URL, {"fields": "id,isbn"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
@@ -0,0 +1,163 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile,
+)
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
+
+COVERS_DIRECTORY = "uploads/books/covers"
+HEADER_SIZE = 12
+# Room for the multipart boundaries and part headers around the file.
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class CoverTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Cover image is too large."
+    default_code = "cover_too_large"
+
+
+class UnsupportedCoverType(APIException):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    default_detail = "Cover must be a JPEG, PNG, GIF or WebP image."
+    default_code = "unsupported_cover_type"
+
+
+def detect_cover_extension(header):
+    """File extension for the image format announced by the first bytes."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return ".gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    raise UnsupportedCoverType()
+
+
+def content_addressed_name(digest, extension):
+    return f"{COVERS_DIRECTORY}/{digest[:2]}/{digest}{extension}"
+
+
+class CoverUploadHandler(FileUploadHandler):
+    """
+    Stream an uploaded cover while checking it.
+
+    The request is refused from its Content-Length before the body is
+    read, the image signature is checked on the first chunk and the size
+    on every chunk, so a bad upload is dropped without being buffered.
+    Accepted files are spooled to memory or a temporary file like
+    Django's own handlers, hashed on the way, and named after their
+    SHA-256 digest.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.BOOK_COVER_MAX_UPLOAD_SIZE
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise CoverTooLarge()
+        self.in_memory = content_length <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b""
+        self.extension = None
+        self.hasher = hashlib.sha256()
+        if self.in_memory:
+            self.file = BytesIO()
+        else:
+            self.file = TemporaryUploadedFile(
+                self.file_name,
+                self.content_type,
+                0,
+                self.charset,
+                self.content_type_extra,
+            )
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            raise CoverTooLarge()
+
+        if self.extension is None:
+            self.header += raw_data[:HEADER_SIZE - len(self.header)]
+            if len(self.header) == HEADER_SIZE:
+                self.extension = detect_cover_extension(self.header)
+
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.extension is None:
+            self.extension = detect_cover_extension(self.header)
+
+        digest = self.hasher.hexdigest()
+        name = f"{digest}{self.extension}"
+        self.file.seek(0)
+        if self.in_memory:
+            uploaded = InMemoryUploadedFile(
+                file=self.file,
+                field_name=self.field_name,
+                name=name,
+                content_type=self.content_type,
+                size=file_size,
+                charset=self.charset,
+                content_type_extra=self.content_type_extra,
+            )
+        else:
+            uploaded = self.file
+            uploaded.name = name
+            uploaded.size = file_size
+
+        uploaded.sha256 = digest
+        return uploaded
+
+    def upload_interrupted(self):
+        if isinstance(getattr(self, "file", None), TemporaryUploadedFile):
+            self.file.close()
+
+
+class CoverUploadParser(MultiPartParser):
+    """Multipart parser that streams files through ``CoverUploadHandler``."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context["request"]
+        request.upload_handlers = [CoverUploadHandler(request)]
+        return super().parse(stream, media_type, parser_context)
+
+
+def file_digest(file):
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def store_cover(file, storage=None):
+    """
+    Save a cover under its content-addressed name and return that name.
+
+    Identical covers share one stored file: if the name already exists,
+    nothing is written.
+    """
+    storage = storage or default_storage
+    digest = getattr(file, "sha256", None) or file_digest(file)
+    _, extension = os.path.splitext(file.name)
+    name = content_addressed_name(digest, extension.lower())
+
+    if storage.exists(name):
+        return name
+    return storage.save(name, file)
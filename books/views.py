@@ -1,27 +1,60 @@
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    OpenApiParameter,
+)
 from rest_framework import viewsets, mixins, status
 from rest_framework.filters import SearchFilter, OrderingFilter
-from rest_framework.decorators import action, parser_classes
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAdminUser, AllowAny
 from rest_framework.response import Response
 
-from books.filters import BookFilter
+from books.cache import CatalogCacheMixin, invalidate_catalog
+from books.filters import BookFilter, BookFullTextSearchFilter, suggest_similar
+from books.images import delete_renditions, schedule_renditions
+from books.importers import (
+    CSVFeedParser,
+    CatalogFeed,
+    JSONLinesFeedParser,
+    import_books,
+)
 from books.models import Book
-from books.serializers import BookSerializer, BookImageSerializer
+from books.serializers import (
+    BookSerializer,
+    BookValuesSerializer,
+    BookImageSerializer,
+    BookImportResultSerializer,
+    BookPatchSerializer,
+    BookSuggestionSerializer,
+)
+from books.uploads import CoverUploadParser
+from django_library_service.conditional import ConditionalGetMixin
+from django_library_service.fieldsets import (
+    FIELDSET_PARAMETERS,
+    SparseFieldsetViewMixin,
+)
+from django_library_service.serializers import ValuesListMixin
 
 
 @extend_schema(tags=["book"])
 @extend_schema_view(
     list=extend_schema(
         summary="List of all books.",
-        description="List of  all books.",
+        description="List of  all books. Use `q` for full-text search "
+                    "ranked by relevance.",
+        parameters=FIELDSET_PARAMETERS,
         responses={status.HTTP_200_OK: BookSerializer()},
     ),
     retrieve=extend_schema(
         summary="Retrieve a book by ID.",
         description="Retrieve a book by ID.",
+        parameters=FIELDSET_PARAMETERS,
         responses={status.HTTP_200_OK: BookSerializer()},
     ),
     create=extend_schema(
@@ -46,6 +79,10 @@ from books.serializers import BookSerializer, BookImageSerializer
     )
 )
 class BookViewSet(
+    CatalogCacheMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SparseFieldsetViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.UpdateModelMixin,
@@ -53,30 +90,165 @@ class BookViewSet(
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet
 ):
-    queryset = Book.objects.all()
+    queryset = Book.objects.defer("search_vector")
     serializer_class = BookSerializer
+    values_serializer_class = BookValuesSerializer
     permission_classes = [IsAdminUser]
+    # Queries per request, authentication included
+    # (django_library_service.query_budget).
+    query_budget = {
+        "list": 2,
+        "retrieve": 2,
+        "create": 2,
+        "update": 3,
+        "partial_update": 3,
+        "destroy": 7,
+        "suggest": 3,
+        "bulk_import": None,
+        "bulk_update": 3,
+        "upload_image": 3,
+    }
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [
+        DjangoFilterBackend,
+        SearchFilter,
+        OrderingFilter,
+        BookFullTextSearchFilter,
+    ]
     search_fields = ["title", "author"]
     filterset_class = BookFilter
     ordering_fields = ["id", "title", "author", "inventory", "daily_fee"]
     ordering = ["id"]
 
     def get_permissions(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "suggest"]:
             return [AllowAny()]
         return [permission() for permission in self.permission_classes]
 
     def get_serializer_class(self):
         if self.action == "upload_image":
             return BookImageSerializer
+        if self.action == "suggest":
+            return BookSuggestionSerializer
+        if self.action == "bulk_import":
+            return BookImportResultSerializer
+        if self.action == "bulk_update":
+            return BookPatchSerializer
 
         return BookSerializer
 
+    @extend_schema(
+        summary="Suggest similar titles and authors.",
+        description="Titles and authors containing a word similar to `q`, "
+                    "for \"did you mean\" hints on misspelled searches.",
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                description="Possibly misspelled title or author.",
+                required=True,
+                type=OpenApiTypes.STR,
+            ),
+        ],
+        responses={status.HTTP_200_OK: BookSuggestionSerializer()},
+    )
+    @action(methods=["GET"], detail=False, url_path="suggest")
+    def suggest(self, request):
+        term = request.query_params.get("q", "").strip()
+        suggestions = {"titles": [], "authors": []}
+
+        if term:
+            queryset = Book.objects.all()
+            suggestions = {
+                "titles": suggest_similar(queryset, "title", term),
+                "authors": suggest_similar(queryset, "author", term),
+            }
+
+        serializer = self.get_serializer(suggestions)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Import books from a CSV or JSON Lines feed.",
+        description="Streams the request body (`text/csv` with a header row, "
+                    "or `application/x-ndjson`) with the columns `id`, "
+                    "`title`, `author`, `cover`, `inventory` and "
+                    "`daily_fee`. Rows with an existing `id` are updated, "
+                    "others are inserted. Invalid rows are reported and "
+                    "skipped.",
+        request={
+            "text/csv": OpenApiTypes.STR,
+            "application/x-ndjson": OpenApiTypes.STR,
+        },
+        responses={status.HTTP_200_OK: BookImportResultSerializer()},
+    )
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        parser_classes=[CSVFeedParser, JSONLinesFeedParser],
+    )
+    def bulk_import(self, request):
+        feed = request.data
+        if not isinstance(feed, CatalogFeed):
+            return Response(
+                {"error": "Send a text/csv or application/x-ndjson body."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = import_books(feed.lines, feed.format)
+        serializer = self.get_serializer(result)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Update inventory and fees of many books at once.",
+        description="Takes a list of `{id, inventory?, daily_fee?}` patches "
+                    "(at most 1000) and applies all of them in one "
+                    "transaction, or none if any patch is invalid or "
+                    "names an unknown book.",
+        request=BookPatchSerializer(many=True),
+        responses={status.HTTP_200_OK: BookSerializer(many=True)},
+    )
+    @action(methods=["PATCH"], detail=False, url_path="bulk")
+    def bulk_update(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        patches = {patch["id"]: patch for patch in serializer.validated_data}
+
+        with transaction.atomic():
+            books = list(
+                Book.objects.select_for_update()
+                .defer("search_vector")
+                .filter(id__in=patches)
+                .order_by("id")
+            )
+            missing = sorted(set(patches) - {book.id for book in books})
+            if missing:
+                return Response(
+                    {"error": f"Books not found: {missing}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            now = timezone.now()
+            fields = {"updated_at"}
+            for book in books:
+                patch = patches[book.id]
+                for name in ("inventory", "daily_fee"):
+                    if name in patch:
+                        setattr(book, name, patch[name])
+                        fields.add(name)
+                book.updated_at = now
+            Book.objects.bulk_update(books, sorted(fields))
+
+        invalidate_catalog()
+        return Response(
+            BookSerializer(books, many=True, context=self.get_serializer_context()).data,
+            status=status.HTTP_200_OK,
+        )
+
     @extend_schema(
         summary="Upload a new book.",
-        description="Upload image for a specific book.",
+        description="Upload image for a specific book. Thumbnail and medium "
+                    "WebP/JPEG renditions are generated in the background "
+                    "and appear in `image_renditions` of the book.",
         request=BookImageSerializer,
         responses={status.HTTP_200_OK: BookImageSerializer()},
         methods=["POST"]
@@ -86,14 +258,20 @@ class BookViewSet(
         detail=True,
         url_path="upload-image",
         permission_classes=[IsAdminUser],
+        parser_classes=[CoverUploadParser],
     )
-    @parser_classes([MultiPartParser, FormParser])
     def upload_image(self, request, pk=None):
         book = self.get_object()
         serializer = self.get_serializer(book, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            stale_renditions = book.image_renditions
+            serializer.save(image_renditions={})
+            if stale_renditions:
+                transaction.on_commit(
+                    partial(delete_renditions, book.image.storage, stale_renditions)
+                )
+            schedule_renditions(book)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
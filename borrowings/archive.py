@@ -0,0 +1,74 @@
+"""
+Move old history out of the hot tables.
+
+A borrowing returned before the cutoff whose payments are all PAID is
+moved, with those payments, to ``ArchivedBorrowing`` / ``ArchivedPayment``
+(same ids). ``BorrowingHistory`` / ``PaymentHistory`` read both sides.
+"""
+from django.db import connection, transaction
+
+from borrowings.models import ArchivedBorrowing, Borrowing
+from payments.models import ArchivedPayment, Payment
+
+CHUNK_SIZE = 5_000
+
+SELECT_ARCHIVABLE_SQL = """
+SELECT b.id FROM borrowings_borrowing b
+WHERE b.actual_return_date < %(before)s AND b.id > %(after)s
+  AND NOT EXISTS (
+      SELECT 1 FROM payments_payment p
+      WHERE p.borrowing_id = b.id AND p.status <> 'PAID'
+  )
+ORDER BY b.id
+LIMIT %(limit)s
+FOR UPDATE SKIP LOCKED
+"""
+
+MOVE_SQL = """
+WITH moved AS (
+    DELETE FROM {source} WHERE {key} = ANY(%(ids)s) RETURNING {columns}
+)
+INSERT INTO {target} ({columns}, archived_at)
+SELECT {columns}, NOW() FROM moved
+"""
+
+
+def move_rows(cursor, model, archive_model, key, ids):
+    """Move the rows of ``model`` whose ``key`` is in ``ids``; return count."""
+    columns = ", ".join(
+        connection.ops.quote_name(field.column)
+        for field in model._meta.concrete_fields
+    )
+    cursor.execute(
+        MOVE_SQL.format(
+            source=model._meta.db_table,
+            target=archive_model._meta.db_table,
+            key=key,
+            columns=columns,
+        ),
+        {"ids": ids},
+    )
+    return cursor.rowcount
+
+
+def archive_history(before, chunk_size=CHUNK_SIZE):
+    """
+    Archive borrowings returned before ``before`` and their payments,
+    ``chunk_size`` borrowings per transaction. Yields
+    ``(borrowings, payments)`` moved per chunk.
+    """
+    after = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                SELECT_ARCHIVABLE_SQL,
+                {"before": before, "after": after, "limit": chunk_size},
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return
+            # The foreign keys are deferred: the order only matters at commit.
+            payments = move_rows(cursor, Payment, ArchivedPayment, "borrowing_id", ids)
+            borrowings = move_rows(cursor, Borrowing, ArchivedBorrowing, "id", ids)
+        yield borrowings, payments
+        after = ids[-1]
@@ -0,0 +1,47 @@
+import time
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from borrowings.archive import CHUNK_SIZE, archive_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Move borrowings returned more than --months ago, whose payments "
+        "are all paid, and those payments to the archive tables. They stay "
+        "readable through the API with ?include_archived=true."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=settings.ARCHIVE_AFTER_MONTHS,
+            help="Archive borrowings returned before this many months ago.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Borrowings moved per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        before = date.today() - relativedelta(months=options["months"])
+        started = time.perf_counter()
+        borrowings = payments = 0
+        for moved_borrowings, moved_payments in archive_history(
+            before, options["chunk_size"]
+        ):
+            borrowings += moved_borrowings
+            payments += moved_payments
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{borrowings} borrowings archived")
+
+        self.stdout.write(
+            f"Archived {borrowings} borrowings returned before {before} and "
+            f"{payments} payments in {time.perf_counter() - started:.1f}s."
+        )
@@ -0,0 +1,113 @@
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from books.models import Book
+from borrowings.models import Borrowing
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure checkouts per second of one popular book from a growing "
+        "number of threads, each on its own database connection, and check "
+        "that exactly the copies in stock were taken. The data is deleted "
+        "afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", nargs="+", type=int, default=[1, 4, 16])
+        parser.add_argument("--attempts", type=int, default=2000)
+        parser.add_argument("--inventory", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        attempts, inventory = options["attempts"], options["inventory"]
+        # The threads commit on their own connections: nothing can be
+        # rolled back, so the data is deleted instead.
+        user = User.objects.create_user(
+            email="checkout-benchmark@example.com",
+            password="benchmark",
+            first_name="Bench",
+            last_name="Mark",
+        )
+        book = Book.objects.create(
+            title="Popular Book",
+            author="Author",
+            inventory=inventory,
+            daily_fee=Decimal("1.00"),
+        )
+        self.stdout.write(
+            f"{'threads':>8} {'attempts':>9} {'taken':>6} {'time (ms)':>10} "
+            f"{'checkouts/s':>12}"
+        )
+        try:
+            for threads in sorted(options["threads"]):
+                Borrowing.objects.filter(book=book).delete()
+                Book.objects.filter(pk=book.pk).update(inventory=inventory)
+
+                def checkout():
+                    try:
+                        Borrowing.objects.create(
+                            user=user,
+                            book=book,
+                            expected_return_date=date.today() + timedelta(days=7),
+                        )
+                    except ValidationError:
+                        return False
+                    return True
+
+                results, elapsed = self.run_in_threads(checkout, attempts, threads)
+
+                taken = results.count(True)
+                book.refresh_from_db()
+                if (
+                    taken != min(attempts, inventory)
+                    or book.inventory != inventory - taken
+                    or Borrowing.objects.filter(book=book).count() != taken
+                ):
+                    raise CommandError(
+                        f"{threads} threads: {taken} checkouts left "
+                        f"{book.inventory} of {inventory} copies."
+                    )
+                self.stdout.write(
+                    f"{threads:>8} {attempts:>9} {taken:>6} "
+                    f"{elapsed * 1000:>10.1f} {attempts / elapsed:>12.0f}"
+                )
+        finally:
+            book.delete()
+            user.delete()
+
+    @staticmethod
+    def run_in_threads(task, count, threads):
+        """``([task() results], seconds)`` for ``count`` calls on ``threads``."""
+        remaining = iter(range(count))
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads + 1)
+        results = []
+
+        def worker():
+            barrier.wait()
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    result = task()
+                    with lock:
+                        results.append(result)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        return results, time.perf_counter() - started
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0005_book_image_renditions"),
+        ("borrowings", "0003_borrowing_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BorrowingHistory",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("borrow_date", models.DateField()),
+                ("expected_return_date", models.DateField()),
+                ("actual_return_date", models.DateField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField()),
+                ("archived", models.BooleanField()),
+            ],
+            options={
+                "db_table": "borrowings_borrowinghistory",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedBorrowing",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("borrow_date", models.DateField()),
+                ("expected_return_date", models.DateField()),
+                ("actual_return_date", models.DateField()),
+                ("updated_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField()),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="books.book",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "id"], name="archived_borrowing_user_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(
+            """
+            CREATE VIEW borrowings_borrowinghistory AS
+            SELECT id, user_id, book_id, borrow_date, expected_return_date,
+                   actual_return_date, updated_at, FALSE AS archived
+            FROM borrowings_borrowing
+            UNION ALL
+            SELECT id, user_id, book_id, borrow_date, expected_return_date,
+                   actual_return_date, updated_at, TRUE AS archived
+            FROM borrowings_archivedborrowing
+            """,
+            "DROP VIEW borrowings_borrowinghistory",
+        ),
+    ]
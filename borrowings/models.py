@@ -1,18 +1,34 @@
 from datetime import date
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models, transaction
+from django.utils import timezone
 
 from books.models import Book
 
 FINE_MULT = 2
 
 
+class BorrowingQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(actual_return_date__isnull=True)
+
+    def returned(self):
+        return self.filter(actual_return_date__isnull=False)
+
+    def overdue(self, on=None):
+        """Active borrowings that should have been returned before ``on``."""
+        return self.active().filter(expected_return_date__lt=on or date.today())
+
+
 class Borrowing(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="borrowings",
+        # Covered by borrowing_user_idx, which also serves the ordering.
+        db_index=False,
     )
     book = models.ForeignKey(
         Book,
@@ -22,47 +38,135 @@ class Borrowing(models.Model):
     borrow_date = models.DateField(auto_now_add=True)
     expected_return_date = models.DateField()
     actual_return_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BorrowingQuerySet.as_manager()
+
+    class Meta:
+        # Lists filter by user and/or activity and page by id.
+        indexes = [
+            models.Index(fields=["user", "id"], name="borrowing_user_idx"),
+            models.Index(
+                fields=["user", "id"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_user_active_idx",
+            ),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_idx",
+            ),
+            models.Index(
+                fields=["expected_return_date"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_overdue_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            self.book.inventory -= 1
-            self.book.save()
-        super().save(*args, **kwargs)
+        if self.pk:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            if not Book.objects.filter(pk=self.book_id).take_copy():
+                raise ValidationError("This book is not available now.")
+            super().save(*args, **kwargs)
 
     def return_book(self):
-        if not self.actual_return_date:
-            self.actual_return_date = date.today()
-            self.book.inventory += 1
-            self.book.save()
-            self.save()
+        """
+        Mark the borrowing returned and put the copy back. Returns False
+        when it was already returned, possibly by a concurrent request.
+        """
+        if self.actual_return_date:
+            return False
+
+        today = date.today()
+        with transaction.atomic():
+            returned = Borrowing.objects.filter(
+                pk=self.pk, actual_return_date__isnull=True
+            ).update(actual_return_date=today, updated_at=timezone.now())
+            if returned:
+                Book.objects.filter(pk=self.book_id).return_copy()
+
+        if not returned:
+            self.refresh_from_db(fields=["actual_return_date", "updated_at"])
+            return False
+        self.actual_return_date = today
+        return True
 
     def is_active(self):
         return not self.actual_return_date
 
     @transaction.atomic
     def return_borrowing_with_fine(self, actual_return_date):
-        self.return_book()
+        """Return the book and assess any fine; False if already returned."""
+        if not self.return_book():
+            return False
 
         if self.actual_return_date > self.expected_return_date:
-            days_overdue = (
-                actual_return_date - self.expected_return_date
-            ).days
-            fine_amount = days_overdue * self.book.daily_fee * FINE_MULT
-
-            session_id = create_stripe_payment_session(
-                borrowing=self,
-                request=None
-            )
-
-            from payments.models import Payment
-            Payment.objects.create(
-                user=self.user,
-                borrowing=self,
-                amount=fine_amount,
-                status="Pending",
-                session_url=None,
-                session_id=session_id,
-            )
+            # days_overdue * daily_fee * FINE_MULT, in the open fine the
+            # nightly assess_overdue_fines may already have created.
+            from payments.fines import assess_fine
+            assess_fine(self, on=actual_return_date)
+        return True
+
+    def __str__(self):
+        return f"{self.user} borrowed '{self.book.title}' on {self.borrow_date}"
+
+
+class ArchivedBorrowing(models.Model):
+    """
+    Returned borrowing moved out of ``Borrowing`` by ``archive_history``;
+    keeps its id.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,
+    )
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="+")
+    borrow_date = models.DateField()
+    expected_return_date = models.DateField()
+    actual_return_date = models.DateField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="archived_borrowing_user_idx"),
+        ]
+
+
+class BorrowingHistory(models.Model):
+    """
+    Read-only view of ``Borrowing`` and ``ArchivedBorrowing`` together
+    (``UNION ALL``), for clients asking for the full history.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        related_name="+",
+        db_constraint=False,
+    )
+    book = models.ForeignKey(
+        Book, on_delete=models.DO_NOTHING, related_name="+", db_constraint=False
+    )
+    borrow_date = models.DateField()
+    expected_return_date = models.DateField()
+    actual_return_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField()
+    archived = models.BooleanField()
+
+    objects = BorrowingQuerySet.as_manager()
+
+    class Meta:
+        managed = False
+        db_table = "borrowings_borrowinghistory"
 
     def __str__(self):
         return f"{self.user} borrowed '{self.book.title}' on {self.borrow_date}"
@@ -1,12 +1,15 @@
 from datetime import date
 
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from borrowings.models import Borrowing
-from books.serializers import BookSerializer
+from books.serializers import BookSerializer, BookValuesSerializer
+from django_library_service.fieldsets import SparseFieldsetMixin
+from django_library_service.serializers import ValuesSerializer
 
 
-class BorrowingSerializer(serializers.ModelSerializer):
+class BorrowingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     book = BookSerializer(read_only=True)
 
     class Meta:
@@ -20,6 +23,11 @@ class BorrowingSerializer(serializers.ModelSerializer):
         )
 
 
+class BorrowingValuesSerializer(ValuesSerializer):
+    serializer_class = BorrowingSerializer
+    nested = {"book": BookValuesSerializer}
+
+
 class BorrowingCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Borrowing
@@ -31,6 +39,13 @@ class BorrowingCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("This book is not available now.")
         return attrs
 
+    def create(self, validated_data):
+        # validate() only reads a snapshot; Borrowing.save takes the copy.
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(error.messages)
+
 
 class ReturnBorrowingSerializer(serializers.ModelSerializer):
 
@@ -0,0 +1,192 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.archive import archive_history
+from borrowings.models import ArchivedBorrowing, Borrowing, BorrowingHistory
+from payments.models import ArchivedPayment, Payment
+from user.models import User
+
+BORROWINGS_LIST_URL = reverse("borrowings:borrowing-list")
+PAYMENTS_LIST_URL = reverse("payments:payment_list")
+TODAY = date.today()
+LONG_AGO = TODAY - timedelta(days=800)
+
+
+class ArchiveHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        cls.book = Book.objects.create(
+            title="Test Book", author="Author", inventory=50, daily_fee=Decimal("1.00")
+        )
+
+    def borrow(self, returned=LONG_AGO, payment_status="PAID"):
+        borrowing = Borrowing.objects.bulk_create([
+            Borrowing(
+                user=self.user,
+                book=self.book,
+                expected_return_date=LONG_AGO,
+                actual_return_date=returned,
+            )
+        ])[0]
+        if payment_status:
+            Payment.objects.create(
+                user=self.user,
+                borrowing=borrowing,
+                status=payment_status,
+                type="PAYMENT",
+                amount=Decimal("7.00"),
+                session_id=f"cs_{borrowing.id}",
+            )
+        return borrowing
+
+    def archive(self, chunk_size=100):
+        return list(archive_history(TODAY - timedelta(days=365), chunk_size))
+
+    def test_old_settled_history_is_moved(self):
+        """Test: old returned borrowings and their paid payments move out."""
+        old = self.borrow()
+        payment = Payment.objects.get(borrowing=old)
+
+        self.assertEqual(self.archive(), [(1, 1)])
+
+        self.assertFalse(Borrowing.objects.filter(pk=old.pk).exists())
+        self.assertFalse(Payment.objects.exists())
+        archived = ArchivedBorrowing.objects.get(pk=old.pk)
+        self.assertEqual(archived.actual_return_date, LONG_AGO)
+        self.assertIsNotNone(archived.archived_at)
+        self.assertEqual(ArchivedPayment.objects.get(pk=payment.pk).borrowing, archived)
+
+    def test_hot_rows_stay(self):
+        """Test: active, recent and unpaid borrowings are not archived."""
+        active = self.borrow(returned=None)
+        recent = self.borrow(returned=TODAY - timedelta(days=10))
+        unpaid = self.borrow(payment_status="PENDING")
+
+        self.assertEqual(self.archive(), [])
+
+        self.assertEqual(
+            set(Borrowing.objects.values_list("pk", flat=True)),
+            {active.pk, recent.pk, unpaid.pk},
+        )
+
+    def test_history_is_moved_in_chunks(self):
+        """Test: each chunk is one transaction over the next ids."""
+        for _ in range(5):
+            self.borrow(payment_status=None)
+
+        self.assertEqual(self.archive(chunk_size=2), [(2, 0), (2, 0), (1, 0)])
+        self.assertEqual(ArchivedBorrowing.objects.count(), 5)
+        self.assertEqual(BorrowingHistory.objects.count(), 5)
+
+    def test_command_reports_totals(self):
+        """Test: `archive_history` prints what it moved."""
+        self.borrow()
+        stdout = StringIO()
+
+        call_command("archive_history", months=12, stdout=stdout)
+
+        self.assertIn("Archived 1 borrowings", stdout.getvalue())
+        self.assertIn("and 1 payments", stdout.getvalue())
+
+
+class ArchivedReadsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        self.book = Book.objects.create(
+            title="Test Book", author="Author", inventory=50, daily_fee=Decimal("1.00")
+        )
+        self.old = Borrowing.objects.bulk_create([
+            Borrowing(
+                user=self.user,
+                book=self.book,
+                expected_return_date=LONG_AGO,
+                actual_return_date=LONG_AGO,
+            )
+        ])[0]
+        self.payment = Payment.objects.create(
+            user=self.user,
+            borrowing=self.old,
+            status="PAID",
+            type="PAYMENT",
+            amount=Decimal("7.00"),
+        )
+        self.active = Borrowing.objects.create(
+            user=self.user, book=self.book, expected_return_date=TODAY
+        )
+        list(archive_history(TODAY - timedelta(days=365)))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def ids(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_lists_read_the_hot_tables_by_default(self):
+        """Test: archived records are left out unless asked for."""
+        self.assertEqual(self.ids(BORROWINGS_LIST_URL), [self.active.id])
+        self.assertEqual(self.ids(PAYMENTS_LIST_URL), [])
+
+    def test_include_archived_returns_full_history(self):
+        """Test: ?include_archived=true adds the archived records."""
+        params = {"include_archived": "true"}
+
+        self.assertEqual(
+            sorted(self.ids(BORROWINGS_LIST_URL, params)),
+            [self.old.id, self.active.id],
+        )
+        self.assertEqual(
+            self.ids(BORROWINGS_LIST_URL, {**params, "is_active": "false"}),
+            [self.old.id],
+        )
+        response = self.client.get(PAYMENTS_LIST_URL, params)
+        (payment,) = response.data["results"]
+        self.assertEqual(payment["id"], self.payment.id)
+        self.assertEqual(payment["borrowing"]["id"], self.old.id)
+        self.assertEqual(payment["borrowing"]["book"]["title"], "Test Book")
+
+    def test_archived_detail_needs_include_archived(self):
+        """Test: archived records are found by id in the history only."""
+        url = reverse("borrowings:borrowing-detail", args=[self.old.id])
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url, {"include_archived": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["actual_return_date"], str(LONG_AGO))
+
+        url = reverse("payments:payment-detail", args=[self.payment.id])
+        response = self.client.get(url, {"include_archived": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_other_users_history_stays_hidden(self):
+        """Test: the history view keeps the per-user filtering."""
+        other = User.objects.create_user(
+            email="other@example.com",
+            first_name="Other",
+            last_name="User",
+            password="password123"
+        )
+        self.client.force_authenticate(user=other)
+
+        params = {"include_archived": "true"}
+        self.assertEqual(self.ids(BORROWINGS_LIST_URL, params), [])
+        self.assertEqual(self.ids(PAYMENTS_LIST_URL, params), [])
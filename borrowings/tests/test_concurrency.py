@@ -0,0 +1,127 @@
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+
+from books.models import Book
+from borrowings.models import Borrowing
+from user.models import User
+
+THREADS = 16
+ATTEMPTS = 200
+
+
+class InventoryConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            password="password123",
+            first_name="Test",
+            last_name="User"
+        )
+        self.book = Book.objects.create(
+            title="Popular Book",
+            author="Author",
+            inventory=50,
+            daily_fee=Decimal("1.00")
+        )
+
+    def run_in_threads(self, task, count):
+        """Run ``task(index)`` for ``count`` indexes on THREADS connections."""
+        indexes = iter(range(count))
+        lock = threading.Lock()
+        barrier = threading.Barrier(THREADS + 1)
+        results = [None] * count
+
+        def worker():
+            barrier.wait()
+            try:
+                while True:
+                    with lock:
+                        index = next(indexes, None)
+                    if index is None:
+                        return
+                    results[index] = task(index)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def checkout(self, index):
+        try:
+            Borrowing.objects.create(
+                user=self.user,
+                book=self.book,
+                expected_return_date=date.today() + timedelta(days=7),
+            )
+        except ValidationError:
+            return False
+        return True
+
+    def test_parallel_checkouts_never_oversell(self):
+        """Test: parallel checkouts take exactly the copies in stock."""
+        results = self.run_in_threads(self.checkout, ATTEMPTS)
+
+        self.book.refresh_from_db()
+        self.assertEqual(results.count(True), 50)
+        self.assertEqual(self.book.inventory, 0)
+        self.assertEqual(Borrowing.objects.count(), 50)
+
+    def test_parallel_returns_restock_once(self):
+        """Test: returning the same borrowing concurrently adds one copy."""
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=7),
+        )
+
+        results = self.run_in_threads(
+            lambda index: Borrowing.objects.get(pk=borrowing.pk).return_book(),
+            THREADS,
+        )
+
+        self.book.refresh_from_db()
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(self.book.inventory, 50)
+
+    def test_mixed_checkouts_and_returns(self):
+        """Test: inventory matches active borrowings after a mixed load."""
+        def task(index):
+            if not self.checkout(index):
+                return False
+            if index % 2:
+                Borrowing.objects.filter(
+                    user=self.user, actual_return_date__isnull=True
+                ).first().return_book()
+            return True
+
+        self.run_in_threads(task, ATTEMPTS)
+
+        active = Borrowing.objects.filter(actual_return_date__isnull=True).count()
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory + active, 50)
+
+    def test_benchmark_command(self):
+        """Test: the benchmark reports checkouts per second and cleans up."""
+        stdout = StringIO()
+
+        call_command(
+            "benchmark_checkouts", threads=[4], attempts=40, inventory=30, stdout=stdout
+        )
+
+        header, row = stdout.getvalue().splitlines()
+        self.assertIn("checkouts/s", header)
+        self.assertEqual(row.split()[:3], ["4", "40", "30"])
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertEqual(User.objects.count(), 1)
@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from user.models import User
+
+BORROWINGS_LIST_URL = reverse("borrowings:borrowing-list")
+USERS = 100
+BORROWINGS_PER_USER = 200
+
+
+class BorrowingIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(email=f"reader{number}@example.com", first_name="R", last_name="R")
+            for number in range(USERS)
+        )
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="admin123",
+            first_name="Admin",
+            last_name="User"
+        )
+        books = Book.objects.bulk_create(
+            Book(
+                title=f"Book {number}",
+                author="Author",
+                inventory=10,
+                daily_fee=Decimal("1.00"),
+            )
+            for number in range(50)
+        )
+        today = date.today()
+        # One borrowing in ten is still out, one in ten of those overdue.
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                user=user,
+                book=books[number % len(books)],
+                expected_return_date=today + timedelta(
+                    days=-1 if number % 100 == 0 else 7
+                ),
+                actual_return_date=None if number % 10 == 0 else today,
+            )
+            for user in cls.users
+            for number in range(BORROWINGS_PER_USER)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Borrowing._meta.db_table}")
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, plan):
+        self.assertNotIn("Seq Scan on borrowings_borrowing", plan)
+        self.assertRegex(
+            plan,
+            r"Index (Only )?Scan using \w+ on borrowings_borrowing"
+            r"|Bitmap Index Scan on borrowing_",
+        )
+
+    def list_queries(self, user, params):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(BORROWINGS_LIST_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query["sql"] for query in queries.captured_queries
+            if 'FROM "borrowings_borrowing"' in query["sql"]
+        ]
+
+    def test_list_queries_use_indexes(self):
+        """Test: every get_queryset filter combination is an index scan."""
+        reader = self.users[0]
+        cases = [
+            (reader, {}),
+            (reader, {"is_active": "true"}),
+            (reader, {"is_active": "false"}),
+            (self.admin, {}),
+            (self.admin, {"is_active": "true"}),
+            (self.admin, {"is_active": "false"}),
+            (self.admin, {"user_id": reader.id}),
+            (self.admin, {"user_id": reader.id, "is_active": "true"}),
+        ]
+        for user, params in cases:
+            with self.subTest(staff=user.is_staff, **params):
+                sql_queries = self.list_queries(user, params)
+                self.assertTrue(sql_queries)
+                for sql in sql_queries:
+                    self.assertUsesIndex(self.explain(sql))
+
+    def test_active_lists_use_partial_indexes(self):
+        """Test: active borrowings are read from the partial indexes."""
+        (sql,) = self.list_queries(self.users[0], {"is_active": "true"})
+        self.assertIn("borrowing_user_active_idx", self.explain(sql))
+
+        (sql,) = self.list_queries(self.admin, {"is_active": "true"})
+        self.assertIn("borrowing_active_idx", self.explain(sql))
+
+    def test_overdue_uses_partial_index(self):
+        """Test: overdue borrowings are found through borrowing_overdue_idx."""
+        plan = Borrowing.objects.overdue().explain()
+
+        self.assertIn("borrowing_overdue_idx", plan)
+        self.assertNotIn("Seq Scan on borrowings_borrowing", plan)
@@ -1,6 +1,7 @@
 from datetime import date, timedelta
 from decimal import Decimal
 
+from django.core.exceptions import ValidationError
 from django.test import TestCase
 
 from books.models import Book
@@ -72,3 +73,37 @@ class BorrowingModelTest(TestCase):
         )
         expected_str = f"{self.user} borrowed '{self.book.title}' on {borrowing.borrow_date}"
         self.assertEqual(str(borrowing), expected_str)
+
+    def test_borrowing_without_copies_left_is_refused(self):
+        """Test: the last copy cannot be borrowed twice."""
+        Book.objects.filter(pk=self.book.pk).update(inventory=1)
+        Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=self.expected_return_date
+        )
+
+        with self.assertRaises(ValidationError):
+            Borrowing.objects.create(
+                user=self.user,
+                book=self.book,
+                expected_return_date=self.expected_return_date
+            )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+        self.assertEqual(Borrowing.objects.count(), 1)
+
+    def test_return_book_twice_restocks_once(self):
+        """Test: a second return of the same borrowing is a no-op."""
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=self.expected_return_date
+        )
+        stale = Borrowing.objects.get(pk=borrowing.pk)
+
+        self.assertTrue(borrowing.return_book())
+        self.assertFalse(stale.return_book())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 5)
+        self.assertEqual(stale.actual_return_date, date.today())
@@ -1,4 +1,7 @@
 from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
 
 from rest_framework.exceptions import ValidationError
 from rest_framework.test import APITestCase
@@ -8,6 +11,7 @@ from books.models import Book
 from user.models import User
 from borrowings.serializers import (
     BorrowingSerializer,
+    BorrowingValuesSerializer,
     BorrowingCreateSerializer,
     ReturnBorrowingSerializer,
 )
@@ -111,3 +115,43 @@ class ReturnBorrowingSerializerTests(APITestCase):
         serializer = ReturnBorrowingSerializer(instance=self.borrowing, data={})
         with self.assertRaises(ValidationError):
             serializer.is_valid(raise_exception=True)
+
+
+class BorrowingValuesSerializerTests(APITestCase):
+    def test_matches_model_serializer(self):
+        """Test: values() rows render exactly like BorrowingSerializer."""
+        user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        book = Book.objects.create(
+            title="Test Book", author="Author", inventory=5, daily_fee=5.00
+        )
+        Borrowing.objects.create(
+            user=user, book=book, expected_return_date=date.today()
+        )
+        Borrowing.objects.create(
+            user=user,
+            book=book,
+            expected_return_date=date.today() + timedelta(days=3),
+            actual_return_date=date.today(),
+        )
+        serializer = BorrowingValuesSerializer()
+        queryset = Borrowing.objects.order_by("id")
+
+        self.assertEqual(
+            serializer.render_many(queryset.values(*serializer.lookups())),
+            BorrowingSerializer(queryset, many=True).data,
+        )
+
+    def test_benchmark_command(self):
+        """Test: the benchmark checks both paths agree and reports timings."""
+        stdout = StringIO()
+
+        call_command("benchmark_serializers", rows=20, repeat=1, stdout=stdout)
+
+        for name in ("books", "borrowings", "payments"):
+            self.assertIn(name, stdout.getvalue())
+        self.assertFalse(Book.objects.exists())
@@ -1,10 +1,15 @@
 from datetime import date, timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
 from borrowings.models import Borrowing
 from books.models import Book
+from lib_bot.models import Notification
 from user.models import User
 
 
@@ -41,7 +46,7 @@ class BorrowingViewSetTests(APITestCase):
         )
         response = self.client.get(BORROWINGS_LIST_URL)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_admin_can_filter_by_user_id(self):
         Borrowing.objects.create(
@@ -52,7 +57,7 @@ class BorrowingViewSetTests(APITestCase):
         self.client.force_authenticate(user=self.admin_user)
         response = self.client.get(f"{BORROWINGS_LIST_URL}?user_id={self.user.id}")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_create_borrowing_successfully(self):
         payload = {
@@ -95,6 +100,51 @@ class BorrowingViewSetTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data["error"], "This book has already been returned.")
 
+    def test_return_lost_to_a_concurrent_request(self):
+        """Test: the request that loses the race is refused and not announced."""
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=7)
+        )
+        return_book = Borrowing.return_book
+
+        def returned_meanwhile(instance):
+            Borrowing.objects.filter(pk=instance.pk).update(
+                actual_return_date=date.today()
+            )
+            return return_book(instance)
+
+        with mock.patch.object(
+            Borrowing, "return_book", autospec=True, side_effect=returned_meanwhile
+        ):
+            response = self.client.post(
+                f"{get_borrowing_detail_url(borrowing.id)}return/"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "This book has already been returned.")
+        self.assertFalse(
+            Notification.objects.filter(kind="BORROWING_RETURNED").exists()
+        )
+
+    def test_notifications_escape_user_data(self):
+        """Test: titles and emails are escaped in the HTML notification."""
+        self.book.title = "Tom & <Jerry>"
+        self.book.save()
+        payload = {
+            "expected_return_date": date.today() + timedelta(days=7),
+            "book": self.book.id,
+        }
+
+        response = self.client.post(BORROWINGS_LIST_URL, payload, format="json")
+        self.client.post(f"{get_borrowing_detail_url(response.data['id'])}return/")
+
+        self.assertEqual(Notification.objects.count(), 2)
+        for notification in Notification.objects.all():
+            with self.subTest(kind=notification.kind):
+                self.assertIn("Book: Tom &amp; &lt;Jerry&gt;", notification.text)
+
     def test_is_active_filter(self):
         Borrowing.objects.create(
             user=self.user,
@@ -109,5 +159,93 @@ class BorrowingViewSetTests(APITestCase):
         )
         active_resp = self.client.get(f"{BORROWINGS_LIST_URL}?is_active=true")
         returned_resp = self.client.get(f"{BORROWINGS_LIST_URL}?is_active=false")
-        self.assertEqual(len(active_resp.data), 1)
-        self.assertEqual(len(returned_resp.data), 1)
+        self.assertEqual(len(active_resp.data["results"]), 1)
+        self.assertEqual(len(returned_resp.data["results"]), 1)
+
+    def test_list_not_modified_until_book_changes(self):
+        """Test: the borrowing ETag follows the embedded book."""
+        Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=7)
+        )
+        etag = self.client.get(BORROWINGS_LIST_URL)["ETag"]
+
+        response = self.client.get(BORROWINGS_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.book.title = "Renamed Book"
+        self.book.save()
+        response = self.client.get(BORROWINGS_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified_until_returned(self):
+        """Test: returning a borrowing changes its detail ETag."""
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=7)
+        )
+        url = get_borrowing_detail_url(borrowing.id)
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        borrowing.return_book()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class BorrowingSparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="password123",
+            first_name="Test", last_name="User"
+        )
+        self.book = Book.objects.create(
+            title="Test Book", author="Author",
+            inventory=5, daily_fee=5.00
+        )
+        self.borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=7)
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_collapsed_book_is_not_joined(self):
+        """Test: without the book in `expand` the list returns its id, no join."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(BORROWINGS_LIST_URL, {"expand": ""})
+
+        self.assertEqual(response.data["results"][0]["book"], self.book.id)
+        self.assertNotIn("books_book", queries.captured_queries[-1]["sql"])
+
+    def test_nested_fields(self):
+        """Test: dotted `fields` select fields of the nested book."""
+        response = self.client.get(
+            get_borrowing_detail_url(self.borrowing.id),
+            {"fields": "id,book.title"},
+        )
+
+        self.assertEqual(
+            response.data, {"id": self.borrowing.id, "book": {"title": "Test Book"}}
+        )
+
+    def test_retrieve_collapsed_book(self):
+        """Test: a detail request with `expand` collapses and skips the book."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                get_borrowing_detail_url(self.borrowing.id), {"expand": ""}
+            )
+
+        self.assertEqual(response.data["book"], self.book.id)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("books_book", queries.captured_queries[0]["sql"])
+
+    def test_unknown_expand_is_rejected(self):
+        """Test: only nested objects can be expanded."""
+        response = self.client.get(BORROWINGS_LIST_URL, {"expand": "user"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,5 +1,8 @@
+import html
 from datetime import date
 
+from django.conf import settings
+from django.db import transaction
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter, extend_schema_view
 from rest_framework import viewsets, status
@@ -7,14 +10,25 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, BorrowingHistory
 from borrowings.serializers import (
     BorrowingSerializer,
+    BorrowingValuesSerializer,
     BorrowingCreateSerializer,
     ReturnBorrowingSerializer
 )
-from lib_bot.bot import send_telegram_message
-from payments.utils import create_stripe_payment_session
+from django_library_service.archive import (
+    INCLUDE_ARCHIVED_PARAMETER,
+    ArchiveViewMixin,
+)
+from django_library_service.conditional import ConditionalGetMixin
+from django_library_service.fieldsets import (
+    FIELDSET_PARAMETERS,
+    SparseFieldsetViewMixin,
+)
+from django_library_service.serializers import ValuesListMixin
+from lib_bot.outbox import notify
+from payments.utils import create_pending_payment, create_stripe_payment_session
 
 
 @extend_schema(tags=["borrowings"])
@@ -35,12 +49,15 @@ from payments.utils import create_stripe_payment_session
                 required=False,
                 type=OpenApiTypes.BOOL,
             ),
+            INCLUDE_ARCHIVED_PARAMETER,
+            *FIELDSET_PARAMETERS,
         ],
         responses={status.HTTP_200_OK: BorrowingSerializer()},
     ),
     retrieve=extend_schema(
         summary="Retrieve all borrowings by ID.",
         description="Retrieve all borrowings by ID.",
+        parameters=[INCLUDE_ARCHIVED_PARAMETER, *FIELDSET_PARAMETERS],
         responses={status.HTTP_200_OK: BorrowingSerializer()},
     ),
     create=extend_schema(
@@ -49,9 +66,28 @@ from payments.utils import create_stripe_payment_session
         responses={status.HTTP_201_CREATED: BorrowingSerializer()},
     ),
 )
-class BorrowingViewSet(viewsets.ModelViewSet):
+class BorrowingViewSet(
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SparseFieldsetViewMixin,
+    ArchiveViewMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Borrowing.objects.select_related("user", "book").all()
+    history_queryset = BorrowingHistory.objects.select_related("user", "book")
     permission_classes = [IsAuthenticated]
+    etag_fields = ("updated_at", "book__updated_at")
+    values_serializer_class = BorrowingValuesSerializer
+    query_budget = {
+        "list": 2,
+        "retrieve": 2,
+        # 6 with STRIPE_LAZY_CHECKOUT
+        "create": 8,
+        "update": 3,
+        "partial_update": 3,
+        "destroy": 4,
+        "return_borrowing": 5,
+    }
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -62,6 +98,12 @@ class BorrowingViewSet(viewsets.ModelViewSet):
             return ReturnBorrowingSerializer
         return BorrowingSerializer
 
+    def get_etag_fields(self):
+        # The book only versions the response while some of it is rendered.
+        if any(lookup.startswith("book__") for lookup in self.get_fieldset_lookups()):
+            return self.etag_fields
+        return ("updated_at",)
+
     def get_queryset(self):
         user = self.request.user
         queryset = super().get_queryset()
@@ -74,9 +116,9 @@ class BorrowingViewSet(viewsets.ModelViewSet):
 
         if is_active is not None:
             if is_active.lower() == "true":
-                queryset = queryset.filter(actual_return_date__isnull=True)
+                queryset = queryset.active()
             elif is_active.lower() == "false":
-                queryset = queryset.filter(actual_return_date__isnull=False)
+                queryset = queryset.returned()
 
         if user.is_staff and user_id:
             queryset = queryset.filter(user__id=user_id)
@@ -89,18 +131,21 @@ class BorrowingViewSet(viewsets.ModelViewSet):
         if not user.is_staff:
             serializer.validated_data["user"] = user
 
-        borrowing = serializer.save()
+        with transaction.atomic():
+            borrowing = serializer.save()
+            if settings.STRIPE_LAZY_CHECKOUT:
+                # The Stripe session is created when the user asks to pay.
+                create_pending_payment(borrowing)
+            notify(
+                "BORROWING_CREATED",
+                f"User: {html.escape(borrowing.user.email)}\n"
+                f"Book: {html.escape(borrowing.book.title)}\n"
+                f"Borrowed: {borrowing.borrow_date}\n"
+                f"Return by: {borrowing.expected_return_date}"
+            )
 
-        create_stripe_payment_session(borrowing, self.request)
-
-        message = (
-            f"<b> New Borrowing</b>\n"
-            f"User: {borrowing.user.email}\n"
-            f"Book: {borrowing.book.title}\n"
-            f"Borrowed: {borrowing.borrow_date}\n"
-            f"Return by: {borrowing.expected_return_date}\n"
-        )
-        send_telegram_message(message)
+        if not settings.STRIPE_LAZY_CHECKOUT:
+            create_stripe_payment_session(borrowing, self.request)
 
     @extend_schema(
         summary="Return a borrowed book by ID.",
@@ -130,16 +175,22 @@ class BorrowingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        borrowing.return_borrowing_with_fine(actual_return_date=date.today())
-
-        message = (
-            f"<b>Book Returned</b>\n"
-            f"User: {borrowing.user.email}\n"
-            f"Book: {borrowing.book.title}\n"
-            f"Borrowed: {borrowing.borrow_date}\n"
-            f"Returned: {borrowing.actual_return_date}"
-        )
-        send_telegram_message(message)
+        with transaction.atomic():
+            if not borrowing.return_borrowing_with_fine(
+                actual_return_date=date.today()
+            ):
+                # A concurrent request returned it first.
+                return Response(
+                    {"error": "This book has already been returned."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            notify(
+                "BORROWING_RETURNED",
+                f"User: {html.escape(borrowing.user.email)}\n"
+                f"Book: {html.escape(borrowing.book.title)}\n"
+                f"Borrowed: {borrowing.borrow_date}\n"
+                f"Returned: {borrowing.actual_return_date}"
+            )
 
         return Response(
             {"detail": "Borrowing successfully returned."},
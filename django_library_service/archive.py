@@ -0,0 +1,34 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+
+INCLUDE_ARCHIVED_PARAMETER = OpenApiParameter(
+    name="include_archived",
+    description="Also return records moved to the archive ('true' or 'false').",
+    required=False,
+    type=OpenApiTypes.BOOL,
+)
+
+
+class ArchiveViewMixin:
+    """
+    Read ``history_queryset`` (live and archived rows) instead of
+    ``queryset`` on GET requests with ``?include_archived=true``.
+
+    Goes right before the DRF generic view in the bases, so the other
+    mixins and the view's own filters apply on top.
+    """
+
+    history_queryset = None
+
+    def include_archived(self):
+        request = getattr(self, "request", None)
+        return (
+            request is not None
+            and request.method in ("GET", "HEAD")
+            and request.query_params.get("include_archived", "").lower() == "true"
+        )
+
+    def get_queryset(self):
+        if self.include_archived():
+            return self.history_queryset.all()
+        return super().get_queryset()
@@ -0,0 +1,135 @@
+import hashlib
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+PRECONDITION_HEADERS = (
+    "HTTP_IF_MATCH",
+    "HTTP_IF_NONE_MATCH",
+    "HTTP_IF_MODIFIED_SINCE",
+    "HTTP_IF_UNMODIFIED_SINCE",
+)
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified for ``list`` and ``retrieve``.
+
+    The validators are built from the ``etag_fields`` timestamps of the
+    rows in the response. Requests carrying preconditions first read just
+    those columns (the current page, or the single object) and get a 304
+    without serializing anything; other requests compute the validators
+    from the objects that are serialized anyway.
+    """
+
+    etag_fields = ("updated_at",)
+
+    def list(self, request, *args, **kwargs):
+        if not self.has_preconditions(request):
+            response = super().list(request, *args, **kwargs)
+            page = getattr(self.paginator, "page", None)
+            if page is None:
+                return response
+            versions = self.get_object_versions(page) + [
+                (self.paginator.has_previous, self.paginator.has_next)
+            ]
+            return self.set_validators(request, response, versions)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        versions = self.get_page_versions(request, queryset)
+        return self.get_conditional_response(
+            request, versions, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.has_preconditions(request):
+            instance = self.get_object()
+            response = Response(self.get_serializer(instance).data)
+            return self.set_validators(
+                request, response, self.get_object_versions([instance])
+            )
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            versions = list(
+                queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .values_list("pk", *self.get_etag_fields())[:1]
+            )
+        except (TypeError, ValueError, ValidationError):
+            versions = []
+
+        if not versions:
+            raise Http404
+        return self.get_conditional_response(
+            request, versions, super().retrieve, *args, **kwargs
+        )
+
+    @staticmethod
+    def has_preconditions(request):
+        return any(header in request.META for header in PRECONDITION_HEADERS)
+
+    def get_etag_fields(self):
+        return self.etag_fields
+
+    def get_object_versions(self, objects):
+        fields = ("pk", *self.get_etag_fields())
+        if objects and isinstance(objects[0], dict):
+            # values() rows, see ValuesListMixin
+            return [tuple(row[field] for field in fields) for row in objects]
+
+        getters = [attrgetter(field.replace("__", ".")) for field in fields]
+        return [tuple(getter(obj) for getter in getters) for obj in objects]
+
+    def get_page_versions(self, request, queryset):
+        fields = ("pk", *self.get_etag_fields())
+        if self.pagination_class is None:
+            return list(queryset.values_list(*fields))
+
+        paginator = self.pagination_class()
+        ordering = paginator.get_ordering(request, queryset, self)
+        ordering_fields = [
+            field.lstrip("-") for field in ordering
+            if field.lstrip("-") not in fields
+        ]
+        page = paginator.paginate_queryset(
+            queryset.values(*fields, *ordering_fields), request, view=self
+        )
+        versions = [tuple(row[field] for field in fields) for row in page]
+        return versions + [(paginator.has_previous, paginator.has_next)]
+
+    def get_validators(self, request, versions):
+        timestamps = [
+            value for row in versions for value in row[1:]
+            if hasattr(value, "timestamp")
+        ]
+        last_modified = int(max(timestamps).timestamp()) if timestamps else None
+        fingerprint = repr((
+            request.build_absolute_uri(),
+            request.accepted_renderer.format,
+            versions,
+        ))
+        etag = quote_etag(hashlib.sha256(fingerprint.encode()).hexdigest())
+        return etag, last_modified
+
+    def set_validators(self, request, response, versions):
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            etag, last_modified = self.get_validators(request, versions)
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def get_conditional_response(self, request, versions, handler, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, versions)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self.set_validators(request, response, versions)
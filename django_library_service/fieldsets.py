@@ -0,0 +1,139 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+
+from django_library_service import timing
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        description=(
+            "Comma-separated fields to return; nested fields are addressed "
+            "with dots, e.g. `id,book.title`."
+        ),
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+    OpenApiParameter(
+        name="expand",
+        description=(
+            "Comma-separated nested objects to expand, e.g. `borrowing.book`. "
+            "When given, nested objects not listed are returned as their id."
+        ),
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+]
+
+
+def parse_fieldset(value):
+    """``"id,book.title"`` -> ``{"id": {}, "book": {"title": {}}}``."""
+    if value is None:
+        return None
+
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in path.strip().split("."):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldsetMixin:
+    """
+    Honour the ``fields`` / ``expand`` trees put in the serializer context
+    by ``SparseFieldsetViewMixin``.
+
+    Nested serializers look up their own branch by their path from the
+    root. Without ``expand`` everything nested is expanded as before; with
+    it, nested serializers not listed become primary keys.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        path = self.get_field_path()
+        nested = {
+            name: field for name, field in fields.items()
+            if isinstance(field, SparseFieldsetMixin)
+        }
+
+        selected = self.context.get("fields")
+        for name in path:
+            selected = selected and selected.get(name)
+        if selected:
+            self.check_names("fields", selected, fields)
+            fields = {
+                name: field for name, field in fields.items() if name in selected
+            }
+
+        expand = self.context.get("expand")
+        for name in path:
+            expand = None if expand is None else expand.get(name, {})
+        if expand is not None:
+            self.check_names("expand", expand, nested)
+            for name, field in nested.items():
+                if name in fields and name not in expand:
+                    fields[name] = serializers.PrimaryKeyRelatedField(
+                        source=field.source, read_only=True
+                    )
+        return fields
+
+    def to_representation(self, instance):
+        with timing.phase("serialize"):
+            return super().to_representation(instance)
+
+    def get_field_path(self):
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return path[::-1]
+
+    @staticmethod
+    def check_names(parameter, tree, fields):
+        unknown = sorted(set(tree) - set(fields))
+        if unknown:
+            raise serializers.ValidationError(
+                {parameter: f"Unknown field(s): {', '.join(unknown)}."}
+            )
+
+
+class SparseFieldsetViewMixin:
+    """
+    Read ``?fields=`` and ``?expand=`` into the serializer context and load
+    only what the response needs: ``list`` and ``retrieve`` select the
+    columns and joins listed by ``values_serializer_class``.
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        request = getattr(self, "request", None)
+        if request is not None:
+            context["fields"] = parse_fieldset(request.query_params.get("fields"))
+            context["expand"] = parse_fieldset(request.query_params.get("expand"))
+        return context
+
+    def get_fieldset_lookups(self):
+        """``values()`` lookups of the fields this request renders."""
+        if not hasattr(self, "_fieldset_lookups"):
+            self._fieldset_lookups = self.values_serializer_class(
+                context=self.get_serializer_context()
+            ).lookups()
+        return self._fieldset_lookups
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is None or self.request.method not in ("GET", "HEAD"):
+            return queryset
+
+        etag_fields = getattr(self, "get_etag_fields", tuple)()
+        lookups = ["pk", *etag_fields, *self.get_fieldset_lookups()]
+        relations = {
+            lookup.rsplit("__", 1)[0] for lookup in lookups if "__" in lookup
+        }
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*lookups)
@@ -0,0 +1,204 @@
+"""
+Outbound HTTP to third-party providers (Stripe, Telegram).
+
+``get_session(provider)`` returns one keep-alive ``requests.Session`` per
+provider, shared by all threads of the process. Every request made
+through it gets:
+
+* at most ``OUTBOUND_HTTP_POOL_SIZE`` kept-alive connections per host;
+  when they are all busy a request waits up to
+  ``OUTBOUND_HTTP_POOL_TIMEOUT`` seconds for one, then fails with
+  ``PoolExhaustedError`` without being sent;
+* default connect / read timeouts;
+* retries with jittered exponential backoff: connection failures always
+  (nothing was sent), read errors and 502/503/504 only for idempotent
+  methods;
+* a circuit breaker: after ``OUTBOUND_HTTP_BREAKER_THRESHOLD`` failures in
+  a row, requests fail at once with ``CircuitOpenError`` for
+  ``OUTBOUND_HTTP_BREAKER_RESET`` seconds, then one trial request decides
+  whether to close it again;
+* the ``library_outbound_*`` metrics (``django_library_service.metrics``)
+  and the provider's phase in the ``Server-Timing`` of the current request.
+"""
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+from urllib3.util.retry import Retry
+
+from django_library_service import metrics, timing
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """The provider failed too often recently; the request was not sent."""
+
+
+class PoolExhaustedError(requests.ConnectionError):
+    """Every connection to the provider stayed busy; the request was not sent."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def before_request(self):
+        """Raise ``CircuitOpenError`` unless a request may be sent now."""
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "open" or self.trial_in_flight:
+                raise CircuitOpenError("Circuit breaker is open.")
+            self.trial_in_flight = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self.trial_in_flight = False
+
+
+class BoundedWaitMixin:
+    """
+    Wait at most ``OUTBOUND_HTTP_POOL_TIMEOUT`` for a free connection of a
+    blocking pool: ``requests`` passes no ``pool_timeout``, which waits
+    forever.
+    """
+
+    def urlopen(self, method, url, *args, pool_timeout=None, **kwargs):
+        if pool_timeout is None:
+            pool_timeout = settings.OUTBOUND_HTTP_POOL_TIMEOUT
+        return super().urlopen(method, url, *args, pool_timeout=pool_timeout, **kwargs)
+
+
+class BoundedWaitHTTPConnectionPool(BoundedWaitMixin, HTTPConnectionPool):
+    pass
+
+
+class BoundedWaitHTTPSConnectionPool(BoundedWaitMixin, HTTPSConnectionPool):
+    pass
+
+
+class ProviderAdapter(HTTPAdapter):
+    """``HTTPAdapter`` adding default timeouts, the breaker and metrics."""
+
+    def __init__(self, provider, timeout, breaker, **kwargs):
+        self.provider = provider
+        self.timeout = timeout
+        self.breaker = breaker
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": BoundedWaitHTTPConnectionPool,
+            "https": BoundedWaitHTTPSConnectionPool,
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        try:
+            self.breaker.before_request()
+        except CircuitOpenError:
+            metrics.OUTBOUND_REJECTED.inc(provider=self.provider)
+            raise
+
+        started = time.perf_counter()
+        try:
+            response = super().send(request, timeout=timeout or self.timeout, **kwargs)
+        except EmptyPoolError:
+            # Busy here, not failing there: the breaker is left alone.
+            metrics.OUTBOUND_REJECTED.inc(provider=self.provider)
+            error = PoolExhaustedError(f"No free connection to {self.provider}.")
+            raise error from None
+        except requests.RequestException:
+            self.finish(started, failed=True)
+            raise
+        self.finish(started, failed=response.status_code >= 500)
+        return response
+
+    def finish(self, started, failed):
+        elapsed = time.perf_counter() - started
+        metrics.OUTBOUND_DURATION.observe(elapsed, provider=self.provider)
+        if failed:
+            metrics.OUTBOUND_FAILURES.inc(provider=self.provider)
+        timing.record(self.provider, elapsed)
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        logger.debug(
+            "%s request took %.3fs%s",
+            self.provider, elapsed, " (failed)" if failed else "",
+        )
+
+
+class ProviderSession(requests.Session):
+    def __init__(self, provider):
+        super().__init__()
+        self.provider = provider
+        self.breaker = CircuitBreaker(
+            settings.OUTBOUND_HTTP_BREAKER_THRESHOLD,
+            settings.OUTBOUND_HTTP_BREAKER_RESET,
+        )
+        retries = settings.OUTBOUND_HTTP_RETRIES
+        adapter = ProviderAdapter(
+            provider,
+            timeout=(
+                settings.OUTBOUND_HTTP_CONNECT_TIMEOUT,
+                settings.OUTBOUND_HTTP_READ_TIMEOUT,
+            ),
+            breaker=self.breaker,
+            pool_maxsize=settings.OUTBOUND_HTTP_POOL_SIZE,
+            pool_block=True,
+            max_retries=Retry(
+                total=retries,
+                status_forcelist=RETRY_STATUSES,
+                backoff_factor=0.2,
+                backoff_jitter=0.2,
+                raise_on_status=False,
+            ),
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(provider):
+    """The shared session of ``provider``, created on first use."""
+    with _sessions_lock:
+        if provider not in _sessions:
+            _sessions[provider] = ProviderSession(provider)
+        return _sessions[provider]
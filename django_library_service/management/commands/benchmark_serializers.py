@@ -0,0 +1,134 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from books.models import Book
+from books.serializers import BookSerializer, BookValuesSerializer
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingSerializer, BorrowingValuesSerializer
+from django_library_service.renderers import ORJSONRenderer
+from payments.models import Payment
+from payments.serializers import PaymentSerializer, PaymentValuesSerializer
+from user.models import User
+
+BENCHMARKS = (
+    (
+        "books",
+        lambda: Book.objects.defer("search_vector"),
+        BookSerializer,
+        BookValuesSerializer,
+    ),
+    (
+        "borrowings",
+        lambda: Borrowing.objects.select_related("user", "book"),
+        BorrowingSerializer,
+        BorrowingValuesSerializer,
+    ),
+    (
+        "payments",
+        lambda: Payment.objects.select_related("user", "borrowing__book"),
+        PaymentSerializer,
+        PaymentValuesSerializer,
+    ),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time query + serialization + rendering of books, borrowings and "
+        "payments through the ModelSerializer/JSONRenderer path and the "
+        "values()/orjson fast path. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        request = Request(RequestFactory().get("/"))
+        context = {"request": request}
+
+        self.stdout.write(
+            f"{'rows':>8} {'serializer':>12} {'model (ms)':>11} "
+            f"{'values (ms)':>12} {'speedup':>8}"
+        )
+        with transaction.atomic():
+            self.seed(rows)
+            for name, build_queryset, serializer_class, values_class in BENCHMARKS:
+
+                def model_path():
+                    data = serializer_class(
+                        build_queryset().order_by("id"), many=True, context=context
+                    ).data
+                    return JSONRenderer().render(data)
+
+                def values_path():
+                    serializer = values_class(context)
+                    queryset = build_queryset().order_by("id")
+                    data = serializer.render_many(
+                        queryset.values(*serializer.lookups())
+                    )
+                    return ORJSONRenderer().render(data)
+
+                if model_path() != values_path():
+                    raise CommandError(f"{name}: the two paths render differently.")
+
+                model_ms = self.time(model_path, repeat)
+                values_ms = self.time(values_path, repeat)
+                self.stdout.write(
+                    f"{rows:>8} {name:>12} {model_ms:>11.1f} {values_ms:>12.1f} "
+                    f"{model_ms / values_ms:>7.1f}x"
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def seed(rows):
+        user = User.objects.create_user(
+            email="benchmark@example.com",
+            password="benchmark",
+            first_name="Bench",
+            last_name="Mark",
+        )
+        books = Book.objects.bulk_create(
+            Book(
+                title=f"Book {number}",
+                author=f"Author {number % 100}",
+                inventory=number % 20 + 1,
+                daily_fee=Decimal(number % 500 + 10) / 100,
+            )
+            for number in range(rows)
+        )
+        borrowings = Borrowing.objects.bulk_create(
+            Borrowing(
+                user=user,
+                book=book,
+                expected_return_date=date.today() + timedelta(days=7),
+            )
+            for book in books
+        )
+        Payment.objects.bulk_create(
+            Payment(
+                user=user,
+                borrowing=borrowing,
+                status="PENDING",
+                type="PAYMENT",
+                amount=Decimal("1.00"),
+                session_url="https://checkout.stripe.com/pay/cs_test",
+                session_id=f"cs_test_{borrowing.id}",
+            )
+            for borrowing in borrowings
+        )
+
+    @staticmethod
+    def time(path, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            path()
+        return (time.perf_counter() - started) * 1000 / repeat
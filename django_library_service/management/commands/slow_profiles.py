@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from django_library_service.profiling import read_profiles, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "List the slowest requests profiled by ProfilingMiddleware, each "
+        "with the functions that took the most time of their own."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            default=settings.PROFILING_DIR,
+            help="Directory of the profiles (PROFILING_DIR by default).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10,
+            help="Number of requests to list.",
+        )
+        parser.add_argument(
+            "--functions",
+            type=int,
+            default=5,
+            help="Functions summarised per request.",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["dir"]
+        if not directory:
+            raise CommandError("Set PROFILING_DIR or pass --dir.")
+
+        profiles = read_profiles(directory)
+        for profile in profiles[: options["limit"]]:
+            self.stdout.write(
+                f"{profile['duration'] * 1000:.1f}ms  {profile['method']} "
+                f"{profile['path']}  {profile['status']}  "
+                f"({profile['route'] or 'unmatched'}, {profile['kind']}) "
+                f"{profile['file']}"
+            )
+            try:
+                functions = summarize(directory, profile, options["functions"])
+            except (OSError, ValueError) as error:
+                self.stdout.write(f"    unreadable profile: {error}")
+                continue
+            for function, seconds in functions:
+                self.stdout.write(f"    {seconds * 1000:9.1f}ms  {function}")
+
+        self.stdout.write(
+            f"{len(profiles)} profiled requests in {directory}, "
+            f"{min(len(profiles), options['limit'])} slowest listed."
+        )
@@ -0,0 +1,396 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters and histograms live in ``REGISTRY``, one per process. With
+several worker processes (gunicorn, uwsgi) set ``METRICS_DIR``: every
+process then writes a snapshot of its registry to a file there, at most
+every ``METRICS_FLUSH_INTERVAL`` seconds, and ``/metrics`` adds up the
+snapshots of all processes, so any worker can answer the scrape. Files
+are named per host and process run and never overwritten by another one,
+which keeps counters monotonic across restarts. The files of processes
+that have exited (recycled workers) are merged into ``merged.json`` by
+the next scrape or process start on their host, so the directory holds
+one file per live process plus that one.
+
+Gauges (active borrowings, pending payments) are counted in the database
+by the ``/metrics`` view at scrape time, so they need no aggregation.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+
+from django_library_service.query_budget import get_view_action
+
+# Upper bounds, in seconds, of the histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+OUTBOUND_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+MERGED_FILE = "merged.json"
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT")
+)
+
+
+def escape_label(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join(
+        f'{name}="{escape_label(value)}"' for name, value in pairs
+    )
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def directory_lock(directory):
+    """Exclusive lock on ``directory`` between the processes of all hosts."""
+    import fcntl  # POSIX only, as are the servers that need METRICS_DIR.
+
+    with open(directory / "metrics.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_json(path, default=None):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path, data):
+    temporary = path.with_suffix(".tmp")
+    temporary.write_text(json.dumps(data))
+    # Readers see the old or the new file, never a partial one.
+    os.replace(temporary, path)
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(key), value] for key, value in self.values.items()]
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def render(self, samples):
+        for key, value in samples.items():
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {format_value(value)}"
+
+
+class Histogram(Counter):
+    """Per label set: a count per bucket (the last one +Inf), then the sum."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            counts = self.values.setdefault(key, [0] * (len(self.buckets) + 2))
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(key), list(counts)] for key, counts in self.values.items()]
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def render(self, samples):
+        bounds = (*self.buckets, float("inf"))
+        for key, counts in samples.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = format_labels(
+                    self.labelnames, key, [("le", format_value(float(bound)))]
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {format_value(float(counts[-1]))}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.pid = None
+        self._run_id = None
+        self.started = False
+        self.flushed = 0.0
+        self.flush_lock = threading.Lock()
+
+    @property
+    def run_id(self):
+        """``<host>-<pid>-<random>``, new in a forked worker."""
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self._run_id = (
+                f"{socket.gethostname()}-{self.pid}-{uuid.uuid4().hex[:8]}"
+            )
+            self.started = False
+        return self._run_id
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def flush(self, force=False):
+        """Write this process's snapshot to ``METRICS_DIR``, if set."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+
+        with self.flush_lock:
+            self.flushed = now
+            directory = Path(directory)
+            directory.mkdir(parents=True, exist_ok=True)
+            run_id = self.run_id
+            write_json(directory / f"metrics-{run_id}.json", self.snapshot())
+            if not self.started:
+                # Workers are recycled: merge the files of the previous ones.
+                with directory_lock(directory):
+                    self.merge_exited(directory)
+                self.started = True
+
+    def merge_exited(self, directory):
+        """
+        Add the snapshots of this host's exited processes to ``merged.json``
+        and delete them. Call with ``directory_lock`` held.
+        """
+        merged_path = directory / MERGED_FILE
+        merged = read_json(merged_path, {"runs": [], "snapshot": {}})
+        # Left behind if the process merging them died before deleting them.
+        for run_id in merged["runs"]:
+            (directory / f"metrics-{run_id}.json").unlink(missing_ok=True)
+
+        host = socket.gethostname()
+        exited = {}
+        for path in directory.glob("metrics-*.json"):
+            run_id = path.stem.removeprefix("metrics-")
+            run_host, pid, _ = run_id.rsplit("-", 2)
+            if run_host == host and not process_alive(int(pid)):
+                exited[run_id] = path
+        if not exited:
+            return
+
+        snapshots = [merged["snapshot"]]
+        snapshots.extend(
+            snapshot for path in exited.values()
+            if (snapshot := read_json(path)) is not None
+        )
+        totals = self.add_up(snapshots)
+        write_json(
+            merged_path,
+            {
+                "runs": list(exited),
+                "snapshot": {
+                    name: [[list(key), value] for key, value in samples.items()]
+                    for name, samples in totals.items()
+                },
+            },
+        )
+        for path in exited.values():
+            path.unlink(missing_ok=True)
+
+    def collect(self):
+        """``{name: {label values: value}}`` summed over all processes."""
+        if not settings.METRICS_DIR:
+            return self.add_up([self.snapshot()])
+
+        self.flush(force=True)
+        directory = Path(settings.METRICS_DIR)
+        with directory_lock(directory):
+            self.merge_exited(directory)
+            snapshots = [read_json(path) for path in directory.glob("metrics-*.json")]
+            merged = read_json(directory / MERGED_FILE)
+        if merged is not None:
+            snapshots.append(merged["snapshot"])
+        return self.add_up(snapshot for snapshot in snapshots if snapshot is not None)
+
+    def add_up(self, snapshots):
+        """``{name: {label values: value}}`` summed over ``snapshots``."""
+        totals = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in samples:
+                    key = tuple(key)
+                    totals[name][key] = metric.merge(totals[name].get(key), value)
+        return totals
+
+    def render(self, gauges=()):
+        """The Prometheus text exposition of all metrics and ``gauges``."""
+        lines = []
+        for name, samples in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.render(samples))
+        for name, documentation, value in gauges:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "library_http_request_duration_seconds",
+    "Time to answer a request, by route and action.",
+    ["route", "action", "method", "status"],
+)
+DB_QUERIES = REGISTRY.counter(
+    "library_db_queries_total",
+    "Database queries run while answering requests, by route.",
+    ["route"],
+)
+DB_QUERY_DURATION = REGISTRY.histogram(
+    "library_db_query_duration_seconds",
+    "Duration of the database queries run while answering requests.",
+    ["route"],
+    buckets=QUERY_BUCKETS,
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "library_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+OUTBOUND_DURATION = REGISTRY.histogram(
+    "library_outbound_request_duration_seconds",
+    "Duration of the HTTP requests sent to Stripe and Telegram.",
+    ["provider"],
+    buckets=OUTBOUND_BUCKETS,
+)
+OUTBOUND_FAILURES = REGISTRY.counter(
+    "library_outbound_request_failures_total",
+    "Outbound requests that failed or got a 5xx response.",
+    ["provider"],
+)
+OUTBOUND_REJECTED = REGISTRY.counter(
+    "library_outbound_requests_rejected_total",
+    "Outbound requests not sent: circuit breaker open or no free connection.",
+    ["provider"],
+)
+
+
+class QueryTimer:
+    def __init__(self):
+        self.durations = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations.append(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        queries = QueryTimer()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        # Unresolved paths and made-up methods are grouped, so scanners
+        # can't add label values.
+        route = getattr(request, "metrics_route", None) or "unmatched"
+        method = request.method if request.method in HTTP_METHODS else "other"
+        REQUEST_DURATION.observe(
+            elapsed,
+            route=route,
+            action=getattr(request, "metrics_action", ""),
+            method=method,
+            status=response.status_code,
+        )
+        if queries.durations:
+            DB_QUERIES.inc(len(queries.durations), route=route)
+            for duration in queries.durations:
+                DB_QUERY_DURATION.observe(duration, route=route)
+        REGISTRY.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_route = request.resolver_match.view_name
+        # Outside viewsets the action is the method.
+        if request.method in HTTP_METHODS:
+            request.metrics_action = get_view_action(view_func, request)
+        else:
+            request.metrics_action = "other"
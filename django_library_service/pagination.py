@@ -0,0 +1,153 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+TIE_BREAKER = "id"
+
+
+def _reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith("-") else f"-{field}"
+        for field in ordering
+    )
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the whole ordering.
+
+    The cursor stores the value of every ordering field of the boundary
+    row, and ``id`` is always appended as a tie-breaker, so a page is one
+    ``WHERE (ordering) > (cursor) ORDER BY ... LIMIT n`` query no matter
+    how deep it is. Ordering already applied by the filter backends
+    (e.g. relevance for ``?q=``) is kept; otherwise ``OrderingFilter`` or
+    ``ordering`` decides. Ordering fields must not be nullable.
+    """
+
+    ordering = (TIE_BREAKER,)
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            try:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(ordering, self.cursor.position)
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        explicit_ordering = queryset.query.order_by
+        if explicit_ordering and all(
+            isinstance(field, str) for field in explicit_ordering
+        ):
+            ordering = tuple(explicit_ordering)
+        else:
+            ordering = super().get_ordering(request, queryset, view)
+
+        if not {TIE_BREAKER, "pk"} & {field.lstrip("-") for field in ordering}:
+            direction = "-" if ordering[-1].startswith("-") else ""
+            ordering += (f"{direction}{TIE_BREAKER}",)
+        return ordering
+
+    @staticmethod
+    def get_keyset_filter(ordering, position):
+        """
+        Rows strictly after ``position`` in ``ordering``:
+        ``a > x OR (a = x AND b > y) OR ...``.
+        """
+        keyset_filter = Q()
+        equal_prefix = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            keyset_filter |= equal_prefix & Q(**{f"{name}__{lookup}": value})
+            equal_prefix &= Q(**{name: value})
+        return keyset_filter
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self.get_position(self.page[-1])
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self.get_position(self.page[0])
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def get_position(self, item):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            if isinstance(item, dict):
+                position.append(item[name])
+            else:
+                position.append(getattr(item, name))
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(b64decode(encoded.encode("ascii")))
+            reverse = bool(tokens["r"])
+            position = tokens["p"]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {"r": int(cursor.reverse), "p": cursor.position}
+        payload = json.dumps(tokens, cls=DjangoJSONEncoder, separators=(",", ":"))
+        encoded = b64encode(payload.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
@@ -0,0 +1,231 @@
+"""
+Opt-in profiling of single requests.
+
+With ``PROFILING_DIR`` set, ``ProfilingMiddleware`` writes per-request
+profiles there:
+
+* a ``PROFILING_SAMPLE_RATE`` share of the requests runs under cProfile
+  (``<id>.prof``, for pstats / snakeviz). Only one request is profiled at
+  a time; the others go on as if not sampled;
+* with ``PROFILING_SLOW_THRESHOLD`` (seconds), every other request is
+  watched by a stack sampler thread, which records the request thread's
+  stack every ``PROFILING_SAMPLER_INTERVAL`` seconds. Requests slower than
+  the threshold keep those stacks as ``<id>.folded`` (collapsed stacks,
+  for flamegraph.pl or speedscope).
+
+Each profile has a ``<id>.json`` with the request and its duration;
+``manage.py slow_profiles`` lists the slowest. Only the newest
+``PROFILING_MAX_FILES`` profiles are kept.
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+_cprofile_lock = threading.Lock()
+
+
+def frame_label(frame):
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame):
+    """``outer;...;inner`` labels of the frames of a stack."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler(threading.Thread):
+    """Records the stacks of the registered threads every ``interval``."""
+
+    def __init__(self, interval):
+        super().__init__(name="request-stack-sampler", daemon=True)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.recordings = {}
+
+    def start_recording(self, ident):
+        with self.lock:
+            self.recordings[ident] = Counter()
+
+    def stop_recording(self, ident):
+        """The ``{stack: samples}`` of ``ident`` since ``start_recording``."""
+        with self.lock:
+            return self.recordings.pop(ident)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.recordings:
+                    continue
+                frames = sys._current_frames()
+                for ident, stacks in self.recordings.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[collapse_stack(frame)] += 1
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = StackSampler(settings.PROFILING_SAMPLER_INTERVAL)
+            _sampler.start()
+        return _sampler
+
+
+def write_profile(directory, request, response, duration, kind, write, **extra):
+    """Save a profile with ``write(path)`` and its metadata next to it."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    started_at = timezone.now() - timedelta(seconds=duration)
+    profile_id = f"{started_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    path = directory / f"{profile_id}.{'prof' if kind == 'cprofile' else 'folded'}"
+    write(path)
+
+    match = request.resolver_match
+    metadata = {
+        "id": profile_id,
+        "file": path.name,
+        "kind": kind,
+        "method": request.method,
+        "path": request.get_full_path(),
+        "route": match.view_name if match else None,
+        "status": response.status_code,
+        "duration": duration,
+        "started_at": started_at.isoformat(),
+        **extra,
+    }
+    (directory / f"{profile_id}.json").write_text(json.dumps(metadata))
+    prune_profiles(directory, settings.PROFILING_MAX_FILES)
+    return metadata
+
+
+def prune_profiles(directory, max_files):
+    """Delete all but the ``max_files`` newest profiles (0 keeps them all)."""
+    if max_files <= 0:
+        return
+    # Profile ids start with their timestamp: by name is oldest first.
+    for path in sorted(Path(directory).glob("*.json"))[:-max_files]:
+        for stale in Path(directory).glob(f"{path.stem}.*"):
+            stale.unlink(missing_ok=True)
+
+
+def read_profiles(directory):
+    """Metadata of the profiles in ``directory``, slowest first."""
+    profiles = []
+    for path in Path(directory).glob("*.json"):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda profile: profile["duration"], reverse=True)
+
+
+def summarize(directory, profile, limit=5):
+    """``[(function, seconds)]`` with the most time spent in the function itself."""
+    path = Path(directory) / profile["file"]
+    if profile["kind"] == "cprofile":
+        stats = pstats.Stats(str(path)).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+        return [
+            (pstats.func_std_string(function), own_time)
+            for function, (_, _, own_time, _, _) in rows[:limit]
+        ]
+
+    own_samples = Counter()
+    for line in path.read_text().splitlines():
+        stack, samples = line.rsplit(" ", 1)
+        own_samples[stack.rsplit(";", 1)[-1]] += int(samples)
+    return [
+        (function, samples * profile["interval"])
+        for function, samples in own_samples.most_common(limit)
+    ]
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        directory = settings.PROFILING_DIR
+        if not directory:
+            return self.get_response(request)
+
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate > 0 and random.random() < rate:
+            # cProfile can't run in two threads at once (sys.monitoring).
+            if _cprofile_lock.acquire(blocking=False):
+                try:
+                    return self.profile(request, directory)
+                finally:
+                    _cprofile_lock.release()
+
+        if settings.PROFILING_SLOW_THRESHOLD > 0:
+            return self.sample(request, directory)
+        return self.get_response(request)
+
+    def profile(self, request, directory):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+
+        write_profile(
+            directory, request, response, duration, "cprofile", profiler.dump_stats
+        )
+        return response
+
+    def sample(self, request, directory):
+        sampler = get_sampler()
+        ident = threading.get_ident()
+        sampler.start_recording(ident)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop_recording(ident)
+        duration = time.perf_counter() - started
+
+        if duration >= settings.PROFILING_SLOW_THRESHOLD and stacks:
+            def write(path):
+                path.write_text(
+                    "".join(f"{stack} {samples}\n" for stack, samples in stacks.items())
+                )
+
+            write_profile(
+                directory,
+                request,
+                response,
+                duration,
+                "sampler",
+                write,
+                interval=sampler.interval,
+                samples=sum(stacks.values()),
+            )
+        return response
@@ -0,0 +1,105 @@
+"""
+Per-view query budgets.
+
+A view declares the most queries one request may run with a
+``query_budget`` attribute: a number, or a dict keyed by viewset action
+or HTTP method (``{"list": 1, "create": 6}``), where ``None`` leaves an
+action unchecked (e.g. imports, which scale with the upload). Views we
+don't own are wrapped with the ``query_budget()`` decorator in the URLconf
+instead. Views without a budget get ``QUERY_BUDGET_DEFAULT``.
+
+``QueryBudgetMiddleware`` counts the queries of every request and, over
+budget, logs a warning (``QUERY_BUDGET_MODE = "log"``, the default with
+DEBUG) or raises ``QueryBudgetExceeded`` (``"raise"``, used by the test
+harness).
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Savepoints come from nested atomic() blocks (and TestCase); they cost a
+# round trip but are not what a budget is about.
+IGNORED_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(budget):
+    """Set the budget of a view function, e.g. a third-party ``as_view()``."""
+    def decorator(view_func):
+        view_func.query_budget = budget
+        return view_func
+
+    return decorator
+
+
+def get_view_action(view_func, request):
+    """The viewset action serving ``request``, else the lowercased method."""
+    method = request.method.lower()
+    if method == "head":
+        method = "get"
+    return (getattr(view_func, "actions", None) or {}).get(method, method)
+
+
+def get_query_budget(view_func, request):
+    budget = getattr(view_func, "query_budget", None)
+    if budget is None:
+        view_class = getattr(view_func, "cls", None) or getattr(
+            view_func, "view_class", None
+        )
+        budget = getattr(view_class, "query_budget", None)
+    if isinstance(budget, dict):
+        action = get_view_action(view_func, request)
+        if action in budget:
+            return budget[action]
+        budget = None
+    if budget is None:
+        return settings.QUERY_BUDGET_DEFAULT
+    return budget
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(IGNORED_STATEMENTS):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.QUERY_BUDGET_MODE not in ("log", "raise"):
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+
+        budget = getattr(request, "query_budget", None)
+        if budget is not None and counter.count > budget:
+            message = (
+                f"{request.method} {request.path} "
+                f"({request.query_budget_view}) ran {counter.count} queries, "
+                f"budget {budget}"
+            )
+            if settings.QUERY_BUDGET_MODE == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request)
+        request.query_budget_view = (
+            f"{request.resolver_match.view_name}:"
+            f"{get_view_action(view_func, request)}"
+        )
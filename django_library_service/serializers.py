@@ -0,0 +1,110 @@
+from operator import itemgetter
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from django_library_service import timing
+
+
+class ValuesSerializer:
+    """
+    Read-only twin of a ``ModelSerializer`` that renders ``values()`` rows
+    instead of model instances.
+
+    The plan is taken from the fields of ``serializer_class``: plain
+    fields reuse that DRF field's ``to_representation``, so both paths
+    produce the same output; fields listed in ``nested`` are rendered by
+    another ``ValuesSerializer`` from the same row (joined lookups);
+    anything else (method fields, files, related strings) comes from a
+    ``get_<name>(row)`` method reading the lookups in ``extra_lookups``.
+    Nested objects collapsed to primary keys read the foreign key column.
+    """
+
+    serializer_class = None
+    nested = {}
+    extra_lookups = {}
+
+    def __init__(self, context=None, prefix="", serializer=None):
+        self.context = context or {}
+        self.prefix = prefix
+        self.plan = []
+
+        if serializer is None:
+            serializer = self.serializer_class(context=self.context)
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                lookup = f"{prefix}{field.source}"
+                self.plan.append((name, itemgetter(lookup), [lookup]))
+            elif name in self.nested:
+                child = self.nested[name](
+                    self.context, prefix=f"{prefix}{field.source}__", serializer=field
+                )
+                self.plan.append((name, child.to_representation, child.lookups()))
+            elif hasattr(self, f"get_{name}"):
+                lookups = [
+                    f"{prefix}{lookup}" for lookup in self.extra_lookups[name]
+                ]
+                self.plan.append((name, getattr(self, f"get_{name}"), lookups))
+            else:
+                lookup = f"{prefix}{field.source.replace('.', '__')}"
+                self.plan.append(
+                    (name, self.field_representation(field, lookup), [lookup])
+                )
+
+    @staticmethod
+    def field_representation(field, lookup):
+        to_representation = field.to_representation
+
+        def represent(row):
+            value = row[lookup]
+            return None if value is None else to_representation(value)
+
+        return represent
+
+    def lookups(self):
+        """``values()`` lookups needed to render a row."""
+        return list(dict.fromkeys(
+            lookup for _, _, lookups in self.plan for lookup in lookups
+        ))
+
+    def value(self, row, lookup):
+        return row[f"{self.prefix}{lookup}"]
+
+    def to_representation(self, row):
+        return {name: represent(row) for name, represent, _ in self.plan}
+
+    def render_many(self, rows):
+        with timing.phase("serialize"):
+            return [self.to_representation(row) for row in rows]
+
+
+class ValuesListMixin:
+    """
+    Serve ``list`` from ``values()`` rows through ``values_serializer_class``
+    instead of model instances and ``ModelSerializer``.
+
+    Rows also carry ``pk``, the ``etag_fields`` of ``ConditionalGetMixin``
+    and the ordering fields the keyset paginator reads.
+    """
+
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.values_serializer_class(
+            context=self.get_serializer_context()
+        )
+        etag_fields = getattr(self, "get_etag_fields", tuple)()
+        lookups = ["pk", *etag_fields, *serializer.lookups()]
+
+        if self.paginator is not None:
+            ordering = self.paginator.get_ordering(request, queryset, self)
+            lookups += [field.lstrip("-") for field in ordering]
+            rows = queryset.values(*dict.fromkeys(lookups))
+            page = self.paginator.paginate_queryset(rows, request, view=self)
+            if page is not None:
+                return self.get_paginated_response(serializer.render_many(page))
+        else:
+            rows = queryset.values(*dict.fromkeys(lookups))
+
+        return Response(serializer.render_many(rows))
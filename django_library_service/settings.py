@@ -28,8 +28,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.environ["SECRET_KEY"]
 
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
+# Signing secret of the /api/payments/webhook/ endpoint (whsec_...).
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+# Lazy checkout: a borrowing only records a pending payment; the Stripe
+# Checkout Session is created when the client asks for the payment URL.
+STRIPE_LAZY_CHECKOUT = os.getenv("STRIPE_LAZY_CHECKOUT", "True") == "True"
+# Lifetime of a Checkout Session in seconds (Stripe allows 30 min to 24 h).
+STRIPE_CHECKOUT_SESSION_TTL = int(os.getenv("STRIPE_CHECKOUT_SESSION_TTL", 60 * 60))
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.getenv("DEBUG")
+# Parsed once: the raw string would make DEBUG=False truthy here and in the
+# defaults below.
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
 
 ALLOWED_HOSTS = []
 
@@ -46,6 +55,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "drf_spectacular",
     "rest_framework_simplejwt",
@@ -53,11 +63,17 @@ INSTALLED_APPS = [
     "books",
     "borrowings",
     "lib_bot",
-    "payments"
+    "payments",
+    # Project-wide management commands (benchmarks, profiling).
+    "django_library_service",
 ]
 
 MIDDLEWARE = [
+    "django_library_service.profiling.ProfilingMiddleware",
+    "django_library_service.timing.ServerTimingMiddleware",
+    "django_library_service.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "django_library_service.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -101,6 +117,31 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# "locmem" is per process; "file" lets every worker on the host share entries.
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+
+if CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", BASE_DIR / ".cache"),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "library-service",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", 300))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -142,6 +183,114 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 MEDIA_URL = "/media/"
 
+# "local" keeps media under MEDIA_ROOT; "s3" writes to any S3-compatible
+# service (AWS, MinIO, ...) given by the S3_* variables.
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+
+if STORAGE_BACKEND == "s3":
+    DEFAULT_STORAGE = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": os.getenv("S3_BUCKET_NAME"),
+            "endpoint_url": os.getenv("S3_ENDPOINT_URL") or None,
+            "access_key": os.getenv("S3_ACCESS_KEY_ID"),
+            "secret_key": os.getenv("S3_SECRET_ACCESS_KEY"),
+            "region_name": os.getenv("S3_REGION_NAME") or None,
+            "custom_domain": os.getenv("S3_CUSTOM_DOMAIN") or None,
+            "addressing_style": os.getenv("S3_ADDRESSING_STYLE") or None,
+            # Covers are public; unsigned URLs keep serialized books stable.
+            "querystring_auth": False,
+            "file_overwrite": False,
+        },
+    }
+else:
+    DEFAULT_STORAGE = {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    }
+
+STORAGES = {
+    "default": DEFAULT_STORAGE,
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
+BOOK_COVER_MAX_UPLOAD_SIZE = int(
+    os.getenv("BOOK_COVER_MAX_UPLOAD_SIZE", 5 * 1024 * 1024)
+)
+
+# Returned borrowings (and their paid payments) older than this many
+# months are moved to the archive tables by `manage.py archive_history`.
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", 12))
+
+# Telegram notifications: 0 sends every event on its own, otherwise one
+# digest per chat every TELEGRAM_DIGEST_INTERVAL seconds.
+TELEGRAM_DIGEST_INTERVAL = int(os.getenv("TELEGRAM_DIGEST_INTERVAL", 0))
+# Per-chat token bucket: sustained messages per second and burst size.
+TELEGRAM_RATE_LIMIT = float(os.getenv("TELEGRAM_RATE_LIMIT", 1))
+TELEGRAM_RATE_BURST = int(os.getenv("TELEGRAM_RATE_BURST", 3))
+
+# Outbound HTTP to Stripe and Telegram (django_library_service.http_client)
+OUTBOUND_HTTP_CONNECT_TIMEOUT = float(os.getenv("OUTBOUND_HTTP_CONNECT_TIMEOUT", 3.05))
+OUTBOUND_HTTP_READ_TIMEOUT = float(os.getenv("OUTBOUND_HTTP_READ_TIMEOUT", 20))
+OUTBOUND_HTTP_RETRIES = int(os.getenv("OUTBOUND_HTTP_RETRIES", 2))
+# Connections per host, and seconds a request waits for one of them to be
+# free before it fails without being sent.
+OUTBOUND_HTTP_POOL_SIZE = int(os.getenv("OUTBOUND_HTTP_POOL_SIZE", 10))
+OUTBOUND_HTTP_POOL_TIMEOUT = float(os.getenv("OUTBOUND_HTTP_POOL_TIMEOUT", 0.5))
+# Consecutive failures that open the circuit, and seconds it stays open.
+OUTBOUND_HTTP_BREAKER_THRESHOLD = int(
+    os.getenv("OUTBOUND_HTTP_BREAKER_THRESHOLD", 5)
+)
+OUTBOUND_HTTP_BREAKER_RESET = float(os.getenv("OUTBOUND_HTTP_BREAKER_RESET", 30))
+
+# Per-view query budgets (django_library_service.query_budget): "off",
+# "log" a warning or "raise" when a request runs more queries than allowed.
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log" if DEBUG else "off")
+# Budget of views that don't declare one.
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", 10))
+
+# Share of requests (0 to 1) timed by phase into a Server-Timing header and
+# a log line (django_library_service.timing).
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.getenv("SERVER_TIMING_SAMPLE_RATE", 1 if DEBUG else 0)
+)
+
+# Prometheus metrics on /metrics (django_library_service.metrics). With
+# several worker processes, a directory shared by them to add up their
+# metrics, and how often (seconds) each process writes its own.
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1))
+# Scrapers must send "Authorization: Bearer <METRICS_TOKEN>" if it is set.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Request profiling (django_library_service.profiling), off unless a
+# directory for the profiles is set: the share of requests (0 to 1) run
+# under cProfile, and the duration (seconds) over which the other requests
+# keep the stacks sampled every PROFILING_SAMPLER_INTERVAL seconds. Only
+# the PROFILING_MAX_FILES newest profiles are kept (0: no limit).
+PROFILING_DIR = os.getenv("PROFILING_DIR")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+PROFILING_SLOW_THRESHOLD = float(os.getenv("PROFILING_SLOW_THRESHOLD", 0))
+PROFILING_SAMPLER_INTERVAL = float(os.getenv("PROFILING_SAMPLER_INTERVAL", 0.005))
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", 200))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "django_library_service.timing": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Library Service",
     "DESCRIPTION": "Books borrowing service",
@@ -165,10 +314,15 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
-    # "DEFAULT_RENDERER_CLASSES": [
-    #     "rest_framework.renderers.JSONRenderer",
-    # ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "django_library_service.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "DEFAULT_PAGINATION_CLASS": (
+        "django_library_service.pagination.KeysetCursorPagination"
+    ),
+    "PAGE_SIZE": 20,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 
 }
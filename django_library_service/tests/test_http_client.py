@@ -0,0 +1,200 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import stripe
+from django.test import SimpleTestCase, override_settings
+
+from django_library_service import metrics
+from django_library_service.http_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    PoolExhaustedError,
+    ProviderSession,
+    get_session,
+)
+
+
+def outbound_metrics(provider="test"):
+    """The ``library_outbound_*`` values recorded for ``provider`` so far."""
+    durations = metrics.OUTBOUND_DURATION.values.get((provider,))
+    return {
+        "requests": sum(durations[:-1]) if durations else 0,
+        "latency_sum": durations[-1] if durations else 0.0,
+        "failures": metrics.OUTBOUND_FAILURES.values.get((provider,), 0),
+        "rejected": metrics.OUTBOUND_REJECTED.values.get((provider,), 0),
+    }
+
+
+def increase(before, after):
+    return {name: after[name] - before[name] for name in after}
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def respond(self):
+        server = self.server
+        server.hits.append((self.command, self.client_address))
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.respond()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(
+    OUTBOUND_HTTP_RETRIES=2,
+    OUTBOUND_HTTP_BREAKER_THRESHOLD=2,
+    OUTBOUND_HTTP_BREAKER_RESET=60,
+)
+class ProviderSessionTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+        self.server.hits, self.server.statuses = [], []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.session = ProviderSession("test")
+        self.addCleanup(self.session.close)
+
+    def test_connections_are_kept_alive(self):
+        """Test: consecutive requests reuse one connection."""
+        for _ in range(5):
+            self.assertEqual(self.session.get(self.url).status_code, 200)
+
+        self.assertEqual(len({client for _, client in self.server.hits}), 1)
+
+    @override_settings(OUTBOUND_HTTP_POOL_SIZE=1, OUTBOUND_HTTP_POOL_TIMEOUT=0.1)
+    def test_busy_pool_fails_fast(self):
+        """Test: with every connection in use, a request fails without being sent."""
+        session = ProviderSession("test")
+        self.addCleanup(session.close)
+        # An unread streamed response keeps its connection checked out.
+        held = session.get(self.url, stream=True)
+        before = outbound_metrics()
+
+        with self.assertRaises(PoolExhaustedError):
+            session.get(self.url)
+
+        self.assertEqual(len(self.server.hits), 1)
+        self.assertEqual(increase(before, outbound_metrics())["rejected"], 1)
+        self.assertEqual(session.breaker.state, "closed")
+        held.close()
+        self.assertEqual(session.get(self.url).status_code, 200)
+
+    def test_idempotent_requests_are_retried(self):
+        """Test: a GET answered 503 is retried."""
+        self.server.statuses = [503, 503]
+
+        response = self.session.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.hits), 3)
+        self.assertEqual(self.session.breaker.state, "closed")
+
+    def test_posts_are_not_retried_on_error_status(self):
+        """Test: a POST that reached the server is not sent twice."""
+        self.server.statuses = [503]
+
+        response = self.session.post(self.url, json={})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.hits), 1)
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        """Test: once open, requests fail fast without reaching the server."""
+        self.server.statuses = [500, 500]
+        before = outbound_metrics()
+        self.session.post(self.url)
+        self.session.post(self.url)
+
+        with self.assertRaises(CircuitOpenError):
+            self.session.post(self.url)
+
+        self.assertEqual(len(self.server.hits), 2)
+        recorded = increase(before, outbound_metrics())
+        self.assertEqual(recorded["requests"], 2)
+        self.assertEqual(recorded["failures"], 2)
+        self.assertEqual(recorded["rejected"], 1)
+
+    def test_metrics_record_latency(self):
+        """Test: every request is observed in the latency histogram."""
+        before = outbound_metrics()
+
+        self.session.get(self.url)
+        self.session.get(self.url)
+
+        recorded = increase(before, outbound_metrics())
+        self.assertEqual(recorded["requests"], 2)
+        self.assertEqual(recorded["failures"], 0)
+        self.assertGreater(recorded["latency_sum"], 0)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0
+        self.breaker = CircuitBreaker(2, 30, clock=lambda: self.now)
+
+    def open(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+    def test_success_resets_the_failure_count(self):
+        """Test: only consecutive failures open the circuit."""
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_half_open_lets_one_trial_through(self):
+        """Test: after reset_timeout a single request may test the provider."""
+        self.open()
+        self.now = 30
+
+        self.breaker.before_request()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_failed_trial_reopens(self):
+        """Test: a failed trial keeps the circuit open for another period."""
+        self.open()
+        self.now = 30
+        self.breaker.before_request()
+
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, "open")
+        self.now = 59
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+
+
+class ProviderClientsTests(SimpleTestCase):
+    def test_session_is_shared_per_provider(self):
+        """Test: each provider has one session for the whole process."""
+        self.assertIs(get_session("telegram"), get_session("telegram"))
+        self.assertIsNot(get_session("telegram"), get_session("stripe"))
+
+    def test_stripe_uses_the_shared_session(self):
+        """Test: the Stripe SDK sends through the pooled session."""
+        import payments.utils  # noqa: F401  (configures the SDK)
+
+        self.assertIs(stripe.default_http_client._session, get_session("stripe"))
+        self.assertEqual(stripe.max_network_retries, 0)
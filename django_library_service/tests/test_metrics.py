@@ -0,0 +1,355 @@
+import os
+import re
+import shutil
+import socket
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from requests import Response
+from requests.adapters import HTTPAdapter
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from django_library_service.metrics import (
+    REGISTRY,
+    Counter,
+    Histogram,
+    Registry,
+    write_json,
+)
+from lib_bot.outbox import notify
+from payments.models import Payment
+from payments.tests.stripe_stub import StripeStub
+from user.models import User
+
+METRICS_URL = reverse("metrics")
+BOOKS_LIST_URL = reverse("books:books-list")
+
+
+def sample(text, name, **labels):
+    """Value of the ``name`` sample with exactly ``labels`` in ``text``."""
+    for line in text.splitlines():
+        match = re.fullmatch(r"(\w+)(?:\{(.*)\})? (\S+)", line)
+        if not match or match[1] != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match[2] or ""))
+        if found == labels:
+            return float(match[3])
+    return 0.0
+
+
+def delta(before, after, name, **labels):
+    return sample(after, name, **labels) - sample(before, name, **labels)
+
+
+def other_process():
+    """A second registry with the same metrics, as in another worker."""
+    registry = Registry()
+    registry.register(Counter("requests_total", "Requests.", ["route"]))
+    registry.register(
+        Histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1))
+    )
+    return registry
+
+
+class RegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.requests = self.registry.counter("requests_total", "Requests.", ["route"])
+        self.latency = self.registry.histogram(
+            "latency_seconds", "Latency.", ["route"], buckets=(0.1, 1)
+        )
+
+    def test_text_format(self):
+        """Test: counters and cumulative histogram buckets with HELP/TYPE."""
+        self.requests.inc(route="books")
+        self.requests.inc(2, route='say "hi"')
+        self.latency.observe(0.05, route="books")
+        self.latency.observe(0.5, route="books")
+        self.latency.observe(3, route="books")
+
+        text = self.registry.render([("active", "Active.", 4)])
+
+        self.assertIn("# TYPE requests_total counter", text)
+        self.assertIn('requests_total{route="books"} 1', text)
+        self.assertIn('requests_total{route="say \\"hi\\""} 2', text)
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{route="books",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="books",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="books",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_sum{route="books"} 3.55', text)
+        self.assertIn('latency_seconds_count{route="books"} 3', text)
+        self.assertIn("# TYPE active gauge\nactive 4", text)
+
+    def test_processes_are_added_up(self):
+        """Test: with METRICS_DIR every process's snapshot is summed."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        other = other_process()
+        other.metrics["requests_total"].inc(5, route="books")
+        other.metrics["latency_seconds"].observe(0.5, route="books")
+        self.requests.inc(route="books")
+        self.latency.observe(0.05, route="books")
+
+        with self.settings(METRICS_DIR=directory):
+            other.flush(force=True)
+            text = self.registry.render()
+
+        self.assertEqual(sample(text, "requests_total", route="books"), 6)
+        self.assertEqual(sample(text, "latency_seconds_count", route="books"), 2)
+        self.assertEqual(
+            sample(text, "latency_seconds_bucket", route="books", le="0.1"), 1
+        )
+
+    def test_flushes_are_throttled(self):
+        """Test: a process writes its snapshot at most once per interval."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+
+        with self.settings(METRICS_DIR=directory, METRICS_FLUSH_INTERVAL=60):
+            self.registry.flush()
+            self.requests.inc(route="books")
+            self.registry.flush()
+            self.registry.flush(force=True)
+            flushed = other_process().collect()
+
+        self.assertEqual(flushed["requests_total"], {("books",): 1})
+
+    @patch(
+        "django_library_service.metrics.process_alive",
+        lambda pid: pid == os.getpid(),
+    )
+    def test_exited_processes_are_merged(self):
+        """Test: files of exited processes are folded into one, counted once."""
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        exited = other_process()
+        exited.metrics["requests_total"].inc(5, route="books")
+        host = socket.gethostname()
+        for run_id in (f"{host}-1001-a", f"{host}-1002-b", "other-host-1003-c"):
+            write_json(directory / f"metrics-{run_id}.json", exited.snapshot())
+        self.requests.inc(route="books")
+
+        with self.settings(METRICS_DIR=str(directory)):
+            first = self.registry.collect()
+            second = self.registry.collect()
+
+        self.assertEqual(first["requests_total"], {("books",): 16})
+        self.assertEqual(second, first)
+        self.assertCountEqual(
+            [path.name for path in directory.glob("*.json")],
+            [
+                "merged.json",
+                f"metrics-{self.registry.run_id}.json",
+                "metrics-other-host-1003-c.json",
+            ],
+        )
+
+    def test_forked_process_gets_its_own_file(self):
+        """Test: a worker forked after import does not share its parent's file."""
+        parent = self.registry.run_id
+
+        with patch("django_library_service.metrics.os.getpid", return_value=1):
+            child = self.registry.run_id
+
+        self.assertNotEqual(child, parent)
+        self.assertTrue(child.startswith(f"{socket.gethostname()}-1-"))
+
+
+class MetricsEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        cls.book = Book.objects.create(
+            title="Test Book", author="Author", inventory=5, daily_fee=Decimal("2.00")
+        )
+        borrowing = Borrowing.objects.create(
+            user=cls.user,
+            book=cls.book,
+            expected_return_date=date.today() + timedelta(days=3),
+        )
+        cls.payment = Payment.objects.create(
+            user=cls.user,
+            borrowing=borrowing,
+            status="PENDING",
+            type="PAYMENT",
+            amount=Decimal("6.00"),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def scrape(self):
+        response = self.client.get(METRICS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return response.content.decode()
+
+    def test_requests_are_counted_per_route(self):
+        """Test: latency and queries are recorded by route and action."""
+        labels = {
+            "route": "books:books-list",
+            "action": "list",
+            "method": "GET",
+            "status": "200",
+        }
+        before = self.scrape()
+
+        self.client.get(BOOKS_LIST_URL)
+        self.client.get(BOOKS_LIST_URL)
+        after = self.scrape()
+
+        name = "library_http_request_duration_seconds_count"
+        self.assertEqual(delta(before, after, name, **labels), 2)
+        # The second request is answered from the cache.
+        self.assertEqual(
+            delta(before, after, "library_db_queries_total", route="books:books-list"),
+            1,
+        )
+
+    def test_unknown_methods_are_grouped(self):
+        """Test: client-made-up methods share the "other" method label."""
+        before = self.scrape()
+
+        self.client.generic("FOO", BOOKS_LIST_URL)
+        response = self.client.generic("BAR", BOOKS_LIST_URL)
+        after = self.scrape()
+
+        labels = {
+            "route": "books:books-list",
+            "action": "other",
+            "method": "other",
+            "status": str(response.status_code),
+        }
+        name = "library_http_request_duration_seconds_count"
+        self.assertEqual(delta(before, after, name, **labels), 2)
+        self.assertNotIn("FOO", after.upper())
+
+    def test_cache_hits_and_misses(self):
+        """Test: the catalog cache reports hits and misses."""
+        before = self.scrape()
+
+        self.client.get(BOOKS_LIST_URL)
+        self.client.get(BOOKS_LIST_URL)
+        after = self.scrape()
+
+        for result in ("hit", "miss"):
+            with self.subTest(result=result):
+                self.assertEqual(
+                    delta(
+                        before,
+                        after,
+                        "library_cache_requests_total",
+                        cache="catalog",
+                        result=result,
+                    ),
+                    1,
+                )
+
+    def test_gauges(self):
+        """Test: active borrowings and pending payments are read live."""
+        text = self.scrape()
+
+        self.assertEqual(sample(text, "library_active_borrowings"), 1)
+        self.assertEqual(sample(text, "library_pending_payments"), 1)
+
+    def test_outbound_calls(self):
+        """Test: Stripe calls are timed and failures counted."""
+        self.client.force_authenticate(user=self.user)
+        url = reverse("payments:payment-session", args=[self.payment.id])
+        before = self.scrape()
+
+        with StripeStub() as stripe_stub:
+            self.client.get(url)
+            stripe_stub.error_status = 500
+            Payment.objects.filter(pk=self.payment.pk).update(session_url="")
+            self.client.get(url)
+        after = self.scrape()
+
+        # The failed request is retried, so at least two calls.
+        self.assertGreaterEqual(
+            delta(
+                before,
+                after,
+                "library_outbound_request_duration_seconds_count",
+                provider="stripe",
+            ),
+            2,
+        )
+        self.assertGreaterEqual(
+            delta(
+                before,
+                after,
+                "library_outbound_request_failures_total",
+                provider="stripe",
+            ),
+            1,
+        )
+
+    @patch("lib_bot.bot.TELEGRAM_CHAT_ID", "chat")
+    @patch("lib_bot.bot.TELEGRAM_BOT_TOKEN", "token")
+    def test_notifier_calls_reach_the_scrape(self):
+        """Test: the notifier worker writes its Telegram metrics for /metrics."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        notify("BORROWING_CREATED", "delivered")
+        notify("BORROWING_CREATED", "failed")
+        responses = []
+        for status_code in (200, 500):
+            response = Response()
+            response.status_code = status_code
+            responses.append(response)
+        before = self.scrape()
+
+        with self.settings(METRICS_DIR=directory):
+            with patch.object(HTTPAdapter, "send", side_effect=responses):
+                call_command("send_notifications", once=True, stdout=StringIO())
+            # Only what the worker wrote to METRICS_DIR, as in the web process.
+            with patch.object(REGISTRY, "flush"):
+                after = self.scrape()
+
+        self.assertEqual(
+            delta(
+                before,
+                after,
+                "library_outbound_request_duration_seconds_count",
+                provider="telegram",
+            ),
+            2,
+        )
+        self.assertEqual(
+            delta(
+                before,
+                after,
+                "library_outbound_request_failures_total",
+                provider="telegram",
+            ),
+            1,
+        )
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_token(self):
+        """Test: with METRICS_TOKEN set, scrapers must present it."""
+        refused = self.client.get(METRICS_URL)
+        allowed = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION="Bearer scrape-secret"
+        )
+
+        self.assertEqual(refused.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(allowed.status_code, status.HTTP_200_OK)
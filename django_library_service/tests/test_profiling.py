@@ -0,0 +1,128 @@
+import json
+import pstats
+import shutil
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.views import BookViewSet
+
+BOOKS_LIST_URL = reverse("books:books-list")
+
+original_list = BookViewSet.list
+
+
+def slow_list(self, request, *args, **kwargs):
+    time.sleep(0.1)
+    return original_list(self, request, *args, **kwargs)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def files(self, pattern="*"):
+        return sorted(Path(self.directory).glob(pattern))
+
+    def metadata(self):
+        (path,) = self.files("*.json")
+        return json.loads(path.read_text())
+
+    def test_off_by_default(self):
+        """Test: without PROFILING_DIR nothing is profiled."""
+        with self.settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_THRESHOLD=0.001):
+            self.client.get(BOOKS_LIST_URL)
+
+        self.assertEqual(self.files(), [])
+
+    def test_sampled_request_is_profiled(self):
+        """Test: a sampled request is written as a cProfile dump."""
+        with self.settings(PROFILING_DIR=self.directory, PROFILING_SAMPLE_RATE=1):
+            response = self.client.get(BOOKS_LIST_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metadata = self.metadata()
+        self.assertEqual(metadata["kind"], "cprofile")
+        self.assertEqual(metadata["route"], "books:books-list")
+        self.assertEqual(metadata["method"], "GET")
+        self.assertEqual(metadata["status"], 200)
+        functions = {
+            name for _, _, name in pstats.Stats(
+                str(Path(self.directory) / metadata["file"])
+            ).stats
+        }
+        self.assertIn("list", functions)
+
+    @mock.patch.object(BookViewSet, "list", slow_list)
+    def test_slow_request_keeps_sampled_stacks(self):
+        """Test: requests over the threshold are saved as folded stacks."""
+        with self.settings(
+            PROFILING_DIR=self.directory,
+            PROFILING_SLOW_THRESHOLD=0.05,
+            PROFILING_SAMPLER_INTERVAL=0.005,
+        ):
+            self.client.get(BOOKS_LIST_URL)
+
+        metadata = self.metadata()
+        self.assertEqual(metadata["kind"], "sampler")
+        self.assertGreaterEqual(metadata["duration"], 0.1)
+        self.assertGreater(metadata["samples"], 0)
+        stacks = (Path(self.directory) / metadata["file"]).read_text()
+        self.assertIn("slow_list (test_profiling.py", stacks)
+
+    def test_fast_request_is_not_kept(self):
+        """Test: requests under the threshold leave no profile."""
+        with self.settings(PROFILING_DIR=self.directory, PROFILING_SLOW_THRESHOLD=10):
+            self.client.get(BOOKS_LIST_URL)
+
+        self.assertEqual(self.files(), [])
+
+    def test_only_newest_profiles_are_kept(self):
+        """Test: past PROFILING_MAX_FILES the oldest profiles are deleted."""
+        with self.settings(
+            PROFILING_DIR=self.directory,
+            PROFILING_SAMPLE_RATE=1,
+            PROFILING_MAX_FILES=1,
+        ):
+            self.client.get(BOOKS_LIST_URL)
+            oldest = self.metadata()
+            # Profile ids are ordered by the second the request started.
+            time.sleep(1)
+            self.client.get(BOOKS_LIST_URL)
+
+        newest = self.metadata()
+        self.assertNotEqual(newest["id"], oldest["id"])
+        self.assertEqual(self.files("*.prof"), [Path(self.directory) / newest["file"]])
+
+    @override_settings(PROFILING_SLOW_THRESHOLD=0.05)
+    def test_slow_profiles_command(self):
+        """Test: the command lists the slowest requests first, summarised."""
+        with self.settings(PROFILING_DIR=self.directory):
+            with self.settings(PROFILING_SAMPLE_RATE=1):
+                self.client.get(BOOKS_LIST_URL)
+            with mock.patch.object(BookViewSet, "list", slow_list):
+                self.client.get(BOOKS_LIST_URL)
+            out = StringIO()
+            call_command("slow_profiles", "--functions", "3", stdout=out)
+
+        lines = out.getvalue().splitlines()
+        headers = [line for line in lines if not line.startswith(" " * 4)]
+        self.assertIn("sampler", headers[0])
+        self.assertIn("cprofile", headers[1])
+        self.assertIn("slow_list (test_profiling.py", lines[1])
+        self.assertEqual(
+            lines[-1],
+            f"2 profiled requests in {self.directory}, 2 slowest listed.",
+        )
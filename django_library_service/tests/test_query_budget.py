@@ -0,0 +1,395 @@
+import importlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from books.models import Book
+from books.tests.test_uploads import make_cover_bytes
+from borrowings.models import Borrowing
+from django_library_service import settings as settings_module
+from django_library_service.query_budget import (
+    QueryBudgetExceeded,
+    get_query_budget,
+    query_budget,
+)
+from payments.models import Payment
+from payments.tests.stripe_stub import StripeStub
+from payments.tests.test_webhook import WEBHOOK_SECRET, checkout_event, sign
+from user.models import User
+
+OWN_APPS = ("books", "borrowings", "payments", "user")
+READERS = 3
+BOOKS = 5
+
+
+def iter_routes(patterns=None, namespace=""):
+    """Yield (url name, view) of every named route but the admin site."""
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name == "admin":
+                continue
+            yield from iter_routes(
+                pattern.url_patterns,
+                ":".join(filter(None, [namespace, pattern.namespace])),
+            )
+        elif pattern.name and "format" not in pattern.pattern.regex.groupindex:
+            name = f"{namespace}:{pattern.name}" if namespace else pattern.name
+            yield name, pattern.callback
+
+
+def view_class(view):
+    return getattr(view, "cls", None) or view.view_class
+
+
+def route_methods(view):
+    # Viewsets gain "head" in their actions once they have served a GET.
+    methods = getattr(view, "actions", None) or [
+        method for method in view_class(view).http_method_names
+        if hasattr(view_class(view), method)
+    ]
+    return set(methods) - {"head", "options"}
+
+
+class DebugDefaultsTests(SimpleTestCase):
+    def load_settings(self, debug):
+        environ = {
+            name: value for name, value in os.environ.items()
+            if name not in ("QUERY_BUDGET_MODE", "SERVER_TIMING_SAMPLE_RATE")
+        }
+        self.addCleanup(importlib.reload, settings_module)
+        with mock.patch.dict(os.environ, {**environ, "DEBUG": debug}, clear=True):
+            return importlib.reload(settings_module)
+
+    def test_debug_false_turns_the_checks_off(self):
+        """Test: DEBUG=False is off, and so are budget logs and Server-Timing."""
+        for debug in ("False", "false", "0", ""):
+            with self.subTest(debug=debug):
+                loaded = self.load_settings(debug)
+                self.assertIs(loaded.DEBUG, False)
+                self.assertEqual(loaded.QUERY_BUDGET_MODE, "off")
+                self.assertEqual(loaded.SERVER_TIMING_SAMPLE_RATE, 0)
+
+    def test_debug_true_turns_the_checks_on(self):
+        """Test: with DEBUG=True budgets are logged and every request timed."""
+        loaded = self.load_settings("True")
+
+        self.assertIs(loaded.DEBUG, True)
+        self.assertEqual(loaded.QUERY_BUDGET_MODE, "log")
+        self.assertEqual(loaded.SERVER_TIMING_SAMPLE_RATE, 1)
+
+
+class QueryBudgetResolutionTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_budget_per_action(self):
+        """Test: a dict budget is looked up by viewset action."""
+        class View:
+            query_budget = {"list": 1, "retrieve": 2}
+
+        def view(request):
+            pass
+
+        view.cls = View
+        view.actions = {"get": "list", "post": "create"}
+
+        self.assertEqual(get_query_budget(view, self.factory.get("/")), 1)
+        self.assertEqual(get_query_budget(view, self.factory.head("/")), 1)
+        with self.settings(QUERY_BUDGET_DEFAULT=7):
+            self.assertEqual(get_query_budget(view, self.factory.post("/")), 7)
+
+    def test_decorator_wins_over_class(self):
+        """Test: query_budget() on the view function overrides the class."""
+        class View:
+            query_budget = 5
+
+        def view(request):
+            pass
+
+        view.view_class = View
+        view = query_budget({"post": 2})(view)
+
+        self.assertEqual(get_query_budget(view, self.factory.post("/")), 2)
+
+
+@override_settings(
+    QUERY_BUDGET_MODE="raise",
+    STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+    STRIPE_LAZY_CHECKOUT=True,
+)
+class QueryBudgetHarnessTests(APITestCase):
+    """
+    Every route and method, with enough rows that an N+1 query in a list
+    or a nested serializer goes over budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="admin123",
+            first_name="Admin",
+            last_name="User"
+        )
+        cls.readers = [
+            User.objects.create_user(
+                email=f"reader{number}@example.com",
+                first_name="Reader",
+                last_name=str(number),
+                password="password123"
+            )
+            for number in range(READERS)
+        ]
+        cls.reader = cls.readers[0]
+        cls.books = [
+            Book.objects.create(
+                title=f"Book {number}",
+                author=f"Author {number}",
+                inventory=10,
+                daily_fee=Decimal("1.00"),
+            )
+            for number in range(BOOKS)
+        ]
+        cls.borrowings = []
+        for reader in cls.readers:
+            for book in cls.books:
+                borrowing = Borrowing.objects.create(
+                    user=reader,
+                    book=book,
+                    expected_return_date=date.today() + timedelta(days=7),
+                )
+                Payment.objects.create(
+                    user=reader,
+                    borrowing=borrowing,
+                    status="PENDING",
+                    type="PAYMENT",
+                    amount=Decimal("7.00"),
+                    session_id=f"cs_test_{borrowing.id}",
+                )
+                cls.borrowings.append(borrowing)
+        cls.borrowing = cls.borrowings[0]
+        cls.payment = Payment.objects.get(borrowing=cls.borrowing)
+        cls.book = cls.books[0]
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.enterContext(StripeStub())
+
+    def authorize(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def cases(self):
+        """(url name, method) -> (url kwargs, client kwargs, status)."""
+        book, borrowing, payment = self.book, self.borrowing, self.payment
+        event = json.dumps(
+            checkout_event("evt_1", "checkout.session.completed", payment)
+        )
+        refresh = RefreshToken.for_user(self.reader)
+        new_book = {
+            "title": "New Book",
+            "author": "Author",
+            "cover": "HARD",
+            "inventory": 3,
+            "daily_fee": "1.50",
+        }
+        new_user = {
+            "email": "new@example.com",
+            "password": "password123",
+            "first_name": "New",
+            "last_name": "User",
+        }
+        ok, created = status.HTTP_200_OK, status.HTTP_201_CREATED
+        return {
+            ("books:api-root", "get"): ({}, {}, ok),
+            ("books:books-list", "get"): ({}, {}, ok),
+            ("books:books-list", "post"): ({}, {"data": new_book}, created),
+            ("books:books-detail", "get"): ({"pk": book.id}, {}, ok),
+            ("books:books-detail", "put"): ({"pk": book.id}, {"data": new_book}, ok),
+            ("books:books-detail", "patch"): (
+                {"pk": book.id}, {"data": {"inventory": 4}}, ok
+            ),
+            ("books:books-detail", "delete"): (
+                {"pk": book.id}, {}, status.HTTP_204_NO_CONTENT
+            ),
+            ("books:books-suggest", "get"): ({}, {"data": {"q": "Bok"}}, ok),
+            ("books:books-bulk-import", "post"): (
+                {},
+                {
+                    "data": "id,title,author,cover,inventory,daily_fee\n"
+                            f"{book.id},Renamed,Author,SOFT,2,1.00\n"
+                            ",Imported,Author,SOFT,1,2.00\n",
+                    "content_type": "text/csv",
+                },
+                ok,
+            ),
+            ("books:books-bulk-update", "patch"): (
+                {},
+                {
+                    "data": [{"id": b.id, "inventory": 20} for b in self.books],
+                    "format": "json",
+                },
+                ok,
+            ),
+            ("books:books-upload-image", "post"): (
+                {"pk": book.id},
+                {
+                    "data": {
+                        "image": ContentFile(make_cover_bytes(), name="cover.png")
+                    },
+                    "format": "multipart",
+                },
+                ok,
+            ),
+            ("borrowings:api-root", "get"): ({}, {}, ok),
+            ("borrowings:borrowing-list", "get"): ({}, {}, ok),
+            ("borrowings:borrowing-list", "post"): (
+                {},
+                {
+                    "data": {
+                        "book": book.id,
+                        "expected_return_date": date.today() + timedelta(days=3),
+                    }
+                },
+                created,
+            ),
+            ("borrowings:borrowing-detail", "get"): ({"pk": borrowing.id}, {}, ok),
+            ("borrowings:borrowing-detail", "put"): (
+                {"pk": borrowing.id},
+                {
+                    "data": {
+                        "user": self.reader.id,
+                        "book": book.id,
+                        "expected_return_date": date.today() + timedelta(days=9),
+                    }
+                },
+                ok,
+            ),
+            ("borrowings:borrowing-detail", "patch"): (
+                {"pk": borrowing.id},
+                {"data": {"expected_return_date": date.today() + timedelta(days=9)}},
+                ok,
+            ),
+            ("borrowings:borrowing-detail", "delete"): (
+                {"pk": borrowing.id}, {}, status.HTTP_204_NO_CONTENT
+            ),
+            ("borrowings:borrowing-return-borrowing", "post"): (
+                {"pk": borrowing.id}, {}, ok
+            ),
+            ("payments:payment_list", "get"): ({}, {}, ok),
+            ("payments:payment_list", "post"): (
+                {}, {"data": {"borrowing": borrowing.id}}, created
+            ),
+            ("payments:payment-detail", "get"): ({"pk": payment.id}, {}, ok),
+            ("payments:payment-session", "get"): ({"pk": payment.id}, {}, ok),
+            ("payments:payment-success", "get"): (
+                {}, {"data": {"session_id": payment.session_id}}, ok
+            ),
+            ("payments:payment-cancel", "get"): ({}, {}, ok),
+            ("payments:stripe-webhook", "post"): (
+                {},
+                {
+                    "data": event,
+                    "content_type": "application/json",
+                    "HTTP_STRIPE_SIGNATURE": sign(event),
+                },
+                ok,
+            ),
+            ("users:create", "post"): ({}, {"data": new_user}, created),
+            ("users:manage", "get"): ({}, {}, ok),
+            ("users:manage", "put"): ({}, {"data": new_user}, ok),
+            ("users:manage", "patch"): ({}, {"data": {"first_name": "Renamed"}}, ok),
+            ("users:login_user", "post"): (
+                {},
+                {"data": {"email": self.reader.email, "password": "password123"}},
+                ok,
+            ),
+            ("users:token_refresh", "post"): (
+                {}, {"data": {"refresh": str(refresh)}}, ok
+            ),
+            ("users:token_verify", "post"): (
+                {}, {"data": {"token": str(refresh.access_token)}}, ok
+            ),
+            ("schema", "get"): ({}, {}, ok),
+            ("swagger-ui", "get"): ({}, {}, ok),
+            ("metrics", "get"): ({}, {}, ok),
+        }
+
+    def test_every_route_has_a_case(self):
+        """Test: new routes and methods must be added to the harness."""
+        routes = {
+            (name, method)
+            for name, view in iter_routes()
+            for method in route_methods(view)
+        }
+
+        self.assertEqual(set(self.cases()), routes)
+
+    def test_own_views_declare_budgets(self):
+        """Test: our views don't fall back to QUERY_BUDGET_DEFAULT."""
+        for name, view in iter_routes():
+            cls = view_class(view)
+            if cls.__module__.split(".")[0] not in OWN_APPS:
+                continue
+            budget = getattr(view, "query_budget", None) or cls.query_budget
+            for method in route_methods(view):
+                with self.subTest(route=name, method=method):
+                    action = getattr(view, "actions", {}).get(method, method)
+                    if isinstance(budget, dict):
+                        self.assertIn(action, budget)
+                    else:
+                        self.assertIsInstance(budget, int)
+
+    def test_routes_stay_within_budget(self):
+        """Test: no route runs more queries than its budget."""
+        for (name, method), (kwargs, request, expected) in self.cases().items():
+            with self.subTest(route=name, method=method):
+                cache.clear()
+                # The catalog is managed by staff, the rest is used by readers.
+                # A real token, so the budgets include the user lookup.
+                self.authorize(
+                    self.admin if name.startswith("books:") else self.reader
+                )
+                with transaction.atomic():
+                    response = getattr(self.client, method)(
+                        reverse(name, kwargs=kwargs), **request
+                    )
+                    transaction.set_rollback(True)
+                self.assertEqual(response.status_code, expected, response.content)
+
+    def get_api_root(self):
+        # Not one of our views: QUERY_BUDGET_DEFAULT applies.
+        self.authorize(self.reader)
+        return self.client.get(reverse("books:api-root"))
+
+    @override_settings(QUERY_BUDGET_DEFAULT=0)
+    def test_over_budget_raises(self):
+        """Test: in "raise" mode a request over budget fails loudly."""
+        with self.assertRaisesMessage(
+            QueryBudgetExceeded, "(books:api-root:get) ran 1 queries, budget 0"
+        ):
+            self.get_api_root()
+
+    @override_settings(QUERY_BUDGET_MODE="log", QUERY_BUDGET_DEFAULT=0)
+    def test_over_budget_is_logged(self):
+        """Test: in "log" mode the request goes through with a warning."""
+        with self.assertLogs("django_library_service.query_budget") as logs:
+            response = self.get_api_root()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ran 1 queries, budget 0", logs.output[0])
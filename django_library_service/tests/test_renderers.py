@@ -0,0 +1,51 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from django_library_service.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    data = {
+        "id": 1,
+        "title": "Line\u2028separator \u00e9",
+        "daily_fee": Decimal("2.50"),
+        "borrow_date": datetime.date(2024, 1, 2),
+        "created_at": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.UTC),
+        "session": uuid.UUID(int=1),
+        "nested": [None, True, 1.5, {"a": "b"}],
+    }
+
+    def test_matches_json_renderer(self):
+        """Test: the output is byte-for-byte the output of DRF's renderer."""
+        self.assertEqual(
+            ORJSONRenderer().render(self.data), JSONRenderer().render(self.data)
+        )
+
+    def test_local_datetimes(self):
+        """Test: aware datetimes in other zones keep their offset."""
+        value = timezone.localtime(
+            datetime.datetime(2024, 6, 1, tzinfo=datetime.UTC),
+            datetime.timezone(datetime.timedelta(hours=3)),
+        )
+
+        self.assertEqual(
+            ORJSONRenderer().render({"at": value}),
+            JSONRenderer().render({"at": value}),
+        )
+
+    def test_indent(self):
+        """Test: a requested indent pretty-prints the output."""
+        rendered = ORJSONRenderer().render(
+            {"a": 1}, "application/json; indent=4", {}
+        )
+
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_none_renders_empty_body(self):
+        """Test: no data renders an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b"")
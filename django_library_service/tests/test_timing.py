@@ -0,0 +1,129 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.models import Book
+from borrowings.models import Borrowing
+from django_library_service.timing import RequestTiming
+from payments.models import Payment
+from payments.tests.stripe_stub import StripeStub
+from user.models import User
+
+BOOKS_LIST_URL = reverse("books:books-list")
+
+
+def parse_server_timing(header):
+    return {
+        metric.split(";")[0]: float(metric.split(";dur=")[1])
+        for metric in header.split(", ")
+    }
+
+
+class RequestTimingTests(SimpleTestCase):
+    def test_nested_phases_are_timed_once(self):
+        """Test: a phase entered again while running is not counted twice."""
+        timing = RequestTiming()
+
+        with timing.phase("serialize"):
+            with timing.phase("serialize"):
+                pass
+            with timing.phase("db"):
+                pass
+
+        self.assertEqual(timing.counts, {"db": 1, "serialize": 1})
+        self.assertGreaterEqual(
+            timing.durations["serialize"], timing.durations["db"]
+        )
+
+    def test_header(self):
+        """Test: every phase and the total, in milliseconds."""
+        timing = RequestTiming()
+        timing.record("db", 0.0123)
+        timing.record("stripe", 0.25)
+
+        self.assertEqual(
+            timing.header(0.3), "db;dur=12.3, stripe;dur=250.0, total;dur=300.0"
+        )
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingMiddlewareTests(APITestCase):
+    def setUp(self):
+        # A cached catalog page would skip the database and the serializer.
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        self.book = Book.objects.create(
+            title="Test Book", author="Author", inventory=5, daily_fee=Decimal("2.00")
+        )
+
+    def test_list_reports_phases(self):
+        """Test: a list reports database, serializer and renderer time."""
+        with self.assertLogs("django_library_service.timing", "INFO") as logs:
+            response = self.client.get(BOOKS_LIST_URL)
+
+        metrics = parse_server_timing(response["Server-Timing"])
+        self.assertEqual(set(metrics), {"db", "serialize", "render", "total"})
+        self.assertGreaterEqual(metrics["total"], metrics["db"])
+
+        (line,) = logs.records
+        record = json.loads(line.getMessage())
+        self.assertEqual(record["route"], "books:books-list")
+        self.assertEqual(record["status"], status.HTTP_200_OK)
+        self.assertEqual(record["db_count"], 1)
+        self.assertEqual(record["total_ms"], metrics["total"])
+
+    def test_outbound_calls_are_reported(self):
+        """Test: time spent waiting for Stripe has its own phase."""
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=3),
+        )
+        payment = Payment.objects.create(
+            user=self.user,
+            borrowing=borrowing,
+            status="PENDING",
+            type="PAYMENT",
+            amount=Decimal("6.00"),
+        )
+        self.client.force_authenticate(user=self.user)
+
+        with StripeStub(), self.assertLogs("django_library_service.timing", "INFO"):
+            response = self.client.get(
+                reverse("payments:payment-session", args=[payment.id])
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("stripe", parse_server_timing(response["Server-Timing"]))
+
+    def test_requests_are_sampled(self):
+        """Test: only the sampled share of requests is timed."""
+        with override_settings(SERVER_TIMING_SAMPLE_RATE=0.25):
+            with mock.patch("random.random", return_value=0.3):
+                skipped = self.client.get(BOOKS_LIST_URL)
+            with mock.patch("random.random", return_value=0.2):
+                with self.assertLogs("django_library_service.timing", "INFO"):
+                    sampled = self.client.get(BOOKS_LIST_URL)
+
+        self.assertNotIn("Server-Timing", skipped)
+        self.assertIn("Server-Timing", sampled)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_disabled(self):
+        """Test: a sample rate of 0 turns the instrumentation off."""
+        with self.assertNoLogs("django_library_service.timing"):
+            response = self.client.get(BOOKS_LIST_URL)
+
+        self.assertNotIn("Server-Timing", response)
@@ -0,0 +1,124 @@
+"""
+Per-request timing by phase.
+
+``ServerTimingMiddleware`` times a sample of the requests
+(``SERVER_TIMING_SAMPLE_RATE``): database queries through
+``connection.execute_wrapper``, serialization, rendering, and the calls
+to Stripe and Telegram made through ``http_client``. The breakdown goes
+out in a ``Server-Timing`` header and as one JSON log line on the
+``django_library_service.timing`` logger.
+
+Phases may overlap: a query run while serializing counts for both.
+Outside a sampled request the hooks do nothing.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.counts = {}
+        self.running = set()
+
+    def record(self, name, elapsed):
+        self.durations[name] = self.durations.get(name, 0.0) + elapsed
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    @contextmanager
+    def phase(self, name):
+        # Nested serializers (and the like) are timed by the outermost call.
+        if name in self.running:
+            yield
+            return
+
+        self.running.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.running.discard(name)
+            self.record(name, time.perf_counter() - started)
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.phase("db"):
+            return execute(sql, params, many, context)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def header(self, total):
+        metrics = [
+            f"{name};dur={duration * 1000:.1f}"
+            for name, duration in self.durations.items()
+        ]
+        return ", ".join([*metrics, f"total;dur={total * 1000:.1f}"])
+
+    def record_line(self, request, response, total):
+        match = request.resolver_match
+        return {
+            "method": request.method,
+            "path": request.path,
+            "route": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            **{
+                f"{name}_ms": round(duration * 1000, 1)
+                for name, duration in self.durations.items()
+            },
+            **{f"{name}_count": count for name, count in self.counts.items()},
+        }
+
+
+def record(name, elapsed):
+    """Add ``elapsed`` seconds to phase ``name`` of the current request."""
+    timing = _current.get()
+    if timing is not None:
+        timing.record(name, elapsed)
+
+
+@contextmanager
+def phase(name):
+    """Time the block as phase ``name`` of the current request."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+
+    with timing.phase(name):
+        yield
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.SERVER_TIMING_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            with connection.execute_wrapper(timing):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = timing.elapsed()
+        response["Server-Timing"] = timing.header(total)
+        logger.info(json.dumps(timing.record_line(request, response, total)))
+        return response
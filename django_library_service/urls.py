@@ -21,6 +21,7 @@ from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 from django_library_service import settings
+from django_library_service.views import MetricsView
 from payments.views import PaymentCancelView
 
 urlpatterns = [
@@ -31,4 +32,5 @@ urlpatterns = [
     path("api/borrowings/", include("borrowings.urls", namespace="borrowings")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,36 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views import View
+
+from borrowings.models import Borrowing
+from django_library_service.metrics import CONTENT_TYPE, REGISTRY
+from payments.models import Payment
+
+
+class MetricsView(View):
+    """Prometheus scrape target; needs ``Bearer METRICS_TOKEN`` if one is set."""
+
+    query_budget = 2
+
+    def get(self, request, *args, **kwargs):
+        if settings.METRICS_TOKEN and not hmac.compare_digest(
+            request.headers.get("Authorization", ""),
+            f"Bearer {settings.METRICS_TOKEN}",
+        ):
+            return HttpResponse(status=401)
+
+        gauges = [
+            (
+                "library_active_borrowings",
+                "Borrowings not returned yet.",
+                Borrowing.objects.active().count(),
+            ),
+            (
+                "library_pending_payments",
+                "Payments waiting to be paid.",
+                Payment.objects.filter(status="PENDING").count(),
+            ),
+        ]
+        return HttpResponse(REGISTRY.render(gauges), content_type=CONTENT_TYPE)
@@ -1,31 +1,51 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from django_library_service.http_client import get_session
+
 load_dotenv()
 
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+# Telegram rejects longer message texts.
+MESSAGE_MAX_LENGTH = 4096
+
+
+class TelegramRateLimited(Exception):
+    """Telegram answered 429; nothing may be sent for ``retry_after`` s."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too Many Requests: retry after {retry_after}")
+        self.retry_after = retry_after
+
 
+def send_telegram_message(message: str, chat_id: str = None) -> None:
+    """
+    Send ``message`` to ``chat_id`` (the library chat by default); raises
+    on any failure.
 
-def send_telegram_message(message: str) -> None:
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+    Blocking: views queue messages with ``lib_bot.outbox.notify`` instead.
+    """
+    chat_id = chat_id or TELEGRAM_CHAT_ID
+    if not TELEGRAM_BOT_TOKEN or not chat_id:
         raise Exception("Bot token or chat id is missing")
 
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
+        "chat_id": chat_id,
         "text": message,
         "parse_mode": "HTML",
     }
 
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        print("Message sent")
-    except requests.RequestException as e:
-        print(f"Error: {e}")
+    response = get_session("telegram").post(url, json=payload)
+    if response.status_code == 429:
+        try:
+            retry_after = response.json()["parameters"]["retry_after"]
+        except (ValueError, KeyError, TypeError):
+            retry_after = 1
+        raise TelegramRateLimited(retry_after)
+    response.raise_for_status()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from django_library_service.metrics import REGISTRY
+from lib_bot import bot
+from lib_bot.outbox import deliver_digests, deliver_due
+from lib_bot.ratelimit import RateLimiter
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued Telegram notifications. Failed sends are retried "
+        "with exponential backoff; runs until interrupted unless --once. "
+        "With --digest-interval, due notifications are grouped into one "
+        "message per chat every interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Deliver what is due now and exit.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to sleep when nothing is due.",
+        )
+        parser.add_argument(
+            "--digest-interval",
+            type=float,
+            default=settings.TELEGRAM_DIGEST_INTERVAL,
+            help="Seconds between digests; 0 sends every notification on its own.",
+        )
+
+    def handle(self, *args, **options):
+        if not bot.TELEGRAM_BOT_TOKEN or not bot.TELEGRAM_CHAT_ID:
+            raise CommandError("TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID are required.")
+
+        limiter = RateLimiter(settings.TELEGRAM_RATE_LIMIT, settings.TELEGRAM_RATE_BURST)
+        digest_interval = options["digest_interval"]
+        try:
+            while True:
+                if digest_interval > 0:
+                    delivered = deliver_digests(limiter=limiter)
+                else:
+                    delivered = deliver_due(limiter=limiter)
+                sent = sum(notification.status == "SENT" for notification in delivered)
+                if delivered:
+                    self.stdout.write(
+                        f"Sent {sent} notifications, "
+                        f"{len(delivered) - sent} failed or postponed."
+                    )
+                # The Telegram metrics of this process, for /metrics.
+                REGISTRY.flush()
+                if options["once"]:
+                    return
+                if digest_interval > 0:
+                    time.sleep(digest_interval)
+                elif not delivered:
+                    time.sleep(options["poll_interval"])
+        finally:
+            REGISTRY.flush(force=True)
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lib_bot", "0001_notification"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="chat_id",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("BORROWING_CREATED", "New Borrowing"),
+                    ("BORROWING_RETURNED", "Book Returned"),
+                    ("PAYMENT_SUCCEEDED", "Payment Succeeded"),
+                    ("PAYMENT_CANCELED", "Payment Canceled"),
+                ],
+                default="",
+                max_length=30,
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Notification(models.Model):
+    """
+    Telegram message waiting in the outbox.
+
+    Rows are written in the transaction of the change they announce and
+    delivered by ``manage.py send_notifications``.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("SENT", "Sent"),
+        ("FAILED", "Failed"),
+    ]
+
+    # The labels are the message headings.
+    KIND_CHOICES = [
+        ("BORROWING_CREATED", "New Borrowing"),
+        ("BORROWING_RETURNED", "Book Returned"),
+        ("PAYMENT_SUCCEEDED", "Payment Succeeded"),
+        ("PAYMENT_CANCELED", "Payment Canceled"),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    # Empty for the default chat (TELEGRAM_CHAT_ID).
+    chat_id = models.CharField(max_length=64, blank=True)
+    text = models.TextField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="PENDING"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(status="PENDING"),
+                name="notification_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.status}: {self.get_kind_display()}"
@@ -0,0 +1,175 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from lib_bot.bot import (
+    MESSAGE_MAX_LENGTH,
+    TelegramRateLimited,
+    send_telegram_message,
+)
+from lib_bot.models import Notification
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+
+
+def notify(kind, text, chat_id=""):
+    """
+    Queue a Telegram message.
+
+    Call it inside the transaction of the change it announces: the message
+    is only sent if that transaction commits. ``text`` is HTML, so escape
+    user data.
+    """
+    return Notification.objects.create(kind=kind, text=text, chat_id=chat_id)
+
+
+def backoff(attempts):
+    """Delay before the next attempt: exponential, capped, with jitter."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1)
+
+
+def render_message(notification):
+    if not notification.kind:
+        # Queued before kinds existed; the text has its own heading.
+        return notification.text
+    return f"<b>{notification.get_kind_display()}</b>\n{notification.text}"
+
+
+def render_digest(notifications):
+    """
+    Group ``notifications`` by kind into as few messages as fit Telegram's
+    length limit; yields ``(text, notifications in it)``.
+    """
+    groups = defaultdict(list)
+    for notification in notifications:
+        groups[notification.kind].append(notification)
+
+    def join(text, lines):
+        section = "\n".join(lines)
+        return f"{text}\n\n{section}" if text else section
+
+    text, included = "", []
+    for kind_notifications in groups.values():
+        heading = (
+            f"<b>{kind_notifications[0].get_kind_display()} "
+            f"({len(kind_notifications)})</b>"
+        )
+        lines = [heading]
+        for notification in kind_notifications:
+            line = "• " + " · ".join(notification.text.splitlines())
+            line = line[:MESSAGE_MAX_LENGTH - len(heading) - 1]
+            if len(join(text, lines + [line])) > MESSAGE_MAX_LENGTH:
+                yield (join(text, lines) if len(lines) > 1 else text), included
+                text, included, lines = "", [], [heading]
+            lines.append(line)
+            included.append(notification)
+        text = join(text, lines)
+    if included:
+        yield text, included
+
+
+def claim_due():
+    return (
+        Notification.objects.select_for_update(skip_locked=True)
+        .filter(status="PENDING", next_attempt_at__lte=timezone.now())
+        .order_by("next_attempt_at", "id")
+    )
+
+
+def send_batch(notifications, text, send, limiter):
+    """
+    Send one message covering ``notifications`` and record the outcome.
+    Returns False if Telegram asked us to slow down.
+    """
+    chat_id = notifications[0].chat_id
+    if limiter is not None:
+        limiter.acquire(chat_id)
+
+    rate_limited = False
+    now = timezone.now()
+    try:
+        (send or send_telegram_message)(text, chat_id or None)
+    except TelegramRateLimited as error:
+        # Not the message's fault: wait as told, without using an attempt.
+        rate_limited = True
+        if limiter is not None:
+            limiter.pause(chat_id, error.retry_after)
+        for notification in notifications:
+            notification.next_attempt_at = now + timedelta(seconds=error.retry_after)
+            notification.last_error = str(error)
+    except Exception as error:
+        for notification in notifications:
+            notification.attempts += 1
+            notification.last_error = str(error)
+            if notification.attempts >= MAX_ATTEMPTS:
+                notification.status = "FAILED"
+            else:
+                notification.next_attempt_at = now + backoff(notification.attempts)
+    else:
+        for notification in notifications:
+            notification.attempts += 1
+            notification.status = "SENT"
+            notification.sent_at = now
+            notification.last_error = ""
+
+    Notification.objects.bulk_update(
+        notifications,
+        ["status", "attempts", "next_attempt_at", "last_error", "sent_at"],
+    )
+    return not rate_limited
+
+
+def deliver_next(send=None, limiter=None):
+    """
+    Send the oldest due notification on its own, if any; return it.
+
+    The row stays locked (``SKIP LOCKED``) while it is sent, so several
+    workers can drain the outbox without sending a message twice.
+    """
+    with transaction.atomic():
+        notification = claim_due().first()
+        if notification is not None:
+            send_batch([notification], render_message(notification), send, limiter)
+        return notification
+
+
+def deliver_due(limit=None, send=None, limiter=None):
+    """Send due notifications until none is left or ``limit`` is reached."""
+    delivered = []
+    while limit is None or len(delivered) < limit:
+        notification = deliver_next(send, limiter)
+        if notification is None:
+            break
+        delivered.append(notification)
+    return delivered
+
+
+def deliver_digests(send=None, limiter=None):
+    """
+    Send everything due as one digest per chat (split only to respect the
+    length limit); return the notifications handled.
+    """
+    with transaction.atomic():
+        due = list(claim_due())
+        chats = defaultdict(list)
+        for notification in due:
+            chats[notification.chat_id].append(notification)
+
+        for notifications in chats.values():
+            batches = list(render_digest(notifications))
+            for index, (text, batch) in enumerate(batches):
+                if not send_batch(batch, text, send, limiter):
+                    # Rescheduled with the retry_after of the 429.
+                    later = [n for _, rest in batches[index + 1:] for n in rest]
+                    retry_at = batch[0].next_attempt_at
+                    for notification in later:
+                        notification.next_attempt_at = retry_at
+                    Notification.objects.bulk_update(later, ["next_attempt_at"])
+                    break
+        return due
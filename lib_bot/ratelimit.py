@@ -0,0 +1,69 @@
+import time
+
+
+class TokenBucket:
+    """
+    ``rate`` tokens per second, at most ``capacity`` banked.
+
+    ``pause`` blocks the bucket until a deadline, for servers that answer
+    429 with a ``retry_after``; it restarts with a single token then.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = capacity
+        self.updated = clock()
+        self.blocked_until = self.updated
+
+    def refill(self):
+        now = self.clock()
+        start = max(self.updated, self.blocked_until)
+        if now > start:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - start) * self.rate
+            )
+            self.updated = now
+        return now
+
+    def wait_time(self):
+        """Seconds until a token is available."""
+        now = self.refill()
+        blocked = max(0, self.blocked_until - now)
+        return blocked + max(0, 1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Take a token, sleeping until one is available."""
+        while (delay := self.wait_time()) > 0:
+            self.sleep(delay)
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        now = self.refill()
+        self.tokens = 1
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class RateLimiter:
+    """One ``TokenBucket`` per key, e.g. per Telegram chat."""
+
+    def __init__(self, rate, capacity, **bucket_options):
+        self.rate = rate
+        self.capacity = capacity
+        self.bucket_options = bucket_options
+        self.buckets = {}
+
+    def bucket(self, key):
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(
+                self.rate, self.capacity, **self.bucket_options
+            )
+        return self.buckets[key]
+
+    def acquire(self, key):
+        self.bucket(key).acquire()
+
+    def pause(self, key, seconds):
+        self.bucket(key).pause(seconds)
@@ -0,0 +1,244 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from lib_bot import outbox
+from lib_bot.bot import MESSAGE_MAX_LENGTH, TelegramRateLimited
+from lib_bot.models import Notification
+from lib_bot.outbox import (
+    deliver_digests,
+    deliver_due,
+    deliver_next,
+    notify,
+    render_digest,
+)
+
+
+class NotifyTests(TestCase):
+    def test_notification_is_queued_with_the_transaction(self):
+        """Test: a rolled back change leaves no notification behind."""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                notify("BORROWING_RETURNED", "Book returned")
+                raise RuntimeError
+
+        self.assertFalse(Notification.objects.exists())
+
+    @patch("lib_bot.bot.get_session")
+    def test_views_do_not_call_telegram(self, get_session):
+        """Test: the request path only writes to the outbox."""
+        response = self.client.get(reverse("payments:payment-cancel"))
+
+        self.assertEqual(response.status_code, 200)
+        get_session.assert_not_called()
+        self.assertEqual(
+            Notification.objects.get().text,
+            "Payment was canceled. Please try again later.",
+        )
+
+
+class DeliverTests(TestCase):
+    def test_due_notifications_are_sent(self):
+        """Test: due notifications are sent oldest first and marked sent."""
+        first = notify("BORROWING_CREATED", "first")
+        second = notify("BORROWING_CREATED", "second")
+        later = Notification.objects.create(
+            kind="BORROWING_CREATED",
+            text="later",
+            next_attempt_at=timezone.now() + timedelta(minutes=5)
+        )
+        send = Mock()
+
+        delivered = deliver_due(send=send)
+
+        self.assertEqual([n.pk for n in delivered], [first.pk, second.pk])
+        self.assertEqual(
+            [call.args[0] for call in send.call_args_list],
+            ["<b>New Borrowing</b>\nfirst", "<b>New Borrowing</b>\nsecond"],
+        )
+        first.refresh_from_db()
+        self.assertEqual(first.status, "SENT")
+        self.assertIsNotNone(first.sent_at)
+        later.refresh_from_db()
+        self.assertEqual(later.status, "PENDING")
+
+    def test_failed_send_is_retried_later(self):
+        """Test: a failed send is rescheduled with backoff."""
+        notification = notify("BORROWING_CREATED", "flaky")
+        before = timezone.now()
+
+        deliver_next(send=Mock(side_effect=ConnectionError("timed out")))
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, "PENDING")
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(notification.last_error, "timed out")
+        self.assertGreaterEqual(
+            notification.next_attempt_at, before + outbox.BACKOFF_BASE / 2
+        )
+        self.assertIsNone(deliver_next(send=Mock()))
+
+    def test_gives_up_after_max_attempts(self):
+        """Test: a notification fails for good after MAX_ATTEMPTS."""
+        notification = Notification.objects.create(
+            kind="BORROWING_CREATED", text="broken", attempts=outbox.MAX_ATTEMPTS - 1
+        )
+
+        deliver_next(send=Mock(side_effect=ConnectionError("down")))
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, "FAILED")
+
+    def test_backoff_is_exponential_and_capped(self):
+        """Test: delays double per attempt up to BACKOFF_MAX."""
+        with patch("lib_bot.outbox.random.uniform", return_value=1):
+            delays = [outbox.backoff(attempts) for attempts in range(1, 12)]
+
+        self.assertEqual(delays[0], outbox.BACKOFF_BASE)
+        self.assertEqual(delays[1], outbox.BACKOFF_BASE * 2)
+        self.assertEqual(delays[-1], outbox.BACKOFF_MAX)
+
+    @patch("lib_bot.bot.TELEGRAM_CHAT_ID", "chat")
+    @patch("lib_bot.bot.TELEGRAM_BOT_TOKEN", "token")
+    def test_command_drains_outbox_once(self):
+        """Test: `send_notifications --once` sends what is due and exits."""
+        notify("PAYMENT_CANCELED", "hello")
+        stdout = StringIO()
+
+        with patch("lib_bot.outbox.send_telegram_message") as send:
+            call_command("send_notifications", once=True, stdout=stdout)
+
+        send.assert_called_once_with("<b>Payment Canceled</b>\nhello", None)
+        self.assertIn("Sent 1 notifications", stdout.getvalue())
+
+    def test_rate_limited_send_keeps_its_attempts(self):
+        """Test: a 429 postpones by retry_after without using an attempt."""
+        notification = notify("BORROWING_CREATED", "busy")
+        limiter = Mock()
+        before = timezone.now()
+
+        deliver_next(send=Mock(side_effect=TelegramRateLimited(30)), limiter=limiter)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, "PENDING")
+        self.assertEqual(notification.attempts, 0)
+        self.assertGreaterEqual(
+            notification.next_attempt_at, before + timedelta(seconds=30)
+        )
+        limiter.acquire.assert_called_once_with("")
+        limiter.pause.assert_called_once_with("", 30)
+
+
+class DigestTests(TestCase):
+    def test_one_message_per_chat_grouped_by_kind(self):
+        """Test: due notifications are sent as one grouped message per chat."""
+        notify("BORROWING_CREATED", "User: a@example.com\nBook: Dune")
+        notify("BORROWING_RETURNED", "User: b@example.com")
+        notify("BORROWING_CREATED", "User: c@example.com\nBook: Emma")
+        notify("PAYMENT_CANCELED", "Canceled", chat_id="other")
+        send = Mock()
+
+        delivered = deliver_digests(send=send)
+
+        self.assertEqual(len(delivered), 4)
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(
+            send.call_args_list[0].args,
+            (
+                "<b>New Borrowing (2)</b>\n"
+                "• User: a@example.com · Book: Dune\n"
+                "• User: c@example.com · Book: Emma\n\n"
+                "<b>Book Returned (1)</b>\n"
+                "• User: b@example.com",
+                None,
+            ),
+        )
+        self.assertEqual(
+            send.call_args_list[1].args,
+            ("<b>Payment Canceled (1)</b>\n• Canceled", "other"),
+        )
+        self.assertFalse(Notification.objects.exclude(status="SENT").exists())
+
+    def test_long_digest_is_split(self):
+        """Test: a digest longer than Telegram allows is split in messages."""
+        notifications = [
+            Notification(kind="BORROWING_CREATED", text="x" * 1000)
+            for _ in range(10)
+        ]
+
+        chunks = list(render_digest(notifications))
+
+        self.assertGreater(len(chunks), 1)
+        for text, included in chunks:
+            self.assertLessEqual(len(text), MESSAGE_MAX_LENGTH)
+            self.assertTrue(text.startswith("<b>New Borrowing (10)</b>"))
+        self.assertEqual(sum(len(included) for _, included in chunks), 10)
+
+    def test_rate_limited_digest_postpones_the_rest(self):
+        """Test: after a 429 the remaining parts wait for retry_after."""
+        for _ in range(10):
+            notify("BORROWING_CREATED", "x" * 1000)
+        send = Mock(side_effect=[None, TelegramRateLimited(60)])
+        before = timezone.now()
+
+        deliver_digests(send=send)
+
+        self.assertEqual(send.call_count, 2)
+        pending = Notification.objects.filter(status="PENDING")
+        self.assertTrue(pending.exists())
+        self.assertTrue(Notification.objects.filter(status="SENT").exists())
+        for notification in pending:
+            self.assertEqual(notification.attempts, 0)
+            self.assertGreaterEqual(
+                notification.next_attempt_at, before + timedelta(seconds=60)
+            )
+
+    @patch("lib_bot.bot.TELEGRAM_CHAT_ID", "chat")
+    @patch("lib_bot.bot.TELEGRAM_BOT_TOKEN", "token")
+    def test_command_sends_digest(self):
+        """Test: `send_notifications --digest-interval` sends one digest."""
+        notify("PAYMENT_CANCELED", "one")
+        notify("PAYMENT_CANCELED", "two")
+
+        with patch("lib_bot.outbox.send_telegram_message") as send:
+            call_command(
+                "send_notifications", once=True, digest_interval=60, stdout=StringIO()
+            )
+
+        send.assert_called_once_with(
+            "<b>Payment Canceled (2)</b>\n• one\n• two", None
+        )
+
+
+class ConcurrentDeliveryTests(TransactionTestCase):
+    def test_locked_notification_is_skipped(self):
+        """Test: a notification being sent by another worker is skipped."""
+        notification = notify("BORROWING_CREATED", "once")
+        locked, release = threading.Event(), threading.Event()
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    Notification.objects.select_for_update().get(pk=notification.pk)
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        locked.wait(5)
+        try:
+            self.assertIsNone(deliver_next(send=Mock()))
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(deliver_next(send=Mock()).pk, notification.pk)
@@ -0,0 +1,97 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from lib_bot import bot
+from lib_bot.bot import TelegramRateLimited, send_telegram_message
+from lib_bot.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(
+            rate=2, capacity=3, clock=self.clock, sleep=self.clock.sleep
+        )
+
+    def test_burst_then_rate(self):
+        """Test: a full bucket allows a burst, then one token per 1/rate s."""
+        for _ in range(3):
+            self.bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+        self.bucket.acquire()
+
+        self.assertEqual(self.clock.sleeps, [0.5])
+
+    def test_refill_is_capped(self):
+        """Test: idle time banks at most `capacity` tokens."""
+        self.clock.now = 100
+        for _ in range(3):
+            self.bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+        self.bucket.acquire()
+
+        self.assertEqual(len(self.clock.sleeps), 1)
+
+    def test_pause_honours_retry_after(self):
+        """Test: nothing is acquired before a 429's retry_after has passed."""
+        self.bucket.pause(30)
+
+        self.bucket.acquire()
+        self.assertEqual(sum(self.clock.sleeps), 30)
+
+        self.bucket.acquire()
+        self.assertEqual(sum(self.clock.sleeps), 30.5)
+
+    def test_limiter_keeps_a_bucket_per_key(self):
+        """Test: pausing one chat does not slow down another."""
+        limiter = RateLimiter(2, 1, clock=self.clock, sleep=self.clock.sleep)
+        limiter.pause("busy", 10)
+
+        limiter.acquire("quiet")
+        self.assertEqual(self.clock.sleeps, [])
+
+        limiter.acquire("busy")
+        self.assertEqual(self.clock.sleeps, [10])
+
+
+@patch.object(bot, "TELEGRAM_CHAT_ID", "chat")
+@patch.object(bot, "TELEGRAM_BOT_TOKEN", "token")
+class SendTelegramMessageTests(TestCase):
+    @patch("lib_bot.bot.get_session")
+    def test_429_raises_with_retry_after(self, get_session):
+        """Test: a 429 is raised as TelegramRateLimited with retry_after."""
+        get_session.return_value.post.return_value = Mock(
+            status_code=429,
+            json=Mock(return_value={"ok": False, "parameters": {"retry_after": 17}}),
+        )
+
+        with self.assertRaises(TelegramRateLimited) as raised:
+            send_telegram_message("hi")
+
+        self.assertEqual(raised.exception.retry_after, 17)
+
+    @patch("lib_bot.bot.get_session")
+    def test_sends_to_given_chat(self, get_session):
+        """Test: chat_id overrides the default chat."""
+        post = get_session.return_value.post
+        post.return_value = Mock(status_code=200)
+
+        send_telegram_message("hi", "other")
+
+        get_session.assert_called_once_with("telegram")
+        self.assertEqual(post.call_args.kwargs["json"]["chat_id"], "other")
@@ -0,0 +1,110 @@
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from lib_bot.outbox import notify
+from payments.models import Payment, StripeEvent
+
+PAID_EVENT_TYPES = (
+    "checkout.session.completed",
+    "checkout.session.async_payment_succeeded",
+)
+EXPIRED_EVENT_TYPES = ("checkout.session.expired",)
+HANDLED_EVENT_TYPES = PAID_EVENT_TYPES + EXPIRED_EVENT_TYPES
+BATCH_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+def record_event(event):
+    """
+    Store a verified webhook event for processing; returns False if it was
+    delivered before.
+    """
+    _, created = StripeEvent.objects.get_or_create(
+        id=event["id"], defaults={"type": event["type"], "payload": event}
+    )
+    return created
+
+
+def process_events(batch_size=BATCH_SIZE):
+    """
+    Apply the oldest ``batch_size`` unprocessed events to their payments;
+    return them. Only local rows are touched.
+
+    Updates are idempotent: PAID is final and an expiry only applies to
+    a payment still waiting on that session. A payment is only PAID by a
+    session that charged its current amount: a re-priced fine may still
+    have an older session open. Locked rows are skipped, so several
+    workers can share the backlog.
+    """
+    with transaction.atomic():
+        events = list(
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by("received_at")[:batch_size]
+        )
+        if not events:
+            return events
+
+        # Amounts (in cents) paid per payment id and per session id.
+        paid_ids, paid_sessions = defaultdict(set), defaultdict(set)
+        expired_sessions = set()
+        for event in events:
+            session = event.payload["data"]["object"]
+            if event.type in PAID_EVENT_TYPES:
+                if session.get("payment_status") != "paid":
+                    # Delayed payment methods: wait for async_payment_succeeded.
+                    continue
+                # A session is created per attempt; the reference survives.
+                reference = session.get("client_reference_id")
+                amount = session.get("amount_total")
+                if reference and reference.isdigit():
+                    paid_ids[int(reference)].add(amount)
+                else:
+                    paid_sessions[session["id"]].add(amount)
+            elif event.type in EXPIRED_EVENT_TYPES:
+                expired_sessions.add(session["id"])
+
+        newly_paid = []
+        for payment in (
+            Payment.objects.select_for_update()
+            .filter(Q(pk__in=list(paid_ids)) | Q(session_id__in=list(paid_sessions)))
+            .exclude(status="PAID")
+        ):
+            amounts = paid_ids.get(payment.pk, set()) | paid_sessions.get(
+                payment.session_id, set()
+            )
+            due = int(payment.amount * 100)
+            if due in amounts:
+                newly_paid.append(payment)
+            else:
+                # Left open; the amount received needs a look from staff.
+                logger.warning(
+                    "Payment %s was paid %s cents through a stale session; "
+                    "%s cents are due.",
+                    payment.pk,
+                    "/".join(str(amount) for amount in amounts),
+                    due,
+                )
+        Payment.objects.filter(pk__in=[payment.pk for payment in newly_paid]).update(
+            status="PAID"
+        )
+        for payment in newly_paid:
+            notify(
+                "PAYMENT_SUCCEEDED",
+                f"Payment for Borrowing ID {payment.borrowing_id} "
+                f"has been successfully processed.",
+            )
+
+        Payment.objects.filter(
+            session_id__in=expired_sessions, status="PENDING"
+        ).update(status="EXPIRED")
+
+        StripeEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            processed_at=timezone.now()
+        )
+        return events
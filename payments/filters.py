@@ -0,0 +1,16 @@
+import django_filters
+
+from payments.models import Payment
+
+
+class PaymentFilter(django_filters.FilterSet):
+    # No Meta.model: the same filters apply to PaymentHistory
+    # (?include_archived=true).
+    status = django_filters.ChoiceFilter(choices=Payment.STATUS_CHOICES)
+    type = django_filters.ChoiceFilter(choices=Payment.TYPE_CHOICES)
+    created_after = django_filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="gte"
+    )
+    created_before = django_filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="lt"
+    )
@@ -0,0 +1,119 @@
+"""
+Set-based fine assessment.
+
+A borrowing kept past ``expected_return_date`` owes
+``days_overdue * daily_fee * FINE_MULT``, less the fines already paid for
+it. The balance is kept in one open (not PAID) FINE payment per borrowing
+(``payment_open_fine_uniq``) with ``INSERT ... ON CONFLICT``, so running
+the assessment again only updates amounts. A re-priced fine drops its
+Checkout Session, which is queued to be expired (``StaleCheckoutSession``).
+"""
+from datetime import date
+
+from django.db import connection
+
+from borrowings.models import FINE_MULT
+
+CHUNK_SIZE = 10_000
+
+UPSERT_FINES_SQL = """
+WITH overdue AS (
+    SELECT b.id, b.user_id, b.expected_return_date, b.actual_return_date,
+           bk.daily_fee
+    FROM borrowings_borrowing b
+    JOIN books_book bk ON bk.id = b.book_id
+    WHERE {where}
+    ORDER BY b.id
+    LIMIT %(limit)s
+), balance AS (
+    SELECT overdue.id, overdue.user_id,
+           (COALESCE(overdue.actual_return_date, %(on)s)
+            - overdue.expected_return_date) * overdue.daily_fee * %(mult)s
+           - COALESCE((
+               SELECT SUM(p.amount) FROM payments_payment p
+               WHERE p.borrowing_id = overdue.id
+                 AND p.type = 'FINE' AND p.status = 'PAID'
+           ), 0) AS amount
+    FROM overdue
+), upserted AS (
+    INSERT INTO payments_payment (
+        user_id, borrowing_id, status, type, amount,
+        session_url, session_id, created_at
+    )
+    SELECT user_id, id, 'PENDING', 'FINE', amount, '', '', NOW()
+    FROM balance
+    WHERE amount > 0
+    ON CONFLICT (borrowing_id) WHERE type = 'FINE' AND NOT status = 'PAID'
+    DO UPDATE SET
+        amount = EXCLUDED.amount,
+        -- A session charges the old amount: make the next request open a new one.
+        session_url = '',
+        session_id = '',
+        session_expires_at = NULL
+    WHERE payments_payment.amount <> EXCLUDED.amount
+    RETURNING id, (xmax = 0) AS inserted
+), stale AS (
+    -- Sub-statements read the table as it was before the upsert, so this
+    -- is the session opened at the old amount; it is expired at Stripe.
+    INSERT INTO payments_stalecheckoutsession (id, queued_at, last_error)
+    SELECT previous.session_id, NOW(), ''
+    FROM upserted
+    JOIN payments_payment previous ON previous.id = upserted.id
+    WHERE NOT upserted.inserted AND previous.session_id <> ''
+    ON CONFLICT (id) DO NOTHING
+)
+SELECT
+    (SELECT MAX(id) FROM overdue),
+    (SELECT COUNT(*) FROM overdue),
+    COUNT(*) FILTER (WHERE inserted),
+    COUNT(*) FILTER (WHERE NOT inserted)
+FROM upserted
+"""
+
+OVERDUE_WHERE = (
+    "b.actual_return_date IS NULL AND b.expected_return_date < %(on)s "
+    "AND b.id > %(after)s"
+)
+BORROWING_WHERE = (
+    "b.id = %(borrowing_id)s "
+    "AND b.expected_return_date < COALESCE(b.actual_return_date, %(on)s)"
+)
+
+
+def upsert_fines(where, params):
+    """Run UPSERT_FINES_SQL; returns (last id, assessed, created, updated)."""
+    params = {"mult": FINE_MULT, **params}
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_FINES_SQL.format(where=where), params)
+        last_id, assessed, created, updated = cursor.fetchone()
+    return last_id, assessed, created, updated
+
+
+def assess_overdue_fines(on=None, chunk_size=CHUNK_SIZE):
+    """
+    Bring the fines of all unreturned overdue borrowings up to date as of
+    ``on`` (today by default).
+
+    Works through the borrowings ``chunk_size`` at a time in id order;
+    every chunk is a single statement committed on its own, so the job can
+    be interrupted and rerun. Yields ``(assessed, created, updated)`` per
+    chunk.
+    """
+    on = on or date.today()
+    after = 0
+    while True:
+        last_id, assessed, created, updated = upsert_fines(
+            OVERDUE_WHERE, {"on": on, "after": after, "limit": chunk_size}
+        )
+        if not assessed:
+            return
+        yield assessed, created, updated
+        after = last_id
+
+
+def assess_fine(borrowing, on=None):
+    """Bring the fine of one borrowing up to date, returned or not."""
+    upsert_fines(
+        BORROWING_WHERE,
+        {"borrowing_id": borrowing.pk, "on": on or date.today(), "limit": 1},
+    )
@@ -0,0 +1,45 @@
+import time
+from datetime import date
+
+from django.core.management import BaseCommand
+
+from payments.fines import CHUNK_SIZE, assess_overdue_fines
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update the FINE payment of every unreturned overdue "
+        "borrowing (days_overdue * daily_fee * FINE_MULT, less fines paid) "
+        "in chunked set-based upserts. Meant to run nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            default=None,
+            help="Assess fines as of this day (YYYY-MM-DD); today by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Borrowings per statement.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        totals = [0, 0, 0]
+        for chunk in assess_overdue_fines(options["date"], options["chunk_size"]):
+            totals = [total + count for total, count in zip(totals, chunk)]
+            if options["verbosity"] > 1:
+                self.stdout.write(
+                    f"{totals[0]} borrowings assessed "
+                    f"({time.perf_counter() - started:.1f}s)"
+                )
+
+        assessed, created, updated = totals
+        self.stdout.write(
+            f"Assessed {assessed} overdue borrowings: {created} fines created, "
+            f"{updated} updated in {time.perf_counter() - started:.1f}s."
+        )
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management import BaseCommand
+
+from django_library_service.metrics import REGISTRY
+from payments.events import BATCH_SIZE, process_events
+from payments.utils import expire_stale_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply stored Stripe webhook events to payments in batches and "
+        "expire stale Checkout Sessions at Stripe; runs until interrupted "
+        "unless --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process what is stored now and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Events applied per transaction.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when no event is waiting.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                processed = 0
+                while events := process_events(options["batch_size"]):
+                    processed += len(events)
+                if processed:
+                    self.stdout.write(f"Processed {processed} events.")
+                expired = 0
+                while done := expire_stale_sessions(options["batch_size"]):
+                    expired += done
+                if expired:
+                    self.stdout.write(f"Expired {expired} stale sessions.")
+                # The Stripe metrics of this process, for /metrics.
+                REGISTRY.flush()
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+        finally:
+            REGISTRY.flush(force=True)
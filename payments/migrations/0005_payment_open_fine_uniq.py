@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowings", "0003_borrowing_indexes"),
+        ("payments", "0004_stripe_event"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("type", "FINE"), models.Q(("status", "PAID"), _negated=True)
+                ),
+                fields=("borrowing",),
+                name="payment_open_fine_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0007_payment_list_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StaleCheckoutSession",
+            fields=[
+                (
+                    "id",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("queued_at", models.DateTimeField(auto_now_add=True)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+        ),
+    ]
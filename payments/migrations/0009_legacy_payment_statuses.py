@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# Written before the statuses and types were upper-case choices: the old
+# success view stored "Success", payments were created as "Pending", and
+# none of them was given a type.
+LEGACY_STATUSES = {"Success": "PAID", "Pending": "PENDING"}
+LEGACY_TYPE = ""
+
+
+def map_legacy_values(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    for legacy, status in LEGACY_STATUSES.items():
+        Payment.objects.filter(status=legacy).update(status=status)
+    Payment.objects.filter(type=LEGACY_TYPE).update(type="PAYMENT")
+
+
+def restore_legacy_values(apps, schema_editor):
+    # Legacy rows can't be told apart any more: every row gets back the
+    # values the old code wrote, which is all it can read.
+    Payment = apps.get_model("payments", "Payment")
+    for legacy, status in LEGACY_STATUSES.items():
+        Payment.objects.filter(status=status).update(status=legacy)
+    Payment.objects.filter(type="PAYMENT").update(type=LEGACY_TYPE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0008_stale_checkout_session"),
+    ]
+
+    operations = [
+        migrations.RunPython(map_legacy_values, restore_legacy_values),
+    ]
@@ -1,7 +1,7 @@
 from django.conf import settings
 from django.db import models
 
-from borrowings.models import Borrowing
+from borrowings.models import ArchivedBorrowing, Borrowing, BorrowingHistory
 
 
 class Payment(models.Model):
@@ -20,7 +20,9 @@ class Payment(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        related_name="payments"
+        related_name="payments",
+        # Covered by payment_user_idx, which also serves the ordering.
+        db_index=False,
     )
     borrowing = models.ForeignKey(Borrowing, on_delete=models.CASCADE, related_name="payments")
     status = models.CharField(
@@ -30,9 +32,132 @@ class Payment(models.Model):
     )
     type = models.CharField(max_length=20, choices=TYPE_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    session_url = models.URLField(max_length=1000)
-    session_id = models.CharField(max_length=255)
+    # Empty until the client asks to pay (lazy checkout).
+    session_url = models.URLField(max_length=1000, blank=True)
+    session_id = models.CharField(max_length=255, blank=True)
+    session_expires_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Lists are scoped to the user (unless staff), filtered by
+        # status / type / created_at and paged by id.
+        # A reader has a few dozen payments: (user, id) serves every filter
+        # of their list. The staff list orders by id too, so a date range
+        # is read from payment_created_idx and sorted, one page at a time.
+        indexes = [
+            models.Index(fields=["user", "id"], name="payment_user_idx"),
+            models.Index(
+                fields=["status", "type", "id"], name="payment_status_idx"
+            ),
+            models.Index(fields=["created_at"], name="payment_created_idx"),
+        ]
+        constraints = [
+            # payments.fines keeps one open fine per borrowing up to date.
+            models.UniqueConstraint(
+                fields=["borrowing"],
+                condition=models.Q(type="FINE") & ~models.Q(status="PAID"),
+                name="payment_open_fine_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.type} - {self.status}"
+
+
+class StripeEvent(models.Model):
+    """
+    Stripe webhook event, stored once per event id.
+
+    Stripe delivers events at least once; the primary key drops repeats.
+    Rows are applied to payments in batches by
+    ``manage.py process_stripe_events``.
+    """
+
+    id = models.CharField(primary_key=True, max_length=255)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["received_at"],
+                condition=models.Q(processed_at__isnull=True),
+                name="stripe_event_unprocessed_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.type} ({self.id})"
+
+
+class StaleCheckoutSession(models.Model):
+    """
+    Checkout Session that no longer matches its payment (a re-priced fine,
+    a session created twice), queued to be expired at Stripe by
+    ``manage.py process_stripe_events``.
+    """
+
+    id = models.CharField(primary_key=True, max_length=255)
+    queued_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return self.id
+
+
+class ArchivedPayment(models.Model):
+    """Payment moved out with its borrowing by ``archive_history``."""
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    borrowing = models.ForeignKey(
+        ArchivedBorrowing, on_delete=models.CASCADE, related_name="payments"
+    )
+    status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    type = models.CharField(max_length=20, choices=Payment.TYPE_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    session_url = models.URLField(max_length=1000, blank=True)
+    session_id = models.CharField(max_length=255, blank=True)
+    session_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+
+class PaymentHistory(models.Model):
+    """
+    Read-only view of ``Payment`` and ``ArchivedPayment`` together
+    (``UNION ALL``), for clients asking for the full history.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        related_name="+",
+        db_constraint=False,
+    )
+    borrowing = models.ForeignKey(
+        BorrowingHistory,
+        on_delete=models.DO_NOTHING,
+        related_name="payments",
+        db_constraint=False,
+    )
+    status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    type = models.CharField(max_length=20, choices=Payment.TYPE_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    session_url = models.URLField(max_length=1000, blank=True)
+    session_id = models.CharField(max_length=255, blank=True)
+    session_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived = models.BooleanField()
+
+    class Meta:
+        managed = False
+        db_table = "payments_paymenthistory"
+
     def __str__(self):
         return f"{self.user} - {self.type} - {self.status}"
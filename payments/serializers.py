@@ -1,10 +1,13 @@
 from rest_framework import serializers
 
-from borrowings.serializers import BorrowingSerializer
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingSerializer, BorrowingValuesSerializer
+from django_library_service.fieldsets import SparseFieldsetMixin
+from django_library_service.serializers import ValuesSerializer
 from payments.models import Payment
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     borrowing = BorrowingSerializer()
     user = serializers.StringRelatedField(read_only=True)
 
@@ -20,3 +23,47 @@ class PaymentSerializer(serializers.ModelSerializer):
             "session_id",
             "created_at",
         )
+
+
+class PaymentCreateSerializer(serializers.ModelSerializer):
+    borrowing = serializers.PrimaryKeyRelatedField(queryset=Borrowing.objects.all())
+
+    class Meta:
+        model = Payment
+        fields = (
+            "id",
+            "borrowing",
+            "status",
+            "type",
+            "amount",
+            "session_id",
+            "created_at",
+        )
+        read_only_fields = (
+            "id", "status", "type", "amount", "session_id", "created_at"
+        )
+
+    def validate_borrowing(self, borrowing):
+        user = self.context["request"].user
+        if borrowing.user_id != user.id and not user.is_staff:
+            raise serializers.ValidationError(
+                "You can pay only for your own borrowings."
+            )
+        return borrowing
+
+
+class PaymentValuesSerializer(ValuesSerializer):
+    serializer_class = PaymentSerializer
+    nested = {"borrowing": BorrowingValuesSerializer}
+    extra_lookups = {"user": ("user__email",)}
+
+    def get_user(self, row):
+        # str(user) is the email
+        return self.value(row, "user__email")
+
+
+class PaymentSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Payment
+        fields = ("id", "session_id", "session_url", "session_expires_at")
+        read_only_fields = fields
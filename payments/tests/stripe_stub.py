@@ -0,0 +1,129 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import stripe
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        params = {
+            key: values[0]
+            for key, values in parse_qs(self.rfile.read(length).decode()).items()
+        }
+        self.server.stub.requests.append(("POST", self.path, params))
+        if self.server.stub.error_status:
+            return self.respond(
+                self.server.stub.error_status,
+                {"error": {"type": "api_error", "message": "Stripe is down."}},
+            )
+        if self.path.endswith("/expire"):
+            return self.expire(self.path.split("/")[-2])
+        if self.path != "/v1/checkout/sessions":
+            return self.respond(404, {"error": {"message": "Unknown path."}})
+
+        session_id = f"cs_test_{len(self.server.stub.sessions) + 1}"
+        session = {
+            "id": session_id,
+            "object": "checkout.session",
+            "url": f"https://checkout.stripe.com/c/pay/{session_id}",
+            "expires_at": int(params["expires_at"]),
+            "client_reference_id": params.get("client_reference_id"),
+            "amount_total": int(params["line_items[0][price_data][unit_amount]"]),
+            "payment_status": "unpaid",
+            "status": "open",
+        }
+        self.server.stub.sessions[session_id] = session
+        self.respond(200, session)
+
+    def expire(self, session_id):
+        session = self.server.stub.sessions.get(session_id)
+        if session is None or session["status"] != "open":
+            return self.respond(
+                400,
+                {
+                    "error": {
+                        "type": "invalid_request_error",
+                        "message": "Only open sessions can be expired.",
+                    }
+                },
+            )
+        session["status"] = "expired"
+        self.respond(200, session)
+
+    def do_GET(self):
+        self.server.stub.requests.append(("GET", self.path, {}))
+        session = self.server.stub.sessions.get(self.path.rsplit("/", 1)[-1])
+        if session is None:
+            return self.respond(404, {"error": {"message": "No such session."}})
+        self.respond(200, session)
+
+    def respond(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StripeStubServer(ThreadingHTTPServer):
+    # Pooled keep-alive connections outlive the test; don't wait for them.
+    daemon_threads = True
+    block_on_close = False
+
+
+class StripeStub:
+    """
+    A local stand-in for the Stripe API, covering Checkout Sessions (create,
+    retrieve, expire).
+
+    Use as a context manager: the Stripe SDK is pointed at it meanwhile.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.sessions = {}
+        self.error_status = None
+
+    def __enter__(self):
+        self.server = StripeStubServer(("127.0.0.1", 0), StripeStubHandler)
+        self.server.stub = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.patches = [
+            patch.object(
+                stripe, "api_base", f"http://127.0.0.1:{self.server.server_port}"
+            ),
+            patch.object(stripe, "api_key", "sk_test_stub"),
+        ]
+        for stub_patch in self.patches:
+            stub_patch.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        for stub_patch in self.patches:
+            stub_patch.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def expired(self):
+        return [
+            path.split("/")[-2] for method, path, params in self.requests
+            if method == "POST" and path.endswith("/expire")
+        ]
+
+    @property
+    def created(self):
+        return [
+            params for method, path, params in self.requests
+            if method == "POST" and path == "/v1/checkout/sessions"
+        ]
@@ -0,0 +1,231 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import stripe
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment, StaleCheckoutSession
+from payments.tests.stripe_stub import StripeStub
+from user.models import User
+
+BORROWINGS_LIST_URL = reverse("borrowings:borrowing-list")
+PAYMENTS_LIST_URL = reverse("payments:payment_list")
+
+
+def get_payment_session_url(payment_id):
+    return reverse("payments:payment-session", args=[payment_id])
+
+
+class LazyCheckoutTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        self.book = Book.objects.create(
+            title="Test Book", author="Author", inventory=5, daily_fee=Decimal("2.00")
+        )
+        self.client.force_authenticate(user=self.user)
+        self.stripe = self.enterContext(StripeStub())
+
+    def borrow(self, days=7):
+        response = self.client.post(
+            BORROWINGS_LIST_URL,
+            {
+                "book": self.book.id,
+                "expected_return_date": date.today() + timedelta(days=days),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Payment.objects.get(borrowing__book=self.book)
+
+    def test_borrowing_records_a_pending_payment_without_stripe(self):
+        """Test: borrowing records the charge locally, Stripe is not called."""
+        payment = self.borrow(days=3)
+
+        self.assertEqual(self.stripe.requests, [])
+        self.assertEqual(payment.status, "PENDING")
+        self.assertEqual(payment.type, "PAYMENT")
+        self.assertEqual(payment.amount, Decimal("6.00"))
+        self.assertEqual(payment.session_url, "")
+
+    def test_session_is_created_on_request_and_cached(self):
+        """Test: the first request creates the session, later ones reuse it."""
+        payment = self.borrow(days=3)
+
+        first = self.client.get(get_payment_session_url(payment.id))
+        second = self.client.get(get_payment_session_url(payment.id))
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(len(self.stripe.created), 1)
+        params = self.stripe.created[0]
+        self.assertEqual(params["line_items[0][price_data][unit_amount]"], "600")
+        self.assertEqual(params["client_reference_id"], str(payment.id))
+        payment.refresh_from_db()
+        self.assertEqual(first.data["session_url"], payment.session_url)
+        self.assertTrue(payment.session_url.startswith("https://checkout.stripe.com/"))
+        self.assertGreater(payment.session_expires_at, timezone.now())
+
+    def test_expiring_session_is_replaced(self):
+        """Test: a session about to expire is not handed out again."""
+        payment = self.borrow()
+        self.client.get(get_payment_session_url(payment.id))
+        Payment.objects.filter(pk=payment.pk).update(
+            session_expires_at=timezone.now() + timedelta(minutes=1)
+        )
+
+        response = self.client.get(get_payment_session_url(payment.id))
+
+        self.assertEqual(len(self.stripe.created), 2)
+        self.assertEqual(response.data["session_id"], "cs_test_2")
+
+    def test_no_lock_is_held_while_stripe_is_called(self):
+        """Test: the session is saved with a conditional UPDATE, not a row lock."""
+        payment = self.borrow()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(get_payment_session_url(payment.id))
+
+        self.assertFalse(
+            [query for query in queries if "FOR UPDATE" in query["sql"]]
+        )
+
+    def test_concurrent_request_keeps_its_session(self):
+        """Test: the session saved first wins; the other one is queued to expire."""
+        payment = self.borrow()
+        create = stripe.checkout.Session.create
+
+        def created_meanwhile(**params):
+            Payment.objects.filter(pk=payment.pk).update(
+                session_id="cs_first",
+                session_url="https://checkout.stripe.com/c/pay/cs_first",
+                session_expires_at=timezone.now() + timedelta(hours=1),
+            )
+            return create(**params)
+
+        with mock.patch.object(
+            stripe.checkout.Session, "create", side_effect=created_meanwhile
+        ):
+            response = self.client.get(get_payment_session_url(payment.id))
+
+        self.assertEqual(response.data["session_id"], "cs_first")
+        payment.refresh_from_db()
+        self.assertEqual(payment.session_id, "cs_first")
+        self.assertEqual(
+            list(StaleCheckoutSession.objects.values_list("id", flat=True)),
+            ["cs_test_1"],
+        )
+
+    def test_payment_is_created_for_a_borrowing_id(self):
+        """Test: POST with a borrowing id records a pending payment, no session."""
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=3),
+        )
+
+        response = self.client.post(
+            PAYMENTS_LIST_URL, {"borrowing": borrowing.id}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["borrowing"], borrowing.id)
+        payment = Payment.objects.get(pk=response.data["id"])
+        self.assertEqual(payment.status, "PENDING")
+        self.assertEqual(payment.amount, Decimal("6.00"))
+        self.assertEqual(payment.session_id, "")
+        self.assertEqual(self.stripe.requests, [])
+
+    def test_payment_for_another_users_borrowing_is_refused(self):
+        """Test: users can only create payments for their own borrowings."""
+        other = User.objects.create_user(
+            email="other@example.com",
+            first_name="Other",
+            last_name="User",
+            password="password123"
+        )
+        borrowing = Borrowing.objects.create(
+            user=other,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=3),
+        )
+
+        response = self.client.post(
+            PAYMENTS_LIST_URL, {"borrowing": borrowing.id}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("borrowing", response.data)
+        self.assertFalse(Payment.objects.filter(borrowing=borrowing).exists())
+
+    def test_only_pending_payments_get_a_session(self):
+        """Test: a paid payment has nothing left to pay."""
+        payment = self.borrow()
+        Payment.objects.filter(pk=payment.pk).update(status="PAID")
+
+        response = self.client.get(get_payment_session_url(payment.id))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stripe.created, [])
+
+    def test_other_users_payment_is_not_found(self):
+        """Test: users cannot get a session for another user's payment."""
+        payment = self.borrow()
+        other = User.objects.create_user(
+            email="other@example.com",
+            first_name="Other",
+            last_name="User",
+            password="password123"
+        )
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(get_payment_session_url(payment.id))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stripe_error_is_reported(self):
+        """Test: a Stripe failure returns 502 and caches nothing."""
+        payment = self.borrow()
+        self.stripe.error_status = 500
+
+        response = self.client.get(get_payment_session_url(payment.id))
+
+        self.assertEqual(response.status_code, status.HTTP_502_BAD_GATEWAY)
+        payment.refresh_from_db()
+        self.assertEqual(payment.session_id, "")
+
+    def test_overdue_return_records_a_fine(self):
+        """Test: returning late records a pending fine without Stripe."""
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() - timedelta(days=2),
+        )
+
+        borrowing.return_borrowing_with_fine(actual_return_date=date.today())
+
+        fine = Payment.objects.get(borrowing=borrowing, type="FINE")
+        self.assertEqual(fine.status, "PENDING")
+        self.assertEqual(fine.amount, Decimal("8.00"))
+        self.assertEqual(self.stripe.requests, [])
+
+    @override_settings(STRIPE_LAZY_CHECKOUT=False)
+    def test_eager_mode_creates_the_session_at_borrow_time(self):
+        """Test: with lazy checkout off, borrowing creates the session."""
+        payment = self.borrow()
+
+        self.assertEqual(len(self.stripe.created), 1)
+        self.assertEqual(payment.session_id, "cs_test_1")
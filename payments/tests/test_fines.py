@@ -0,0 +1,186 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.events import process_events
+from payments.fines import assess_overdue_fines
+from payments.models import Payment, StaleCheckoutSession, StripeEvent
+from payments.tests.stripe_stub import StripeStub
+from payments.tests.test_webhook import checkout_event
+from payments.utils import expire_stale_sessions
+from user.models import User
+
+TODAY = date(2025, 6, 10)
+
+
+class AssessOverdueFinesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        cls.book = Book.objects.create(
+            title="Test Book", author="Author", inventory=50, daily_fee=Decimal("1.50")
+        )
+
+    def borrow(self, days_overdue, returned=None):
+        return Borrowing.objects.bulk_create([
+            Borrowing(
+                user=self.user,
+                book=self.book,
+                expected_return_date=TODAY - timedelta(days=days_overdue),
+                actual_return_date=returned,
+            )
+        ])[0]
+
+    def fine(self, borrowing):
+        return Payment.objects.get(borrowing=borrowing, type="FINE", status="PENDING")
+
+    def assess(self, on=TODAY, chunk_size=1000):
+        return list(assess_overdue_fines(on=on, chunk_size=chunk_size))
+
+    def test_fines_accrue_on_unreturned_overdue_borrowings(self):
+        """Test: days_overdue * daily_fee * FINE_MULT for active overdue rows."""
+        overdue = self.borrow(days_overdue=3)
+        self.borrow(days_overdue=0)
+        self.borrow(days_overdue=-5)
+        self.borrow(days_overdue=10, returned=TODAY)
+
+        self.assertEqual(self.assess(), [(1, 1, 0)])
+
+        fine = self.fine(overdue)
+        self.assertEqual(fine.amount, Decimal("9.00"))
+        self.assertEqual(fine.user, self.user)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_rerun_updates_the_open_fine(self):
+        """Test: the next night's run raises the amount of the same row."""
+        borrowing = self.borrow(days_overdue=3)
+        self.assess()
+        Payment.objects.filter(borrowing=borrowing).update(
+            session_url="https://checkout.stripe.com/c/pay/cs_old",
+            session_id="cs_old",
+            session_expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+        self.assertEqual(self.assess(on=TODAY + timedelta(days=1)), [(1, 0, 1)])
+
+        fine = self.fine(borrowing)
+        self.assertEqual(fine.amount, Decimal("12.00"))
+        self.assertEqual(fine.session_url, "")
+        self.assertEqual(fine.session_id, "")
+        self.assertIsNone(fine.session_expires_at)
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertEqual(
+            list(StaleCheckoutSession.objects.values_list("id", flat=True)),
+            ["cs_old"],
+        )
+
+    def test_repriced_fine_paid_through_the_stale_session(self):
+        """Test: paying the old amount in the old session doesn't settle the fine."""
+        borrowing = self.borrow(days_overdue=3)
+        self.assess()
+        old = self.fine(borrowing)
+        Payment.objects.filter(pk=old.pk).update(session_id="cs_old")
+        self.assess(on=TODAY + timedelta(days=1))
+
+        stale_payment = checkout_event("evt_1", "checkout.session.completed", old)
+        StripeEvent.objects.create(
+            id="evt_1", type=stale_payment["type"], payload=stale_payment
+        )
+        with self.assertLogs("payments.events", "WARNING"):
+            process_events()
+
+        fine = self.fine(borrowing)
+        self.assertEqual(fine.status, "PENDING")
+        self.assertEqual(fine.amount, Decimal("12.00"))
+
+    def test_stale_sessions_are_expired_at_stripe(self):
+        """Test: queued stale sessions are expired once, then dropped."""
+        StaleCheckoutSession.objects.create(id="cs_open")
+        StaleCheckoutSession.objects.create(id="cs_completed")
+
+        with StripeStub() as stripe_stub:
+            stripe_stub.sessions["cs_open"] = {"id": "cs_open", "status": "open"}
+            stripe_stub.sessions["cs_completed"] = {
+                "id": "cs_completed", "status": "complete"
+            }
+            self.assertEqual(expire_stale_sessions(), 2)
+
+        self.assertEqual(stripe_stub.sessions["cs_open"]["status"], "expired")
+        self.assertCountEqual(stripe_stub.expired, ["cs_open", "cs_completed"])
+        self.assertFalse(StaleCheckoutSession.objects.exists())
+
+    def test_stale_sessions_are_kept_while_stripe_is_down(self):
+        """Test: a failed expiry is retried on the next run."""
+        StaleCheckoutSession.objects.create(id="cs_open")
+
+        with StripeStub() as stripe_stub:
+            stripe_stub.error_status = 500
+            self.assertEqual(expire_stale_sessions(), 0)
+
+        self.assertIn("Stripe is down", StaleCheckoutSession.objects.get().last_error)
+
+    def test_unchanged_fines_are_not_rewritten(self):
+        """Test: a second run on the same day updates nothing."""
+        self.borrow(days_overdue=3)
+        self.assess()
+
+        self.assertEqual(self.assess(), [(1, 0, 0)])
+
+    def test_paid_fines_are_deducted(self):
+        """Test: only the part of the fine not yet paid is charged."""
+        borrowing = self.borrow(days_overdue=3)
+        self.assess()
+        Payment.objects.filter(borrowing=borrowing).update(status="PAID")
+
+        self.assess(on=TODAY + timedelta(days=2))
+
+        self.assertEqual(self.fine(borrowing).amount, Decimal("6.00"))
+
+    def test_borrowings_are_assessed_in_chunks(self):
+        """Test: every chunk is one statement over the next ids."""
+        for days in range(1, 6):
+            self.borrow(days_overdue=days)
+
+        with self.assertNumQueries(4):
+            chunks = self.assess(chunk_size=2)
+
+        self.assertEqual(chunks, [(2, 2, 0), (2, 2, 0), (1, 1, 0)])
+        self.assertEqual(Payment.objects.filter(type="FINE").count(), 5)
+
+    def test_return_updates_the_assessed_fine(self):
+        """Test: returning late reuses the fine the nightly run created."""
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() - timedelta(days=2),
+        )
+        self.assess(on=date.today() - timedelta(days=1))
+
+        borrowing.return_borrowing_with_fine(actual_return_date=date.today())
+
+        self.assertEqual(self.fine(borrowing).amount, Decimal("6.00"))
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_command_reports_totals(self):
+        """Test: `assess_overdue_fines` prints what it did."""
+        self.borrow(days_overdue=3)
+        self.borrow(days_overdue=4)
+        stdout = StringIO()
+
+        call_command("assess_overdue_fines", date=TODAY, chunk_size=1, stdout=stdout)
+
+        self.assertIn(
+            "Assessed 2 overdue borrowings: 2 fines created, 0 updated",
+            stdout.getvalue(),
+        )
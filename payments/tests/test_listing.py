@@ -0,0 +1,199 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+from user.models import User
+
+PAYMENTS_LIST_URL = reverse("payments:payment_list")
+USERS = 100
+PAYMENTS_PER_USER = 200
+
+
+def create_payments(users, book, per_user, now):
+    borrowings = Borrowing.objects.bulk_create(
+        Borrowing(user=user, book=book, expected_return_date=now.date())
+        for user in users
+        for _ in range(per_user)
+    )
+    # Mostly paid payments, one in ten pending, one in twenty a fine.
+    payments = Payment.objects.bulk_create(
+        Payment(
+            user=borrowing.user,
+            borrowing=borrowing,
+            status="PENDING" if number % 10 == 0 else "PAID",
+            type="FINE" if number % 20 == 0 else "PAYMENT",
+            amount=Decimal("3.00"),
+        )
+        for number, borrowing in enumerate(borrowings)
+    )
+    # created_at is auto_now_add: spread it over the last 100 days afterwards.
+    for days in range(100):
+        created_at = now - timedelta(days=days)
+        Payment.objects.filter(
+            pk__in=[payment.pk for payment in payments[days::100]]
+        ).update(created_at=created_at)
+        for payment in payments[days::100]:
+            payment.created_at = created_at
+    return payments
+
+
+class PaymentListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        self.book = Book.objects.create(
+            title="Test Book", author="Author", inventory=5, daily_fee=Decimal("2.00")
+        )
+        self.now = timezone.now()
+        self.payments = create_payments([self.user], self.book, 60, self.now)
+        self.client.force_authenticate(user=self.user)
+
+    def ids(self, params):
+        response = self.client.get(PAYMENTS_LIST_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """Test: a page is one query however many nested rows it has."""
+        for page_size in (5, 50):
+            with self.subTest(page_size=page_size):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        PAYMENTS_LIST_URL, {"page_size": page_size}
+                    )
+
+                self.assertEqual(len(response.data["results"]), page_size)
+                self.assertEqual(len(queries), 1)
+
+    def test_filter_by_status_and_type(self):
+        """Test: ?status= and ?type= narrow the list."""
+        params = {"status": "PENDING", "type": "FINE", "page_size": 100}
+
+        expected = [
+            payment.id for payment in self.payments
+            if payment.status == "PENDING" and payment.type == "FINE"
+        ]
+        self.assertEqual(self.ids(params), expected)
+
+    def test_filter_by_date_range(self):
+        """Test: created_after is inclusive, created_before exclusive."""
+        after = self.now - timedelta(days=10)
+        before = self.now - timedelta(days=2)
+        params = {
+            "created_after": after.isoformat(),
+            "created_before": before.isoformat(),
+            "page_size": 100,
+        }
+
+        expected = [
+            payment.id for payment in self.payments
+            if after <= payment.created_at < before
+        ]
+        self.assertEqual(len(expected), 8)
+        self.assertEqual(self.ids(params), expected)
+
+    def test_invalid_filter_is_rejected(self):
+        """Test: unknown choices are a 400, not an empty page."""
+        response = self.client.get(PAYMENTS_LIST_URL, {"status": "LOST"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_apply_to_archived_history(self):
+        """Test: the same filters work with ?include_archived=true."""
+        params = {"include_archived": "true", "type": "FINE", "page_size": 100}
+
+        expected = [
+            payment.id for payment in self.payments if payment.type == "FINE"
+        ]
+        self.assertEqual(self.ids(params), expected)
+
+
+class PaymentIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(email=f"reader{number}@example.com", first_name="R", last_name="R")
+            for number in range(USERS)
+        )
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="admin123",
+            first_name="Admin",
+            last_name="User"
+        )
+        book = Book.objects.create(
+            title="Book", author="Author", inventory=10, daily_fee=Decimal("1.00")
+        )
+        cls.now = timezone.now()
+        create_payments(cls.users, book, PAYMENTS_PER_USER, cls.now)
+        # The list joins all four tables: give the planner real statistics.
+        with connection.cursor() as cursor:
+            for model in (Payment, Borrowing, Book, User):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, plan):
+        self.assertNotIn("Seq Scan on payments_payment", plan)
+        self.assertRegex(
+            plan,
+            r"Index (Only )?Scan using \w+ on payments_payment"
+            r"|Bitmap Index Scan on payment_",
+        )
+
+    def list_queries(self, user, params):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(PAYMENTS_LIST_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query["sql"] for query in queries.captured_queries
+            if 'FROM "payments_payment"' in query["sql"]
+        ]
+
+    def test_list_queries_use_indexes(self):
+        """Test: every filter combination is an index scan."""
+        week_ago = (self.now - timedelta(days=7)).isoformat()
+        cases = [
+            {},
+            {"status": "PENDING"},
+            {"status": "PENDING", "type": "FINE"},
+            {"type": "FINE"},
+            {"created_after": week_ago},
+            {"status": "PAID", "created_after": week_ago},
+        ]
+        for user in (self.users[0], self.admin):
+            for params in cases:
+                with self.subTest(staff=user.is_staff, **params):
+                    sql_queries = self.list_queries(user, params)
+                    self.assertTrue(sql_queries)
+                    for sql in sql_queries:
+                        self.assertUsesIndex(self.explain(sql))
+
+    def test_selective_filters_use_composite_indexes(self):
+        """Test: a reader's list is read by user, the staff one by status/type."""
+        params = {"status": "PENDING", "type": "FINE"}
+
+        (sql,) = self.list_queries(self.users[0], params)
+        self.assertIn("payment_user_idx", self.explain(sql))
+
+        (sql,) = self.list_queries(self.admin, params)
+        self.assertIn("payment_status_idx", self.explain(sql))
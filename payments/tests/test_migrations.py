@@ -0,0 +1,67 @@
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+from user.models import User
+
+legacy_values = import_module("payments.migrations.0009_legacy_payment_statuses")
+
+
+class LegacyPaymentValuesTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        book = Book.objects.create(
+            title="Test Book", author="Author", inventory=5, daily_fee=Decimal("2.00")
+        )
+        borrowing = Borrowing.objects.create(
+            user=user, book=book, expected_return_date=date.today()
+        )
+        self.payments = [
+            Payment.objects.create(
+                user=user,
+                borrowing=borrowing,
+                status=status,
+                type=payment_type,
+                amount=Decimal("4.00"),
+            )
+            for status, payment_type in (
+                ("Success", ""),
+                ("Pending", ""),
+                ("EXPIRED", "FINE"),
+            )
+        ]
+
+    def values(self):
+        return [
+            tuple(Payment.objects.values_list("status", "type").get(pk=payment.pk))
+            for payment in self.payments
+        ]
+
+    def test_legacy_values_are_mapped(self):
+        """Test: "Success"/"Pending" become PAID/PENDING, no type PAYMENT."""
+        legacy_values.map_legacy_values(apps, None)
+
+        self.assertEqual(
+            self.values(),
+            [("PAID", "PAYMENT"), ("PENDING", "PAYMENT"), ("EXPIRED", "FINE")],
+        )
+
+    def test_reverse_restores_legacy_values(self):
+        """Test: migrating back gives the old code the values it wrote."""
+        legacy = self.values()
+        legacy_values.map_legacy_values(apps, None)
+
+        legacy_values.restore_legacy_values(apps, None)
+
+        self.assertEqual(self.values(), legacy)
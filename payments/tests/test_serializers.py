@@ -0,0 +1,43 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+from payments.serializers import PaymentSerializer, PaymentValuesSerializer
+from user.models import User
+
+
+class PaymentValuesSerializerTests(TestCase):
+    def test_matches_model_serializer(self):
+        """Test: values() rows render exactly like PaymentSerializer."""
+        user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        book = Book.objects.create(
+            title="Test Book", author="Author", inventory=5, daily_fee=Decimal("2.00")
+        )
+        borrowing = Borrowing.objects.create(
+            user=user, book=book, expected_return_date=date.today()
+        )
+        Payment.objects.create(
+            user=user,
+            borrowing=borrowing,
+            status="PENDING",
+            type="PAYMENT",
+            amount=Decimal("4.00"),
+            session_url="https://checkout.stripe.com/pay/cs_test",
+            session_id="cs_test",
+        )
+        serializer = PaymentValuesSerializer()
+        queryset = Payment.objects.order_by("id")
+
+        self.assertEqual(
+            serializer.render_many(queryset.values(*serializer.lookups())),
+            PaymentSerializer(queryset, many=True).data,
+        )
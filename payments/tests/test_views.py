@@ -0,0 +1,88 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+from user.models import User
+
+PAYMENTS_LIST_URL = reverse("payments:payment_list")
+
+
+def get_payment_detail_url(payment_id):
+    return reverse("payments:payment-detail", args=[payment_id])
+
+
+class PaymentSparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        self.book = Book.objects.create(
+            title="Test Book", author="Author", inventory=5, daily_fee=Decimal("2.00")
+        )
+        self.borrowing = Borrowing.objects.create(
+            user=self.user, book=self.book, expected_return_date=date.today()
+        )
+        self.payment = Payment.objects.create(
+            user=self.user,
+            borrowing=self.borrowing,
+            status="PENDING",
+            type="PAYMENT",
+            amount=Decimal("4.00"),
+            session_url="https://checkout.stripe.com/pay/cs_test",
+            session_id="cs_test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_expands_everything_by_default(self):
+        """Test: without parameters the book is nested in the borrowing."""
+        response = self.client.get(PAYMENTS_LIST_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data["results"][0]
+        self.assertEqual(result["user"], "user@example.com")
+        self.assertEqual(result["borrowing"]["book"]["title"], "Test Book")
+
+    def test_expand_one_level(self):
+        """Test: expanding the borrowing leaves its book as an id."""
+        response = self.client.get(PAYMENTS_LIST_URL, {"expand": "borrowing"})
+
+        borrowing = response.data["results"][0]["borrowing"]
+        self.assertEqual(borrowing["id"], self.borrowing.id)
+        self.assertEqual(borrowing["book"], self.book.id)
+
+    def test_selected_fields_skip_joins(self):
+        """Test: leaving out nested objects drops their joins."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(PAYMENTS_LIST_URL, {"fields": "id,amount"})
+
+        self.assertEqual(
+            response.data["results"], [{"id": self.payment.id, "amount": "4.00"}]
+        )
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn("JOIN", sql)
+
+    def test_retrieve_nested_fields(self):
+        """Test: a detail request loads only the selected nested columns."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                get_payment_detail_url(self.payment.id),
+                {"fields": "id,borrowing.book.title"},
+            )
+
+        self.assertEqual(
+            response.data,
+            {"id": self.payment.id, "borrowing": {"book": {"title": "Test Book"}}},
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("daily_fee", queries.captured_queries[0]["sql"])
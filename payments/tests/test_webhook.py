@@ -0,0 +1,253 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.models import Book
+from borrowings.models import Borrowing
+from lib_bot.models import Notification
+from payments.events import process_events
+from payments.models import Payment, StripeEvent
+from payments.tests.stripe_stub import StripeStub
+from user.models import User
+
+WEBHOOK_URL = reverse("payments:stripe-webhook")
+SUCCESS_URL = reverse("payments:payment-success")
+WEBHOOK_SECRET = "whsec_test"
+
+
+def sign(payload, secret=WEBHOOK_SECRET, timestamp=None):
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def checkout_event(
+    event_id, event_type, payment, payment_status="paid", amount_total=None
+):
+    return {
+        "id": event_id,
+        "object": "event",
+        "type": event_type,
+        "data": {
+            "object": {
+                "id": payment.session_id,
+                "object": "checkout.session",
+                "client_reference_id": str(payment.pk),
+                "payment_status": payment_status,
+                "amount_total": (
+                    int(payment.amount * 100) if amount_total is None else amount_total
+                ),
+            }
+        },
+    }
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com",
+            first_name="Test",
+            last_name="User",
+            password="password123"
+        )
+        book = Book.objects.create(
+            title="Test Book", author="Author", inventory=5, daily_fee=Decimal("2.00")
+        )
+        self.borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=book,
+            expected_return_date=date.today() + timedelta(days=7),
+        )
+        self.payment = self.create_payment("cs_test_1")
+        self.stripe = self.enterContext(StripeStub())
+
+    def create_payment(self, session_id):
+        return Payment.objects.create(
+            user=self.user,
+            borrowing=self.borrowing,
+            status="PENDING",
+            type="PAYMENT",
+            amount=Decimal("14.00"),
+            session_url=f"https://checkout.stripe.com/c/pay/{session_id}",
+            session_id=session_id,
+        )
+
+    def deliver(self, event, signature=None):
+        payload = json.dumps(event)
+        return self.client.generic(
+            "POST",
+            WEBHOOK_URL,
+            payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=signature or sign(payload),
+        )
+
+    def test_invalid_signature_is_rejected(self):
+        """Test: events not signed with the webhook secret are refused."""
+        event = checkout_event("evt_1", "checkout.session.completed", self.payment)
+
+        response = self.deliver(event, signature=sign("{}", secret="whsec_other"))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_stale_signature_is_rejected(self):
+        """Test: a replayed signature older than the tolerance is refused."""
+        event = checkout_event("evt_1", "checkout.session.completed", self.payment)
+        payload = json.dumps(event)
+
+        response = self.deliver(event, signature=sign(payload, timestamp=1))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_redelivered_event_is_stored_once(self):
+        """Test: Stripe's at-least-once deliveries are deduplicated by id."""
+        event = checkout_event("evt_1", "checkout.session.completed", self.payment)
+
+        first, second = self.deliver(event), self.deliver(event)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+    def test_unhandled_event_types_are_ignored(self):
+        """Test: other event types are acknowledged but not stored."""
+        response = self.deliver(
+            {"id": "evt_1", "type": "customer.created", "data": {"object": {}}}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_completed_session_marks_payment_paid(self):
+        """Test: processing a paid session updates the payment locally."""
+        self.deliver(
+            checkout_event("evt_1", "checkout.session.completed", self.payment)
+        )
+
+        processed = process_events()
+
+        self.assertEqual(len(processed), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PAID")
+        self.assertEqual(Notification.objects.get().kind, "PAYMENT_SUCCEEDED")
+        self.assertIsNotNone(StripeEvent.objects.get().processed_at)
+        self.assertEqual(self.stripe.requests, [])
+
+    def test_processing_is_idempotent(self):
+        """Test: a second event for a paid payment changes nothing."""
+        self.deliver(
+            checkout_event("evt_1", "checkout.session.completed", self.payment)
+        )
+        process_events()
+        self.deliver(
+            checkout_event(
+                "evt_2", "checkout.session.async_payment_succeeded", self.payment
+            )
+        )
+        self.deliver(checkout_event("evt_3", "checkout.session.expired", self.payment))
+
+        process_events()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PAID")
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(process_events(), [])
+
+    def test_session_at_another_amount_does_not_pay(self):
+        """Test: a session that charged an older amount leaves the payment open."""
+        self.deliver(
+            checkout_event(
+                "evt_1", "checkout.session.completed", self.payment, amount_total=900
+            )
+        )
+
+        with self.assertLogs("payments.events", "WARNING"):
+            process_events()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PENDING")
+        self.assertFalse(Notification.objects.exists())
+
+    def test_unpaid_completed_session_waits(self):
+        """Test: a completed but unpaid session leaves the payment pending."""
+        self.deliver(
+            checkout_event(
+                "evt_1", "checkout.session.completed", self.payment, "unpaid"
+            )
+        )
+
+        process_events()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PENDING")
+
+    def test_expired_session_can_be_replaced(self):
+        """Test: an expired payment gets a new session on request."""
+        self.deliver(checkout_event("evt_1", "checkout.session.expired", self.payment))
+        process_events()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "EXPIRED")
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(
+            reverse("payments:payment-session", args=[self.payment.id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PENDING")
+        self.assertEqual(self.payment.session_id, response.data["session_id"])
+
+    def test_events_are_processed_in_batches(self):
+        """Test: the command drains the backlog batch by batch."""
+        payments = [self.create_payment(f"cs_test_{n}") for n in range(2, 7)]
+        for number, payment in enumerate(payments):
+            self.deliver(
+                checkout_event(f"evt_{number}", "checkout.session.completed", payment)
+            )
+        stdout = StringIO()
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("process_stripe_events", once=True, batch_size=2, stdout=stdout)
+
+        self.assertIn("Processed 5 events", stdout.getvalue())
+        self.assertFalse(
+            Payment.objects.filter(pk__in=[payment.pk for payment in payments])
+            .exclude(status="PAID")
+            .exists()
+        )
+        # Three batches of at most two, then an empty one.
+        claims = [
+            query for query in queries.captured_queries
+            if query["sql"].endswith("FOR UPDATE SKIP LOCKED")
+            and "payments_stripeevent" in query["sql"]
+        ]
+        self.assertEqual(len(claims), 4)
+
+    def test_success_view_is_a_local_lookup(self):
+        """Test: the redirect page reads the status without calling Stripe."""
+        pending = self.client.get(SUCCESS_URL, {"session_id": "cs_test_1"})
+        Payment.objects.filter(pk=self.payment.pk).update(status="PAID")
+        paid = self.client.get(SUCCESS_URL, {"session_id": "cs_test_1"})
+        missing = self.client.get(SUCCESS_URL, {"session_id": "cs_unknown"})
+
+        self.assertEqual(pending.json(), {"status": "Payment processing"})
+        self.assertEqual(paid.json(), {"status": "Payment successful"})
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.stripe.requests, [])
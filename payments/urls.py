@@ -4,13 +4,21 @@ from payments.views import (
     PaymentListCreateView,
     PaymentDetailView,
     PaymentCancelView,
+    PaymentSessionView,
+    StripeWebhookView,
     PaymentSuccessView
 )
 
 urlpatterns = [
     path("", PaymentListCreateView.as_view(), name="payment_list"),
     path("<int:pk>/", PaymentDetailView.as_view(), name="payment-detail"),
+    path(
+        "<int:pk>/session/",
+        PaymentSessionView.as_view(),
+        name="payment-session",
+    ),
     path("success/", PaymentSuccessView.as_view(), name="payment-success"),
+    path("webhook/", StripeWebhookView.as_view(), name="stripe-webhook"),
     path("cancel/", PaymentCancelView.as_view(), name="payment-cancel"),
 ]
 
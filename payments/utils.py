@@ -1,20 +1,75 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 import stripe
 from django.conf import settings
 from django.db import transaction
-from payments.models import Payment
+from django.utils import timezone
+
+from django_library_service.http_client import get_session
+from payments.models import Payment, StaleCheckoutSession
 stripe.api_key = settings.STRIPE_SECRET_KEY
+# Go through the shared session: pooled connections, timeouts, retries and
+# the circuit breaker. It retries, so the SDK must not retry on top of it.
+stripe.default_http_client = stripe.RequestsClient(
+    timeout=(
+        settings.OUTBOUND_HTTP_CONNECT_TIMEOUT,
+        settings.OUTBOUND_HTTP_READ_TIMEOUT,
+    ),
+    session=get_session("stripe"),
+)
+stripe.max_network_retries = 0
 
+# A cached session is not handed out this close to its expiry.
+SESSION_EXPIRY_MARGIN = timedelta(minutes=5)
+STALE_SESSION_BATCH_SIZE = 100
 
-@transaction.atomic
-def create_stripe_payment_session(borrowing, request):
+
+def borrowing_amount(borrowing):
     days_of_borrowing = (
         borrowing.expected_return_date - borrowing.borrow_date
     ).days
+    return borrowing.book.daily_fee * days_of_borrowing
 
-    total_amount = borrowing.book.daily_fee * days_of_borrowing
 
-    try:
+def create_pending_payment(borrowing, type="PAYMENT", amount=None):
+    """Record a charge to be paid later; no Stripe call is made."""
+    return Payment.objects.create(
+        user_id=borrowing.user_id,
+        borrowing=borrowing,
+        type=type,
+        amount=borrowing_amount(borrowing) if amount is None else amount,
+        status="PENDING",
+    )
+
+
+def session_is_usable(payment):
+    return payment.status == "PENDING" and bool(payment.session_url) and (
+        payment.session_expires_at is not None
+        and payment.session_expires_at > timezone.now() + SESSION_EXPIRY_MARGIN
+    )
 
+
+def get_checkout_session(payment):
+    """
+    Return ``payment`` with a Stripe Checkout Session that is still open,
+    creating one only if the cached session is missing or about to expire.
+
+    No row is locked while Stripe is called: the new session is saved only
+    if the payment still has the session and amount it was created for.
+    Otherwise a concurrent request (or a re-priced fine) got there first;
+    its payment is returned and the new session is queued to be expired.
+    """
+    if session_is_usable(payment):
+        return payment
+
+    payment = Payment.objects.select_related("borrowing__book").get(pk=payment.pk)
+    if session_is_usable(payment):
+        return payment
+
+    expires_at = timezone.now() + timedelta(
+        seconds=settings.STRIPE_CHECKOUT_SESSION_TTL
+    )
+    try:
         session = stripe.checkout.Session.create(
             payment_method_types=["card"],
             line_items=[
@@ -22,27 +77,86 @@ def create_stripe_payment_session(borrowing, request):
                     "price_data": {
                         "currency": "usd",
                         "product_data": {
-                            "name": f"Book borrowing - {borrowing.book.title}",
+                            "name": (
+                                f"Book {payment.get_type_display().lower()}"
+                                f" - {payment.borrowing.book.title}"
+                            ),
                         },
-                        "unit_amount": int(total_amount * 100),
+                        "unit_amount": int(payment.amount * 100),
                     },
                     "quantity": 1,
                 }],
             mode="payment",
+            client_reference_id=str(payment.pk),
+            expires_at=int(expires_at.timestamp()),
             success_url=f"http://127.0.0.1:8000/api/payments/success/"
                         f"?session_id={{CHECKOUT_SESSION_ID}}",
             cancel_url="http://127.0.0.1:8000/api/payments/cancel/",
         )
-        payment = Payment.objects.create(
-            user=borrowing.user,
-            borrowing=borrowing,
-            amount=total_amount,
-            status="Pending",
-            session_id=session.id,
-            session_url=session.url,
-        )
-        return payment, session
-
     except stripe.error.StripeError as e:
         print(f"Stripe Error: {e}")
         raise e
+
+    values = {
+        "status": "PENDING",
+        "session_id": session.id,
+        "session_url": session.url,
+        "session_expires_at": datetime.fromtimestamp(
+            session.expires_at, tz=dt_timezone.utc
+        ),
+    }
+    saved = Payment.objects.filter(
+        pk=payment.pk,
+        status__in=("PENDING", "EXPIRED"),
+        session_id=payment.session_id,
+        amount=payment.amount,
+    ).update(**values)
+    if not saved:
+        StaleCheckoutSession.objects.get_or_create(id=session.id)
+        return Payment.objects.get(pk=payment.pk)
+
+    for name, value in values.items():
+        setattr(payment, name, value)
+    return payment
+
+
+def expire_stale_sessions(batch_size=STALE_SESSION_BATCH_SIZE):
+    """
+    Expire up to ``batch_size`` queued stale Checkout Sessions at Stripe;
+    return how many were done with.
+
+    Sessions that are no longer open are dropped. Other errors keep the
+    row for the next run, until the session has expired on its own.
+    """
+    StaleCheckoutSession.objects.filter(
+        queued_at__lt=timezone.now()
+        - timedelta(seconds=settings.STRIPE_CHECKOUT_SESSION_TTL)
+    ).delete()
+
+    with transaction.atomic():
+        stale = list(
+            StaleCheckoutSession.objects.select_for_update(skip_locked=True)
+            .order_by("queued_at")[:batch_size]
+        )
+        done, failed = [], []
+        for session in stale:
+            try:
+                stripe.checkout.Session.expire(session.id)
+            except stripe.error.InvalidRequestError:
+                # Already expired or completed.
+                pass
+            except stripe.error.StripeError as e:
+                session.last_error = str(e)
+                failed.append(session)
+                continue
+            done.append(session.pk)
+
+        StaleCheckoutSession.objects.filter(pk__in=done).delete()
+        StaleCheckoutSession.objects.bulk_update(failed, ["last_error"])
+        return len(done)
+
+
+@transaction.atomic
+def create_stripe_payment_session(borrowing, request=None):
+    """Eager mode: create the payment and its Stripe session right away."""
+    return get_checkout_session(create_pending_payment(borrowing))
@@ -1,90 +1,202 @@
+import json
+
 import stripe
 from django.http import JsonResponse
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from drf_spectacular.utils import extend_schema, extend_schema_view
 from rest_framework import generics, status
 from rest_framework.generics import ListCreateAPIView
 from rest_framework.permissions import IsAuthenticated
-
-from rest_framework import serializers
-from borrowings.models import Borrowing
-from django_library_service import settings
-from lib_bot.bot import send_telegram_message
-from payments.models import Payment
-from payments.serializers import PaymentSerializer
-from payments.utils import create_stripe_payment_session
+from rest_framework.response import Response
+
+from django.conf import settings
+from lib_bot.outbox import notify
+from payments.events import HANDLED_EVENT_TYPES, record_event
+from payments.filters import PaymentFilter
+from payments.models import Payment, PaymentHistory
+from django_library_service.archive import (
+    INCLUDE_ARCHIVED_PARAMETER,
+    ArchiveViewMixin,
+)
+from django_library_service.fieldsets import (
+    FIELDSET_PARAMETERS,
+    SparseFieldsetViewMixin,
+)
+from django_library_service.serializers import ValuesListMixin
+from payments.serializers import (
+    PaymentCreateSerializer,
+    PaymentSerializer,
+    PaymentSessionSerializer,
+    PaymentValuesSerializer,
+)
+from payments.utils import (
+    create_pending_payment,
+    create_stripe_payment_session,
+    get_checkout_session,
+)
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
-class PaymentListCreateView(ListCreateAPIView):
+@extend_schema_view(
+    get=extend_schema(
+        parameters=[INCLUDE_ARCHIVED_PARAMETER, *FIELDSET_PARAMETERS]
+    )
+)
+class PaymentListCreateView(
+    ValuesListMixin, SparseFieldsetViewMixin, ArchiveViewMixin, ListCreateAPIView
+):
+    queryset = Payment.objects.all()
+    history_queryset = PaymentHistory.objects.all()
     serializer_class = PaymentSerializer
+    values_serializer_class = PaymentValuesSerializer
+    filterset_class = PaymentFilter
     permission_classes = [IsAuthenticated]
+    # POST: 4 queries, 6 with STRIPE_LAZY_CHECKOUT off.
+    query_budget = {"get": 2, "post": 6}
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         if self.request.user.is_staff:
-            return Payment.objects.all()
-        return Payment.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
 
-    def perform_create(self, serializer):
-        borrow_id = self.request.data.get("borrowing")
+    def get_serializer_class(self):
+        if self.request.method == "POST":
+            return PaymentCreateSerializer
+        return PaymentSerializer
 
-        if not borrow_id:
-            raise serializers.ValidationError(
-                {"borrowing": "Borrowing not provided."}
-            )
+    def perform_create(self, serializer):
+        borrowing = serializer.validated_data["borrowing"]
 
-        try:
-            borrowing = Borrowing.objects.get(id=borrow_id)
-        except Borrowing.DoesNotExist:
-            raise serializers.ValidationError(
-                {"borrowing": "Borrowing not found."}
-            )
-
-        payment, session = create_stripe_payment_session(
-            borrowing, self.request
-        )
+        if settings.STRIPE_LAZY_CHECKOUT:
+            payment = create_pending_payment(borrowing)
+        else:
+            payment = create_stripe_payment_session(borrowing, self.request)
 
         serializer.instance = payment
 
 
-class PaymentDetailView(generics.RetrieveAPIView):
+@extend_schema_view(
+    get=extend_schema(
+        parameters=[INCLUDE_ARCHIVED_PARAMETER, *FIELDSET_PARAMETERS]
+    )
+)
+class PaymentDetailView(
+    SparseFieldsetViewMixin, ArchiveViewMixin, generics.RetrieveAPIView
+):
+    queryset = Payment.objects.all()
+    history_queryset = PaymentHistory.objects.all()
     serializer_class = PaymentSerializer
+    values_serializer_class = PaymentValuesSerializer
+    permission_classes = [IsAuthenticated]
+    query_budget = 2
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+
+class PaymentSessionView(generics.GenericAPIView):
+    queryset = Payment.objects.all()
+    serializer_class = PaymentSessionSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 4
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         if self.request.user.is_staff:
-            return Payment.objects.all()
-        return Payment.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    @extend_schema(
+        summary="Get the Stripe Checkout URL of a pending payment.",
+        description="Creates the Checkout Session on first request and "
+                    "returns the same one until shortly before it expires.",
+    )
+    def get(self, request, *args, **kwargs):
+        payment = self.get_object()
+        if payment.status not in ("PENDING", "EXPIRED"):
+            return Response(
+                {"error": "Only pending or expired payments can be paid."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            payment = get_checkout_session(payment)
+        except stripe.error.StripeError as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY
+            )
+        return Response(self.get_serializer(payment).data)
 
 
 class PaymentSuccessView(View):
+    """Where Stripe redirects after checkout; the webhook sets the status."""
+
+    query_budget = 1
+
     def get(self, request, *args, **kwargs):
         session_id = request.GET.get("session_id")
         if not session_id:
             return JsonResponse({"error": "session_id not provided."}, status=400)
 
+        payment_status = (
+            Payment.objects.filter(session_id=session_id)
+            .values_list("status", flat=True)
+            .first()
+        )
+        if payment_status is None:
+            return JsonResponse({"error": "Payment not found."}, status=404)
+        if payment_status == "PAID":
+            return JsonResponse({"status": "Payment successful"})
+        if payment_status == "PENDING":
+            # The checkout.session.completed event has not been processed yet.
+            return JsonResponse({"status": "Payment processing"})
+        return JsonResponse({"status": "Payment failed"})
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class StripeWebhookView(View):
+    """
+    Receive signed Stripe events and store them for
+    ``manage.py process_stripe_events``; no Stripe API call is made.
+    """
+
+    query_budget = 2
+
+    def post(self, request, *args, **kwargs):
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            return JsonResponse(
+                {"error": "STRIPE_WEBHOOK_SECRET is not configured."}, status=500
+            )
+
+        payload = request.body.decode("utf-8")
         try:
-            session = stripe.checkout.Session.retrieve(session_id)
-
-            if session.payment_status == "paid":
-                payment = Payment.objects.get(session_id=session_id)
-                payment.status = "Success"
-                payment.save()
-
-                send_telegram_message(
-                    f"Payment for Borrowing ID {payment.borrowing_id} "
-                    f"has been successfully processed.",
-                )
-                return JsonResponse({"status": "Payment successful"})
-            else:
-                return JsonResponse({"status": "Payment failed"})
-        except stripe.error.StripeError as e:
-            return JsonResponse({"error": str(e)}, status=500)
+            stripe.WebhookSignature.verify_header(
+                payload,
+                request.headers.get("Stripe-Signature", ""),
+                settings.STRIPE_WEBHOOK_SECRET,
+                stripe.Webhook.DEFAULT_TOLERANCE,
+            )
+            event = json.loads(payload)
+        except (stripe.error.SignatureVerificationError, ValueError):
+            return JsonResponse({"error": "Invalid payload or signature."}, status=400)
+
+        if event.get("type") in HANDLED_EVENT_TYPES:
+            record_event(event)
+        return JsonResponse({"received": True})
 
 
 class PaymentCancelView(View):
+    query_budget = 1
+
     def get(self, request, *args, **kwargs):
-        send_telegram_message("Payment was canceled. Please try again later.")
+        notify("PAYMENT_CANCELED", "Payment was canceled. Please try again later.")
         return JsonResponse(
             {"message": "Payment was canceled. Please try again later."}
         )
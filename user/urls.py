@@ -1,5 +1,6 @@
 from django.urls import path
 
+from django_library_service.query_budget import query_budget
 from user.views import CreateUserView, ManageUserView
 
 from rest_framework_simplejwt.views import (
@@ -13,7 +14,17 @@ app_name = "user"
 urlpatterns = [
     path("register/", CreateUserView.as_view(), name="create"),
     path("me/", ManageUserView.as_view(), name="manage"),
-    path("login/", TokenObtainPairView.as_view(), name="login_user"),
-    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    path("token/verify/", TokenVerifyView.as_view(), name="token_verify"),
+    path(
+        "login/", query_budget(1)(TokenObtainPairView.as_view()), name="login_user"
+    ),
+    path(
+        "token/refresh/",
+        query_budget(1)(TokenRefreshView.as_view()),
+        name="token_refresh",
+    ),
+    path(
+        "token/verify/",
+        query_budget(0)(TokenVerifyView.as_view()),
+        name="token_verify",
+    ),
 ]
@@ -7,12 +7,14 @@ from user.serializers import UserSerializer
 
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
+    query_budget = 4
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated,)
+    query_budget = {"get": 1, "put": 4, "patch": 2}
 
     def get_object(self):
         return self.request.user